@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from search_plan import load_searches
+
+# End-to-end throughput benchmark: runs the full run_all path (preflight, fetch, parse,
+# enrich, write) against a local standin_server.py and reports searches/s, listings/s
+# and peak memory. Nothing here talks to redfin.com.
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+
+
+def _start_server(args: argparse.Namespace, *, block_rate: Optional[float] = None) -> tuple[subprocess.Popen, str]:
+    cmd = [
+        sys.executable,
+        "-u",
+        os.path.join(SCRIPTS_DIR, "standin_server.py"),
+        "--port",
+        "0",
+        "--latency-ms",
+        str(args.latency_ms),
+        "--latency-jitter-ms",
+        str(args.latency_jitter_ms),
+        "--block-rate",
+        str(args.block_rate if block_rate is None else block_rate),
+        "--rate-limit-rate",
+        str(args.rate_limit_rate),
+        "--homes-per-page",
+        str(args.homes_per_page),
+        "--padding-kb",
+        str(args.padding_kb),
+    ]
+    if args.recorded_dir:
+        cmd += ["--recorded-dir", args.recorded_dir]
+    if args.no_etag:
+        cmd.append("--no-etag")
+    if args.no_gzip:
+        cmd.append("--no-gzip")
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline() if proc.stdout else ""
+    marker = "REDFIN_ORIGIN="
+    if marker not in line:
+        proc.kill()
+        raise RuntimeError(f"stand-in server failed to start: {line!r}")
+    return proc, line.split(marker, 1)[1].strip().rstrip(")")
+
+
+def _write_searches(path: str, base_config: str, count: int) -> int:
+    """
+    Expand the real searches.yaml to `count` searches (each copy gets a distinct URL path,
+    so the stand-in serves it a different page). JSON is valid YAML, so no yaml dump needed.
+    """
+    base = load_searches(base_config, use_cache=False)
+    out: List[Dict[str, Any]] = []
+    for i in range(count):
+        s = base[i % len(base)]
+        url = s.url if i < len(base) else f"{s.url.rstrip('/')}/page-{i // len(base) + 1}"
+        out.append(
+            {
+                "search_id": i + 1,
+                "category": s.category,
+                "city": s.city,
+                "description": s.description,
+                "url": url,
+            }
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"searches": out}, f, indent=2)
+    return len(out)
+
+
+def _server_stats(origin: str) -> Dict[str, int]:
+    import urllib.request
+
+    with urllib.request.urlopen(f"{origin}/__stats", timeout=30) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    work = tempfile.mkdtemp(prefix="redfin-bench-")
+    config_path = os.path.join(work, "searches.yaml")
+    n_searches = _write_searches(config_path, args.config, args.searches)
+    if args.with_lookups:
+        os.symlink(os.path.join(REPO_DIR, "lookups"), os.path.join(work, "lookups"))
+
+    proc, origin = _start_server(args)
+    # Extra stand-ins acting as egress proxies, each with its own block rate.
+    proxy_procs: List[subprocess.Popen] = []
+    proxies: List[str] = []
+    for rate in args.proxy_block_rates:
+        p, proxy_origin = _start_server(args, block_rate=rate)
+        proxy_procs.append(p)
+        proxies.append(proxy_origin)
+    env_before = dict(os.environ)
+    cwd_before = os.getcwd()
+    try:
+        if proxies:
+            os.environ["REDFIN_PROXIES"] = ",".join(proxies)
+        os.environ.update(
+            {
+                "REDFIN_ORIGIN": origin,
+                "REDFIN_CACHE_DIR": os.path.join(work, ".cache"),
+                "REDFIN_MIN_DELAY_S": str(args.min_delay_s),
+                "REDFIN_MAX_DELAY_S": str(args.max_delay_s),
+                "REDFIN_MAX_ATTEMPTS": str(args.max_attempts),
+                "REDFIN_LOOKUP_RELOAD_S": "0",
+            }
+        )
+        os.chdir(work)
+
+        import run_all_searches
+
+        # Repeats reuse the same cache dir, so later runs show the effect of revalidation.
+        runs: List[Dict[str, Any]] = []
+        for _ in range(max(1, args.repeat)):
+            before = _server_stats(origin)
+            t0 = time.perf_counter()
+            out_path = run_all_searches.run_all(config_path=config_path, detail_budget=args.detail_budget)
+            wall_s = time.perf_counter() - t0
+            after = _server_stats(origin)
+            runs.append(
+                {
+                    "wall_s": round(wall_s, 3),
+                    "bytes_sent": after["bytes_sent"] - before["bytes_sent"],
+                    "not_modified": after["not_modified"] - before["not_modified"],
+                }
+            )
+    finally:
+        os.chdir(cwd_before)
+        os.environ.clear()
+        os.environ.update(env_before)
+        for p in [proc] + proxy_procs:
+            p.terminate()
+            p.wait(timeout=10)
+
+    out_path = os.path.join(work, out_path)
+    with open(out_path, "r", encoding="utf-8", newline="") as f:
+        rows = sum(1 for _ in csv.DictReader(f))
+    with open(os.path.join(os.path.dirname(out_path), "run_profile.json"), "r", encoding="utf-8") as f:
+        run_profile = json.load(f)
+    stages = run_profile["run"]
+
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+    return {
+        "searches": n_searches,
+        "rows": rows,
+        "wall_s": round(wall_s, 3),
+        "searches_per_s": round(n_searches / wall_s, 3) if wall_s else None,
+        "listings_per_s": round(rows / wall_s, 1) if wall_s else None,
+        "peak_rss_mb": round(peak_mb, 1),
+        "first_row_s": run_profile.get("pipeline", {}).get("first_row_s"),
+        "stages_s": {k: v["seconds"] for k, v in stages.items()},
+        "runs": runs,
+        "workdir": work,
+    }
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark run_all against a local Redfin stand-in.")
+    parser.add_argument("--config", default=os.path.join(REPO_DIR, "config", "searches.yaml"))
+    parser.add_argument("--searches", type=int, default=10, help="number of searches to run")
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--block-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--homes-per-page", type=int, default=40)
+    parser.add_argument("--padding-kb", type=int, default=0)
+    parser.add_argument("--recorded-dir", default=None)
+    parser.add_argument("--no-etag", action="store_true", help="stand-in sends no ETags (no 304s)")
+    parser.add_argument("--no-gzip", action="store_true", help="stand-in never compresses bodies")
+    parser.add_argument("--repeat", type=int, default=1, help="run N times against the same cache (default 1)")
+    parser.add_argument(
+        "--proxy-block-rates",
+        type=lambda v: [float(x) for x in v.split(",") if x.strip()],
+        default=[],
+        metavar="R1,R2,...",
+        help="route through one stand-in proxy per rate, each blocking that share of requests",
+    )
+    parser.add_argument("--min-delay-s", type=float, default=0.0)
+    parser.add_argument("--max-delay-s", type=float, default=0.0)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--detail-budget", type=int, default=0)
+    parser.add_argument("--with-lookups", action="store_true", help="use the repo's lookups/ for enrichment")
+    parser.add_argument("--json", default=None, metavar="PATH", help="also write the report as JSON")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    report = run_benchmark(args)
+    print("\n=== Benchmark ===")
+    for k in ("searches", "rows", "wall_s", "first_row_s", "searches_per_s", "listings_per_s", "peak_rss_mb"):
+        print(f"{k:>15}: {report[k]}")
+    for i, run in enumerate(report["runs"], 1):
+        print(f"{'run ' + str(i):>15}: {run['wall_s']}s, {run['bytes_sent'] / 1024:.0f} KiB sent, {run['not_modified']} x 304")
+    for name, secs in sorted(report["stages_s"].items(), key=lambda kv: -kv[1]):
+        print(f"{'stage ' + name:>28}: {secs:.3f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
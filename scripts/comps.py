@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import sqlite3
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from history_index import default_history_index_path
+from lookup_index import try_open_index
+from lookup_loader import cell, header_index, parse_files
+
+# Comparable-sales lookups: a uniform lat/long grid over current and past listings, used
+# to judge a listing's $/sqft against what nearby homes ask instead of a fixed constant.
+
+RATING_MODES = ("fixed", "comps")
+DEFAULT_CELL_DEG = 0.005  # ~550 m north-south, ~380 m east-west around Tacoma
+MIN_COMPS = 3
+
+_KM_PER_DEG_LAT = 110.57
+_KM_PER_DEG_LON_EQUATOR = 111.32
+
+
+class GridIndex:
+    """
+    Points (listing key, lat, long, value) bucketed into square grid cells.
+
+    `nearest` scans rings of cells outward from the query's cell and stops once the
+    k-th best distance is closer than anything an unscanned ring could hold, so a query
+    touches a handful of cells however many points are indexed. Distances use an
+    equirectangular approximation, well under 1% off at comp distances (a few km).
+    Adding a key that is already present moves it (a relisted home keeps only its
+    latest position and value).
+    """
+
+    def __init__(self, cell_deg: float = DEFAULT_CELL_DEG) -> None:
+        if cell_deg <= 0:
+            raise ValueError("cell_deg must be positive")
+        self.cell_deg = cell_deg
+        self._lat = array("d")
+        self._lon = array("d")
+        self._val = array("d")
+        self._keys: List[str] = []
+        self._by_key: Dict[str, int] = {}
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def add(self, key: str, lat: float, lon: float, value: float) -> None:
+        i = self._by_key.get(key)
+        if i is None:
+            i = len(self._keys)
+            self._keys.append(key)
+            self._by_key[key] = i
+            self._lat.append(lat)
+            self._lon.append(lon)
+            self._val.append(value)
+        else:
+            old = self._cell(self._lat[i], self._lon[i])
+            self._lat[i], self._lon[i], self._val[i] = lat, lon, value
+            if old == self._cell(lat, lon):
+                return
+            self._cells[old].remove(i)
+        self._cells.setdefault(self._cell(lat, lon), []).append(i)
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int,
+        *,
+        max_km: Optional[float] = None,
+        exclude: Optional[str] = None,
+    ) -> List[Tuple[float, float]]:
+        """
+        Up to `k` (distance_km, value) pairs closest to (lat, lon), nearest first,
+        skipping the point stored under `exclude` and anything beyond `max_km`.
+        """
+        if k <= 0 or not self._keys:
+            return []
+        skip = self._by_key.get(exclude) if exclude is not None else None
+        row, col = self._cell(lat, lon)
+        # One cosine per query: at comp distances the latitude barely changes across points.
+        ky = _KM_PER_DEG_LAT
+        kx = _KM_PER_DEG_LON_EQUATOR * math.cos(math.radians(lat))
+        # Smallest side of a cell in km: every point outside ring r is at least r of these away.
+        cell_km = self.cell_deg * min(ky, kx)
+        max_ring = int(max_km / cell_km) + 1 if max_km is not None else None
+        limit_sq = max_km * max_km if max_km is not None else math.inf
+        lats, lons, vals, cells = self._lat, self._lon, self._val, self._cells
+
+        best: List[Tuple[float, float]] = []  # max-heap of (-squared distance, value)
+        ring = 0
+        scanned = 0
+        while True:
+            if ring == 0:
+                ring_cells = [(row, col)]
+            else:
+                ring_cells = [(row - ring, c) for c in range(col - ring, col + ring + 1)]
+                ring_cells += [(row + ring, c) for c in range(col - ring, col + ring + 1)]
+                ring_cells += [(r, col - ring) for r in range(row - ring + 1, row + ring)]
+                ring_cells += [(r, col + ring) for r in range(row - ring + 1, row + ring)]
+            for key in ring_cells:
+                members = cells.get(key)
+                if not members:
+                    continue
+                scanned += len(members)
+                for i in members:
+                    dy = (lats[i] - lat) * ky
+                    dx = (lons[i] - lon) * kx
+                    d2 = dx * dx + dy * dy
+                    if d2 > limit_sq or i == skip:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-d2, vals[i]))
+                    elif d2 < -best[0][0]:
+                        heapq.heapreplace(best, (-d2, vals[i]))
+            reach = ring * cell_km
+            if len(best) >= k and -best[0][0] <= reach * reach:
+                break
+            if max_ring is not None and ring >= max_ring:
+                break
+            if scanned >= len(self._keys):
+                break
+            ring += 1
+        return sorted((math.sqrt(-nd2), v) for nd2, v in best)
+
+    def median_value(
+        self,
+        lat: float,
+        lon: float,
+        k: int,
+        *,
+        max_km: Optional[float] = None,
+        exclude: Optional[str] = None,
+        min_count: int = MIN_COMPS,
+    ) -> Optional[float]:
+        """
+        Median value of the k nearest points, or None with fewer than `min_count` of them.
+        """
+        near = self.nearest(lat, lon, k, max_km=max_km, exclude=exclude)
+        if len(near) < max(1, min_count):
+            return None
+        vals = sorted(v for _, v in near)
+        mid = len(vals) // 2
+        return vals[mid] if len(vals) % 2 else (vals[mid - 1] + vals[mid]) / 2.0
+
+
+def _float_or_none(s: str) -> Optional[float]:
+    try:
+        return float(s) if s else None
+    except ValueError:
+        return None
+
+
+def _iter_history_rows(path: str) -> Iterator[Tuple[str, float, float, float]]:
+    """
+    (listing_url, latitude, longitude, home_price_per_sqft) from one daily CSV; rows from
+    before coordinates were recorded, or without a $/sqft, are skipped.
+    """
+    import csv
+
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        reader = csv.reader(f)
+        cols = header_index(next(reader, []))
+        need = ("listing_url", "latitude", "longitude", "home_price_per_sqft")
+        if any(c not in cols for c in need):
+            return
+        i_url, i_lat, i_lon, i_ppsf = (cols[c] for c in need)
+        for row in reader:
+            lat = _float_or_none(cell(row, i_lat))
+            lon = _float_or_none(cell(row, i_lon))
+            ppsf = _float_or_none(cell(row, i_ppsf))
+            url = cell(row, i_url).strip()
+            if url and lat is not None and lon is not None and ppsf:
+                yield url, lat, lon, ppsf
+
+
+_POINTS_SQL = (
+    "SELECT s.path, c.listing_url, c.lat, c.lon, c.ppsf FROM comp_points c JOIN sources s ON s.id = c.source_id "
+    "WHERE s.kind = 'comps' AND s.scope = '' ORDER BY s.path, c.seq"
+)
+
+
+def _history_points(
+    paths: List[str], workers: Optional[int], index_path: Optional[str]
+) -> List[Tuple[str, float, float, float]]:
+    store = try_open_index(default_history_index_path() if index_path is None else index_path)
+    if store is not None:
+        try:
+            store.sync("comps", paths, _iter_history_rows)
+            by_path: Dict[str, List[Tuple[str, float, float, float]]] = {}
+            for path, url, lat, lon, ppsf in store.query(_POINTS_SQL, ()):
+                by_path.setdefault(path, []).append((url, lat, lon, ppsf))
+            # The caller's order (oldest first), not the index's path order.
+            return [point for p in paths for point in by_path.get(os.path.abspath(p), [])]
+        except sqlite3.Error as exc:
+            print(f"[comps] history index failed ({exc}); reading the daily CSVs")
+    return [point for rows in parse_files(paths, _iter_history_rows, workers=workers) for point in rows]
+
+
+def load_history(
+    paths: Sequence[str],
+    *,
+    cell_deg: float = DEFAULT_CELL_DEG,
+    workers: Optional[int] = None,
+    index_path: Optional[str] = None,
+) -> GridIndex:
+    """
+    Grid over past listings' $/sqft, applied oldest first, so a home seen on several days
+    keeps its latest asking $/sqft. Each file's points are kept in the history index file
+    (keyed by size/mtime, like the lookups), so a run only parses days that are new or were
+    rewritten since the last one. With index_path="" (or no usable index) every file is
+    parsed, in parallel (see lookup_loader).
+    """
+    index = GridIndex(cell_deg)
+    for url, lat, lon, ppsf in _history_points(list(paths), workers, index_path):
+        index.add(url, lat, lon, ppsf)
+    return index
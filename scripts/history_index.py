@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import datetime as dt
+import glob
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from lookup_index import HISTORY_COLUMNS, LookupIndex, open_index
+from lookup_loader import FileChanges, cell, header_index
+from search_plan import default_cache_dir
+
+# Queryable index over every output/YYYY/MM/DD/all_listings.csv. It lives in a
+# LookupIndex file of its own, so only daily CSVs that are new or rewritten since the
+# last query get re-read; filters and top-N are answered by SQLite from indexed columns.
+
+# Columns shown by `query` unless --columns says otherwise.
+DEFAULT_COLUMNS = ("day", "deal_rating", "price", "home_ppsf", "lot_sqft", "city", "category", "address", "listing_url")
+
+
+def default_history_index_path() -> str:
+    return os.path.join(default_cache_dir(), "history_index.sqlite3")
+
+
+def history_files(output_root: str = "output", *, exclude: Sequence[str] = ()) -> List[str]:
+    """
+    Daily all_listings.csv files under output/YYYY/MM/DD/, oldest first.
+    """
+    skip = {os.path.abspath(p) for p in exclude}
+    paths = sorted(glob.glob(os.path.join(output_root, "[0-9]" * 4, "[0-9]" * 2, "[0-9]" * 2, "all_listings.csv")))
+    return [p for p in paths if os.path.abspath(p) not in skip]
+
+
+def day_from_path(path: str) -> str:
+    """
+    output/2024/05/17/all_listings.csv -> "2024-05-17".
+    """
+    d = os.path.dirname(os.path.abspath(path))
+    dd = os.path.basename(d)
+    mm = os.path.basename(os.path.dirname(d))
+    yyyy = os.path.basename(os.path.dirname(os.path.dirname(d)))
+    return f"{yyyy}-{mm}-{dd}"
+
+
+def _int_or_none(s: str) -> Optional[int]:
+    try:
+        return int(float(s)) if s else None
+    except ValueError:
+        return None
+
+
+def _float_or_none(s: str) -> Optional[float]:
+    try:
+        return float(s) if s else None
+    except ValueError:
+        return None
+
+
+def _iter_history_rows(path: str) -> Iterator[Tuple[Any, ...]]:
+    """
+    HISTORY_COLUMNS tuples for one daily CSV. City and category are stored lower-cased
+    so filters can use the index; the listing's own city wins over the search's.
+    """
+    import csv
+
+    day = day_from_path(path)
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        reader = csv.reader(f)
+        cols = header_index(next(reader, []))
+
+        def col(name: str) -> int:
+            return cols.get(name, 1 << 30)  # missing column -> cell() returns ""
+
+        i_lcity, i_scity, i_cat, i_sid = col("listing_city"), col("search_city"), col("search_category"), col("search_id")
+        i_price, i_home, i_lot = col("listing_price"), col("home_sqft"), col("lot_sqft")
+        i_hppsf, i_lppsf, i_rating = col("home_price_per_sqft"), col("lot_price_per_sqft"), col("deal_rating")
+        i_zip, i_addr, i_parcel, i_url = col("listing_zipcode"), col("address"), col("tax_parcel_number"), col("listing_url")
+        for row in reader:
+            city = (cell(row, i_lcity) or cell(row, i_scity)).strip().lower()
+            yield (
+                day,
+                city or None,
+                cell(row, i_cat).strip().lower() or None,
+                _int_or_none(cell(row, i_sid)),
+                _int_or_none(cell(row, i_price)),
+                _int_or_none(cell(row, i_home)),
+                _int_or_none(cell(row, i_lot)),
+                _float_or_none(cell(row, i_hppsf)),
+                _float_or_none(cell(row, i_lppsf)),
+                _int_or_none(cell(row, i_rating)),
+                cell(row, i_zip).strip() or None,
+                cell(row, i_addr).strip() or None,
+                cell(row, i_parcel).strip() or None,
+                cell(row, i_url).strip() or None,
+            )
+
+
+def sync_history(index: LookupIndex, output_root: str = "output") -> FileChanges:
+    """
+    Bring the index up to date with the daily CSVs on disk (new, rewritten or deleted days).
+    """
+    return index.sync("history", history_files(output_root), _iter_history_rows)
+
+
+@dataclass(frozen=True)
+class HistoryQuery:
+    """
+    Filters for `query`. Ranges are inclusive; None means unbounded. Text filters match
+    case-insensitively. By default each listing appears once, as its latest matching day.
+    """
+
+    since: Optional[str] = None  # YYYY-MM-DD
+    until: Optional[str] = None
+    cities: Tuple[str, ...] = ()
+    categories: Tuple[str, ...] = ()
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    max_ppsf: Optional[float] = None
+    min_lot_sqft: Optional[int] = None
+    min_rating: Optional[int] = None
+    zipcodes: Tuple[str, ...] = ()
+    limit: int = 20
+    every_day: bool = False
+
+
+def build_sql(q: HistoryQuery, columns: Sequence[str] = DEFAULT_COLUMNS) -> Tuple[str, Tuple[Any, ...]]:
+    bad = [c for c in columns if c not in HISTORY_COLUMNS]
+    if bad:
+        raise ValueError(f"unknown column(s): {', '.join(bad)} (choose from {', '.join(HISTORY_COLUMNS)})")
+
+    def conditions(alias: str) -> Tuple[List[str], List[Any]]:
+        where: List[str] = []
+        params: List[Any] = []
+
+        def add(cond: str, *values: Any) -> None:
+            where.append(f"{alias}.{cond}")
+            params.extend(values)
+
+        def add_in(col: str, values: Sequence[str]) -> None:
+            if values:
+                add(f"{col} IN ({', '.join('?' for _ in values)})", *values)
+
+        if q.since:
+            add("day >= ?", q.since)
+        if q.until:
+            add("day <= ?", q.until)
+        add_in("city", [c.strip().lower() for c in q.cities])
+        add_in("category", [c.strip().lower() for c in q.categories])
+        add_in("zipcode", [z.strip() for z in q.zipcodes])
+        if q.min_price is not None:
+            add("price >= ?", q.min_price)
+        if q.max_price is not None:
+            add("price <= ?", q.max_price)
+        if q.max_ppsf is not None:
+            add("home_ppsf <= ?", q.max_ppsf)
+        if q.min_lot_sqft is not None:
+            add("lot_sqft >= ?", q.min_lot_sqft)
+        if q.min_rating is not None:
+            add("deal_rating >= ?", q.min_rating)
+        return where, params
+
+    where, params = conditions("l")
+    if not q.every_day:
+        # Keep a row only if no later day of the same listing also matches. Candidates are
+        # checked in rating order against the (listing_url, day) index, so a top-N query
+        # stops after roughly N probes instead of grouping the whole archive.
+        later, later_params = conditions("n")
+        # rowid breaks ties if a hand-edited day lists the same URL twice.
+        later_sql = " AND ".join(["n.listing_url = l.listing_url", "(n.day, n.rowid) > (l.day, l.rowid)"] + later)
+        where.append(f"NOT EXISTS (SELECT 1 FROM listings AS n WHERE {later_sql})")
+        params.extend(later_params)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    select = ", ".join(f"l.{c}" for c in columns)
+    sql = f"SELECT {select} FROM listings AS l {where_sql} ORDER BY l.deal_rating DESC, l.day DESC, l.listing_url LIMIT ?"
+    params.append(max(0, q.limit))
+    return sql, tuple(params)
+
+
+def query_history(
+    q: HistoryQuery,
+    *,
+    columns: Sequence[str] = DEFAULT_COLUMNS,
+    output_root: str = "output",
+    index_path: Optional[str] = None,
+    sync: bool = True,
+) -> List[Dict[str, Any]]:
+    index = open_index(index_path or default_history_index_path())
+    if sync:
+        changes = sync_history(index, output_root)
+        if changes:
+            print(f"[history] index updated ({changes.describe()})")
+    sql, params = build_sql(q, columns)
+    return [dict(zip(columns, row)) for row in index.query(sql, params)]
+
+
+def days_ago(n: int, *, today: Optional[dt.date] = None) -> str:
+    return ((today or dt.date.today()) - dt.timedelta(days=n)).isoformat()
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import hashlib
+import os
 import random
+import sqlite3
+import threading
 import time
+import zlib
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from search_plan import default_cache_dir
 
 
 DEFAULT_USER_AGENTS = [
@@ -17,6 +26,32 @@ DEFAULT_USER_AGENTS = [
 ]
 
 
+REDFIN_ORIGIN = "https://www.redfin.com"
+
+
+def redfin_origin() -> str:
+    """
+    Origin to send Redfin requests to. REDFIN_ORIGIN points the scraper at a stand-in
+    server (see standin_server.py) for offline testing and benchmarks.
+    """
+    return os.getenv("REDFIN_ORIGIN", "").strip().rstrip("/") or REDFIN_ORIGIN
+
+
+def with_origin(url: str, origin: Optional[str] = None) -> str:
+    """
+    Rewrite a redfin.com URL onto `origin` (default: redfin_origin()); other URLs pass through.
+    """
+    origin = origin or redfin_origin()
+    if origin == REDFIN_ORIGIN:
+        return url
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    if host != "redfin.com" and not host.endswith(".redfin.com"):
+        return url
+    o = urlsplit(origin)
+    return urlunsplit((o.scheme, o.netloc, parts.path, parts.query, parts.fragment))
+
+
 @dataclass(frozen=True)
 class FetchResult:
     url: str
@@ -24,6 +59,337 @@ class FetchResult:
     text: str
     elapsed_s: float
     error: Optional[str] = None
+    # True when the server answered 304 and `text` is the cached body (status_code is 200).
+    not_modified: bool = False
+
+
+def make_session(pool_size: int = 10) -> requests.Session:
+    """
+    Session whose connection pools hold `pool_size` connections per host, so that many
+    concurrent fetches reuse connections instead of opening (and discarding) extra ones.
+    """
+    sess = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max(1, pool_size), pool_maxsize=max(1, pool_size))
+    sess.mount("http://", adapter)
+    sess.mount("https://", adapter)
+    return sess
+
+
+def default_http_cache_path() -> str:
+    """
+    Location of the response validator cache. REDFIN_HTTP_CACHE overrides it;
+    set it to 0/off/false to disable conditional requests.
+    """
+    env = os.getenv("REDFIN_HTTP_CACHE", "").strip()
+    if env.lower() in ("0", "off", "false", "no"):
+        return ""
+    return env or os.path.join(default_cache_dir(), "http_cache.sqlite3")
+
+
+def _body_sha1(body: str) -> str:
+    return hashlib.sha1(body.encode("utf-8", errors="replace")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent url -> (ETag, Last-Modified, body) for conditional requests: fetch_html
+    sends the validators back, and a 304 answer reuses the stored body instead of
+    transferring it again. Bodies are stored zlib-compressed. Callers can also keep the
+    parse of a body (put_parsed / parsed), so a 304 skips re-parsing the same page.
+
+    The cache only saves transfers: when the file is locked (another run, shard or
+    `watch` is writing it) or unreadable, reads act as misses and writes are skipped,
+    with one message per cache, so a fetch never fails because of it.
+    """
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._warned = False
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, stored_at REAL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS parsed (url TEXT PRIMARY KEY, body_sha1 TEXT, data BLOB)")
+
+    @classmethod
+    def open_default(cls) -> Optional["ResponseCache"]:
+        path = default_http_cache_path()
+        if not path:
+            return None
+        try:
+            return cls(path)
+        except (OSError, sqlite3.Error) as exc:
+            print(f"[http] response cache unavailable ({exc}); sending unconditional requests")
+            return None
+
+    def _failed(self, what: str, exc: Exception) -> None:
+        if not self._warned:
+            self._warned = True
+            print(f"[http] response cache {what} failed ({exc}); carrying on without it")
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """
+        Conditional request headers for `url` (empty when nothing usable is cached).
+        """
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT etag, last_modified FROM responses WHERE url = ?", (url,)).fetchone()
+        except sqlite3.Error as exc:
+            self._failed("read", exc)
+            return {}
+        headers: Dict[str, str] = {}
+        if row is not None:
+            if row[0]:
+                headers["If-None-Match"] = row[0]
+            if row[1]:
+                headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def body(self, url: str) -> Optional[str]:
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT body FROM responses WHERE url = ?", (url,)).fetchone()
+            return zlib.decompress(row[0]).decode("utf-8") if row is not None else None
+        except (sqlite3.Error, zlib.error, UnicodeDecodeError) as exc:
+            self._failed("read", exc)
+            return None
+
+    def urls(self) -> List[str]:
+        try:
+            with self._lock:
+                return [row[0] for row in self._conn.execute("SELECT url FROM responses ORDER BY url")]
+        except sqlite3.Error as exc:
+            self._failed("read", exc)
+            return []
+
+    def put(self, url: str, *, etag: Optional[str], last_modified: Optional[str], body: str) -> None:
+        if not etag and not last_modified:
+            return  # nothing to revalidate with next time
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (url, etag, last_modified, body, stored_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, etag, last_modified, zlib.compress(body.encode("utf-8"), 6), time.time()),
+                )
+        except sqlite3.Error as exc:
+            self._failed("write", exc)
+
+    def parsed(self, url: str, body: str) -> Optional[str]:
+        """
+        The data stored by put_parsed() for `url`, if it was stored for this same body.
+        """
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT body_sha1, data FROM parsed WHERE url = ?", (url,)).fetchone()
+            if row is None or row[0] != _body_sha1(body):
+                return None
+            return zlib.decompress(row[1]).decode("utf-8")
+        except (sqlite3.Error, zlib.error, UnicodeDecodeError) as exc:
+            self._failed("read", exc)
+            return None
+
+    def put_parsed(self, url: str, body: str, data: str) -> None:
+        """
+        Keep `data` (a caller-serialized parse of `body`) next to the response for `url`.
+        Nothing is stored when the response itself isn't cached (no validators to revalidate with).
+        """
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO parsed (url, body_sha1, data) "
+                    "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM responses WHERE url = ?)",
+                    (url, _body_sha1(body), zlib.compress(data.encode("utf-8"), 6), url),
+                )
+        except sqlite3.Error as exc:
+            self._failed("write", exc)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RateLimiter:
+    """
+    Spaces out request starts across every thread that shares it: each wait() reserves
+    the next slot, a random gap of [min_delay_s, max_delay_s] after the previous one.
+    """
+
+    def __init__(self, min_delay_s: float, max_delay_s: float) -> None:
+        self.min_delay_s = max(0.0, min_delay_s)
+        self.max_delay_s = max(self.min_delay_s, max_delay_s)
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self) -> float:
+        """
+        Block until this caller's slot; returns the seconds slept.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_at)
+            self._next_at = slot + random.uniform(self.min_delay_s, self.max_delay_s)
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+# Statuses that mean "this egress is being blocked", as opposed to a server-side problem.
+BLOCK_STATUSES = (403, 405, 429)
+
+
+@dataclass
+class ProxyState:
+    """
+    Live health of one egress (a proxy URL, or None for a direct connection).
+    Latency and failure rate are exponentially weighted so recent behaviour dominates.
+    """
+
+    proxy: Optional[str]
+    session: requests.Session
+    latency_s: Optional[float] = None
+    failure_rate: float = 0.0
+    requests: int = 0
+    blocked: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    consecutive_failures: int = 0
+    quarantined_until: float = 0.0
+
+    @property
+    def label(self) -> str:
+        if self.proxy is None:
+            return "direct"
+        parts = urlsplit(self.proxy)
+        return f"{parts.hostname}:{parts.port}" if parts.port else (parts.hostname or self.proxy)
+
+    def score(self, default_latency_s: float) -> float:
+        latency = self.latency_s if self.latency_s is not None else default_latency_s
+        return (1.0 - self.failure_rate) / (1.0 + latency) / (1.0 + self.in_flight)
+
+
+class ProxyPool:
+    """
+    Routes requests across several egresses, each with its own Session (and so its own
+    cookies and connection pool). Every response updates that egress's health; acquire()
+    picks the best score among those not in quarantine, discounted by requests already in
+    flight so concurrent fetches spread out. A blocked or failing egress is quarantined
+    for quarantine_s, doubling on each consecutive failure (capped at max_quarantine_s).
+    """
+
+    def __init__(
+        self,
+        proxies: List[Optional[str]],
+        *,
+        quarantine_s: float = 60.0,
+        max_quarantine_s: float = 900.0,
+        alpha: float = 0.3,
+        pool_size: int = 10,
+    ) -> None:
+        if not proxies:
+            raise ValueError("ProxyPool needs at least one proxy (None = direct)")
+        self.quarantine_s = quarantine_s
+        self.max_quarantine_s = max_quarantine_s
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._states: List[ProxyState] = []
+        for proxy in proxies:
+            sess = make_session(pool_size)
+            # Each egress is explicit; don't let HTTP(S)_PROXY from the environment override it.
+            sess.trust_env = False
+            if proxy is not None:
+                sess.proxies = {"http": proxy, "https": proxy}
+            self._states.append(ProxyState(proxy=proxy, session=sess))
+
+    @classmethod
+    def from_env(cls, *, pool_size: int = 10) -> Optional["ProxyPool"]:
+        """
+        Pool from REDFIN_PROXIES (comma-separated proxy URLs; "direct" adds a no-proxy
+        egress). Returns None when unset, leaving requests' usual HTTP(S)_PROXY handling.
+        """
+        raw = os.getenv("REDFIN_PROXIES", "").strip()
+        if not raw:
+            return None
+        proxies: List[Optional[str]] = []
+        for item in raw.split(","):
+            item = item.strip()
+            if item:
+                proxies.append(None if item.lower() == "direct" else item)
+        try:
+            quarantine_s = float(os.getenv("REDFIN_PROXY_QUARANTINE_S", "60").strip())
+        except Exception:
+            quarantine_s = 60.0
+        return cls(proxies, quarantine_s=quarantine_s, pool_size=pool_size) if proxies else None
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def acquire(self) -> ProxyState:
+        """
+        The healthiest egress not in quarantine (or, if all are, the one released soonest).
+        Pair every acquire() with a release().
+        """
+        with self._lock:
+            now = time.monotonic()
+            known = sorted(s.latency_s for s in self._states if s.latency_s is not None)
+            default_latency = known[len(known) // 2] if known else 1.0
+            open_states = [s for s in self._states if s.quarantined_until <= now]
+            if open_states:
+                best = max(open_states, key=lambda s: (s.score(default_latency), -s.requests))
+            else:
+                best = min(self._states, key=lambda s: s.quarantined_until)
+            best.in_flight += 1
+            return best
+
+    def release(self, state: ProxyState, *, status: Optional[int], elapsed_s: float) -> None:
+        """
+        Record the outcome of a request made through `state`: an HTTP status, or None
+        when the connection itself failed.
+        """
+        a = self.alpha
+        with self._lock:
+            state.in_flight = max(0, state.in_flight - 1)
+            state.requests += 1
+            failed = status is None or status in BLOCK_STATUSES
+            if status is None:
+                state.errors += 1
+            elif status in BLOCK_STATUSES:
+                state.blocked += 1
+            if status is not None and not failed:
+                state.latency_s = elapsed_s if state.latency_s is None else (1 - a) * state.latency_s + a * elapsed_s
+            state.failure_rate = (1 - a) * state.failure_rate + a * (1.0 if failed else 0.0)
+            if failed:
+                state.consecutive_failures += 1
+                hold = min(self.max_quarantine_s, self.quarantine_s * (2 ** (state.consecutive_failures - 1)))
+                state.quarantined_until = time.monotonic() + hold
+            else:
+                state.consecutive_failures = 0
+
+    def has_open(self, *, exclude: Optional[ProxyState] = None) -> bool:
+        """
+        Whether some egress (other than `exclude`) is out of quarantine right now.
+        """
+        with self._lock:
+            now = time.monotonic()
+            return any(s.quarantined_until <= now and s is not exclude for s in self._states)
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                s.label: {
+                    "requests": s.requests,
+                    "blocked": s.blocked,
+                    "errors": s.errors,
+                    "latency_s": round(s.latency_s, 3) if s.latency_s is not None else None,
+                    "failure_rate": round(s.failure_rate, 3),
+                    "quarantined_s": round(max(0.0, s.quarantined_until - now), 1),
+                }
+                for s in self._states
+            }
 
 
 def _sleep_with_jitter(base_s: float, jitter_s: float = 0.25) -> None:
@@ -41,10 +407,17 @@ def fetch_html(
     backoff_multiplier: float = 1.8,
     raise_on_failure: bool = True,
     verbose: bool = False,
+    proxy_pool: Optional[ProxyPool] = None,
+    cache: Optional[ResponseCache] = None,
 ) -> FetchResult:
     """
     Fetch HTML with rotating user agents and exponential backoff.
     Retries on common rate-limit / transient statuses.
+    With `cache`, the request carries the ETag / Last-Modified stored for `url`; a 304
+    returns the stored body (status 200, not_modified=True) and a 200 refreshes the entry.
+    With `proxy_pool`, each attempt goes out through the pool's healthiest egress (its
+    session replaces `session`); after a block the retry moves straight to another egress
+    instead of backing off, as long as one is out of quarantine.
     """
     uas = list(user_agents) if user_agents is not None else list(DEFAULT_USER_AGENTS)
     if not uas:
@@ -55,14 +428,13 @@ def fetch_html(
     last_status: Optional[int] = None
     last_text: str = ""
     last_elapsed: float = 0.0
+    conditional = cache.validators(url) if cache is not None else {}
 
     for attempt in range(1, max_attempts + 1):
         headers = {
             "User-Agent": random.choice(uas),
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "Accept-Language": "en-US,en;q=0.9",
-            "Cache-Control": "no-cache",
-            "Pragma": "no-cache",
             "DNT": "1",
             "Upgrade-Insecure-Requests": "1",
             "Referer": "https://www.redfin.com/",
@@ -70,25 +442,53 @@ def fetch_html(
             "Sec-Fetch-Mode": "navigate",
             "Sec-Fetch-Site": "same-origin",
             "Sec-Fetch-User": "?1",
+            **conditional,
         }
+        lease = proxy_pool.acquire() if proxy_pool is not None else None
+        if lease is not None:
+            sess = lease.session
+        status: Optional[int] = None
         t0 = time.time()
         try:
             if verbose:
-                print(f"[fetch] attempt {attempt}/{max_attempts}: GET {url}")
+                via = f" via {lease.label}" if lease is not None else ""
+                print(f"[fetch] attempt {attempt}/{max_attempts}: GET {url}{via}")
             resp = sess.get(url, headers=headers, timeout=timeout_s)
             elapsed = time.time() - t0
+            status = resp.status_code
             last_status = resp.status_code
             last_elapsed = elapsed
             last_text = resp.text or ""
             if resp.status_code in (200,):
+                if cache is not None:
+                    cache.put(
+                        url,
+                        etag=resp.headers.get("ETag"),
+                        last_modified=resp.headers.get("Last-Modified"),
+                        body=resp.text,
+                    )
                 return FetchResult(url=url, status_code=resp.status_code, text=resp.text, elapsed_s=elapsed)
+            if resp.status_code == 304 and cache is not None:
+                cached = cache.body(url)
+                if cached is not None:
+                    return FetchResult(url=url, status_code=200, text=cached, elapsed_s=elapsed, not_modified=True)
+                # Entry vanished between validators() and now; ask again without validators.
+                conditional = {}
+                continue
 
             # Retryable statuses: rate limit, forbidden, transient server errors
             if resp.status_code in (403, 405, 429, 500, 502, 503, 504):
+                if lease is not None and resp.status_code in BLOCK_STATUSES and proxy_pool.has_open(exclude=lease):
+                    # This egress gets quarantined on release; retry right away through another.
+                    if verbose:
+                        print(f"[fetch] got HTTP {resp.status_code} via {lease.label}; switching egress")
+                    continue
+                if attempt == max_attempts:
+                    continue  # no retry follows, so skip the warm-up request and the backoff
                 # "Warm up" cookies on block-like responses (helps in some environments)
-                if resp.status_code in (403, 405, 429):
+                if resp.status_code in BLOCK_STATUSES:
                     try:
-                        sess.get("https://www.redfin.com/", headers=headers, timeout=timeout_s)
+                        sess.get(with_origin("https://www.redfin.com/"), headers=headers, timeout=timeout_s)
                     except Exception:
                         pass
                 sleep_s = backoff_base_s * (backoff_multiplier ** (attempt - 1))
@@ -99,13 +499,22 @@ def fetch_html(
 
             # Non-retryable
             return FetchResult(url=url, status_code=resp.status_code, text=resp.text, elapsed_s=elapsed)
-        except (requests.Timeout, requests.ConnectionError, requests.SSLError) as exc:
+        except (requests.Timeout, requests.ConnectionError, requests.exceptions.SSLError) as exc:
             last_exc = exc
+            if lease is not None and proxy_pool.has_open(exclude=lease):
+                if verbose:
+                    print(f"[fetch] error {type(exc).__name__} via {lease.label}; switching egress")
+                continue
+            if attempt == max_attempts:
+                continue
             sleep_s = backoff_base_s * (backoff_multiplier ** (attempt - 1))
             if verbose:
                 print(f"[fetch] error {type(exc).__name__}: {exc}; retrying after {sleep_s:.1f}s")
             _sleep_with_jitter(sleep_s)
             continue
+        finally:
+            if lease is not None:
+                proxy_pool.release(lease, status=status, elapsed_s=time.time() - t0)
 
     msg_parts = [f"Failed to fetch {url} after {max_attempts} attempts"]
     if last_status is not None:
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from search_plan import default_cache_dir
+
+if TYPE_CHECKING:
+    import requests
+
+    from http_client import ProxyPool, RateLimiter
+    from row_batch import RowBatch
+
+
+# Fields a home page can fill in that search-result payloads usually lack.
+DETAIL_FIELDS = ("zoning", "mls_listing_id")
+
+_MLS_TEXT_RE = re.compile(r"\bMLS\s*#\s*:?\s*([A-Za-z0-9][A-Za-z0-9-]{2,20})")
+_ZONING_TEXT_RE = re.compile(r"\bZoning(?:\s+Code)?\s*:\s*([A-Za-z0-9][A-Za-z0-9 ./-]{0,24}[A-Za-z0-9])")
+
+
+def default_cache_path() -> str:
+    return os.path.join(default_cache_dir(), "listing_details.sqlite3")
+
+
+class DetailCache:
+    """
+    Persistent listing_url -> detail fields. A URL is stored once it has been fetched
+    successfully (even if the page had nothing useful), so each home is fetched at most once.
+    """
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS details (url TEXT PRIMARY KEY, fetched_at REAL, status INTEGER, fields TEXT)"
+            )
+
+    def get_many(self, urls: List[str], *, chunk_size: int = 500) -> Dict[str, Dict[str, Optional[str]]]:
+        out: Dict[str, Dict[str, Optional[str]]] = {}
+        with self._lock:
+            for i in range(0, len(urls), chunk_size):
+                chunk = urls[i : i + chunk_size]
+                sql = f"SELECT url, fields FROM details WHERE url IN ({', '.join('?' for _ in chunk)})"
+                for url, fields in self._conn.execute(sql, tuple(chunk)):
+                    out[url] = json.loads(fields)
+        return out
+
+    def put(self, url: str, status: int, fields: Dict[str, Optional[str]]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO details (url, fetched_at, status, fields) VALUES (?, ?, ?, ?)",
+                (url, time.time(), status, json.dumps(fields)),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _first_key(blobs: List[Any], keys: tuple[str, ...]) -> Optional[str]:
+    from redfin_scraper import _unwrap_value, _walk
+
+    for blob in blobs:
+        for node in _walk(blob):
+            if not isinstance(node, dict):
+                continue
+            for k in keys:
+                if k not in node:
+                    continue
+                val = _unwrap_value(node.get(k))
+                if isinstance(val, (str, int)) and not isinstance(val, bool) and str(val).strip():
+                    return str(val).strip()
+    return None
+
+
+def parse_listing_details(html: str) -> Dict[str, Optional[str]]:
+    """
+    Best-effort zoning / MLS id from a Redfin home page: embedded JSON first,
+    then the "MLS#" / "Zoning:" labels in the visible text.
+    """
+    from bs4 import BeautifulSoup
+
+    from redfin_scraper import _extract_initial_context_from_scripts, _extract_json_blobs_from_scripts
+
+    blobs: List[Any] = _extract_json_blobs_from_scripts(html) + _extract_initial_context_from_scripts(html)
+    zoning = _first_key(blobs, ("zoning", "zoningCode", "zoningDescription"))
+    mls_id = _first_key(blobs, ("mlsId", "mlsListingId", "listingMlsId"))
+
+    if zoning is None or mls_id is None:
+        text = " ".join(BeautifulSoup(html, "html.parser").get_text(" ", strip=True).split())
+        if mls_id is None:
+            m = _MLS_TEXT_RE.search(text)
+            mls_id = m.group(1) if m else None
+        if zoning is None:
+            m = _ZONING_TEXT_RE.search(text)
+            zoning = m.group(1).strip() if m else None
+    return {"zoning": zoning, "mls_listing_id": mls_id}
+
+
+def _needs_details(batch: "RowBatch", i: int) -> bool:
+    return any(not batch.get(i, f) for f in DETAIL_FIELDS)
+
+
+def _apply(batch: "RowBatch", i: int, fields: Dict[str, Optional[str]]) -> bool:
+    changed = False
+    for f in DETAIL_FIELDS:
+        if not batch.get(i, f) and fields.get(f):
+            batch.set(i, f, fields[f])
+            changed = True
+    return changed
+
+
+def enrich_listing_details(
+    batch: "RowBatch",
+    *,
+    session: "requests.Session",
+    limiter: "RateLimiter",
+    budget: int,
+    workers: int = 4,
+    cache: Optional[DetailCache] = None,
+    timeout_s: float = 25.0,
+    verbose: bool = False,
+    proxy_pool: Optional["ProxyPool"] = None,
+) -> Dict[str, int]:
+    """
+    Fill zoning / mls_listing_id in place for batch rows missing them, from the home page at
+    listing_url. Cached URLs cost nothing; at most `budget` uncached pages are fetched,
+    `workers` at a time, each one waiting on the shared rate limiter first. Each page gets a
+    single request (no retries, no warm-up), so the budget and the limiter count every request;
+    a failed page isn't cached and is tried again on a later run.
+    Returns counts for logging.
+    """
+    from http_client import fetch_html
+
+    wanted: Dict[str, List[int]] = {}
+    for i, url in enumerate(batch.column("listing_url")):
+        url = (url or "").strip()
+        if url and _needs_details(batch, i):
+            wanted.setdefault(url, []).append(i)
+
+    stats = {"candidates": len(wanted), "cache_hits": 0, "fetched": 0, "failed": 0, "filled": 0}
+    if not wanted:
+        return stats
+
+    cached = cache.get_many(list(wanted)) if cache is not None else {}
+    for url, fields in cached.items():
+        stats["cache_hits"] += 1
+        for i in wanted[url]:
+            stats["filled"] += int(_apply(batch, i, fields))
+
+    to_fetch = [u for u in wanted if u not in cached][: max(0, budget)]
+
+    def fetch_one(url: str) -> Optional[Dict[str, Optional[str]]]:
+        limiter.wait()
+        try:
+            res = fetch_html(
+                url,
+                session=session,
+                timeout_s=timeout_s,
+                max_attempts=1,
+                raise_on_failure=False,
+                verbose=verbose,
+                proxy_pool=proxy_pool,
+            )
+        except Exception as exc:  # one bad page shouldn't sink the run
+            if verbose:
+                print(f"[details] {url}: {type(exc).__name__}: {exc}")
+            return None
+        if res.status_code == 200:
+            fields = parse_listing_details(res.text)
+        elif res.status_code in (404, 410):
+            fields = {f: None for f in DETAIL_FIELDS}  # gone for good; don't ask again
+        else:
+            return None
+        if cache is not None:
+            cache.put(url, res.status_code, fields)
+        return fields
+
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="details") as pool:
+            for url, fields in zip(to_fetch, pool.map(fetch_one, to_fetch)):
+                if fields is None:
+                    stats["failed"] += 1
+                    continue
+                stats["fetched"] += 1
+                for i in wanted[url]:
+                    stats["filled"] += int(_apply(batch, i, fields))
+    return stats
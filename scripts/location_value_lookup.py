@@ -1,9 +1,19 @@
 from __future__ import annotations
 
 import csv
+import json
 import os
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left
 from dataclasses import dataclass
-from typing import Dict, Iterable, Optional
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from lookup_index import LookupIndex, source_scope, try_open_index
+from lookup_loader import FileChanges, FileSetCache, cell, header_index
+
+_INT64_MAX = 2**63 - 1
 
 
 def normalize_taxparcelnumber(val: Optional[str]) -> str:
@@ -22,7 +32,7 @@ def _iter_csv_files(root_dir: str) -> Iterable[str]:
 @dataclass(frozen=True)
 class LocationValueLookup:
     # taxparcelnumber -> location_value
-    by_parcel: Dict[str, str]
+    by_parcel: Mapping[str, str]
 
     def find(self, taxparcelnumber: Optional[str]) -> Optional[str]:
         k = normalize_taxparcelnumber(taxparcelnumber)
@@ -30,61 +40,294 @@ class LocationValueLookup:
             return None
         return self.by_parcel.get(k)
 
+    def find_many(self, taxparcelnumbers: Sequence[Optional[str]]) -> List[Optional[str]]:
+        """
+        Column-wise find(): one value (or None) per input position, each distinct parcel looked up once.
+        """
+        results: Dict[str, Optional[str]] = {}
+        out: List[Optional[str]] = []
+        for val in taxparcelnumbers:
+            k = normalize_taxparcelnumber(val)
+            if not k:
+                out.append(None)
+                continue
+            if k not in results:
+                results[k] = self.by_parcel.get(k)
+            out.append(results[k])
+        return out
 
-def load_location_value_lookup(
-    *,
-    lookups_dirs: Iterable[str] = ("lookups/location", "lookups/Location"),
-) -> LocationValueLookup:
+
+def _parcel_to_int(parcel: str) -> Optional[int]:
     """
-    Loads all CSV files in lookups/location (excluding *.csv.example) and builds:
-      taxparcelnumber -> location_value
+    Parcel ids that round-trip through int() ("320151211", not "0320151211" or "32-015")
+    go into the packed int64 table; anything else uses the fallback dict.
+    """
+    if not parcel.isascii() or not parcel.isdigit():
+        return None
+    if len(parcel) > 1 and parcel[0] == "0":
+        return None
+    n = int(parcel)
+    return n if n <= _INT64_MAX else None
+
+
+def _code_typecode(n_categories: int) -> str:
+    if n_categories <= 1 << 8:
+        return "B"
+    if n_categories <= 1 << 16:
+        return "H"
+    return "L"
+
+
+class CompactValueTable(Mapping[str, str]):
+    """
+    taxparcelnumber -> location_value stored as a sorted int64 key array plus a small
+    integer code per key into a category table (values like "Low"/"High" repeat a lot).
+    Around 9 bytes per numeric parcel instead of two str objects and a dict slot.
+    Lookups are a binary search; non-numeric parcel ids fall back to a plain dict.
     """
-    mapping: Dict[str, str] = {}
 
-    dirs = [d for d in lookups_dirs if isinstance(d, str) and os.path.isdir(d)]
-    if not dirs:
-        return LocationValueLookup(by_parcel=mapping)
+    def __init__(self, keys: array, codes: array, categories: List[str], extra: Dict[str, str]) -> None:
+        self._keys = keys
+        self._codes = codes
+        self._categories = categories
+        self._extra = extra
 
-    paths: list[str] = []
-    for d in dirs:
-        paths.extend(list(_iter_csv_files(d)))
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[str, str]]) -> "CompactValueTable":
+        """
+        Build from (parcel, value) pairs in precedence order; the first pair per parcel wins.
+        """
+        keys = array("q")
+        codes = array("L")
+        categories: List[str] = []
+        category_codes: Dict[str, int] = {}
+        extra: Dict[str, str] = {}
+        for parcel, value in pairs:
+            code = category_codes.get(value)
+            if code is None:
+                code = len(categories)
+                category_codes[value] = code
+                categories.append(value)
+            n = _parcel_to_int(parcel)
+            if n is None:
+                extra.setdefault(parcel, categories[code])
+                continue
+            keys.append(n)
+            codes.append(code)
 
-    for path in sorted(set(paths)):
-        with open(path, "r", encoding="utf-8-sig", newline="") as f:
-            reader = csv.DictReader(f)
-            if not reader.fieldnames:
+        # Stable sort keeps the earliest pair first among equal keys; then drop the rest.
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        sorted_keys = array("q")
+        sorted_codes = array(_code_typecode(len(categories)))
+        last: Optional[int] = None
+        for i in order:
+            k = keys[i]
+            if k == last:
                 continue
+            last = k
+            sorted_keys.append(k)
+            sorted_codes.append(codes[i])
+        return cls(sorted_keys, sorted_codes, categories, extra)
+
+    def to_record(self) -> Tuple[bytes, bytes, str, str, str]:
+        return (
+            self._keys.tobytes(),
+            self._codes.tobytes(),
+            self._codes.typecode,
+            json.dumps(self._categories),
+            json.dumps(self._extra),
+        )
+
+    @classmethod
+    def from_record(cls, keys: bytes, codes: bytes, code_type: str, categories: str, extra: str) -> "CompactValueTable":
+        k = array("q")
+        k.frombytes(keys)
+        c = array(code_type)
+        c.frombytes(codes)
+        return cls(k, c, json.loads(categories), json.loads(extra))
+
+    @property
+    def nbytes(self) -> int:
+        return self._keys.itemsize * len(self._keys) + self._codes.itemsize * len(self._codes)
+
+    def __getitem__(self, parcel: str) -> str:
+        n = _parcel_to_int(parcel)
+        if n is None:
+            return self._extra[parcel]
+        i = bisect_left(self._keys, n)
+        if i < len(self._keys) and self._keys[i] == n:
+            return self._categories[self._codes[i]]
+        raise KeyError(parcel)
+
+    def __iter__(self) -> Iterator[str]:
+        for k in self._keys:
+            yield str(k)
+        yield from self._extra
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._extra)
+
 
-            # Case-insensitive header access
-            field_map = {name.lower().strip(): name for name in reader.fieldnames}
-            if "taxparcelnumber" not in field_map:
+class SegmentedValueTable(Mapping[str, str]):
+    """
+    One CompactValueTable per source file, consulted in stable filename order (first match wins).
+    """
+
+    def __init__(self, segments: Sequence[CompactValueTable]) -> None:
+        self._segments = list(segments)
+
+    def __getitem__(self, parcel: str) -> str:
+        for seg in self._segments:
+            try:
+                return seg[parcel]
+            except KeyError:
                 continue
+        raise KeyError(parcel)
+
+    def __iter__(self) -> Iterator[str]:
+        seen: set[str] = set()
+        for seg in self._segments:
+            for k in seg:
+                if k not in seen:
+                    seen.add(k)
+                    yield k
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+_SEGMENTS_SQL = (
+    "SELECT l.keys, l.codes, l.code_type, l.categories, l.extra FROM location_segments l "
+    "JOIN sources s ON s.id = l.source_id WHERE s.kind = 'location' AND s.scope = ? ORDER BY s.path"
+)
 
-            # Determine which column contains the location value
-            value_col: Optional[str] = None
-            for preferred in ("location_value", "value"):
-                if preferred in field_map:
-                    value_col = field_map[preferred]
-                    break
-
-            if value_col is None:
-                # If there's exactly one non-tax column, use it.
-                non_tax = [n for n in reader.fieldnames if n != field_map["taxparcelnumber"]]
-                if len(non_tax) == 1:
-                    value_col = non_tax[0]
-                else:
-                    # Can't infer; ignore this file
-                    continue
-
-            for row in reader:
-                parcel = normalize_taxparcelnumber(row.get(field_map["taxparcelnumber"]))
-                if not parcel:
-                    continue
-                value = (row.get(value_col) or "").strip()
-                if not value:
-                    continue
-                # First match wins across files (stable filename sort)
-                mapping.setdefault(parcel, value)
-
-    return LocationValueLookup(by_parcel=mapping)
 
+def _iter_location_segments(path: str) -> Iterator[Tuple[bytes, bytes, str, str, str]]:
+    """
+    Index row iterator: the whole file becomes one compact segment.
+    """
+    yield CompactValueTable.from_pairs(_iter_location_rows(path)).to_record()
+
+
+def _iter_location_rows(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (taxparcelnumber, location_value) for one CSV, in file order.
+    Only the two needed columns are read; files whose value column can't be
+    determined yield nothing.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+
+        # Case-insensitive header access
+        field_map = header_index(header)
+        if "taxparcelnumber" not in field_map:
+            return
+        tax_i = field_map["taxparcelnumber"]
+
+        # Determine which column contains the location value
+        value_i: Optional[int] = None
+        for preferred in ("location_value", "value"):
+            if preferred in field_map:
+                value_i = field_map[preferred]
+                break
+
+        if value_i is None:
+            # If there's exactly one non-tax column, use it.
+            non_tax = [i for i, n in enumerate(header) if n != header[tax_i]]
+            if len(non_tax) == 1:
+                value_i = non_tax[0]
+            else:
+                # Can't infer; ignore this file
+                return
+
+        for row in reader:
+            parcel = normalize_taxparcelnumber(cell(row, tax_i))
+            if not parcel:
+                continue
+            value = cell(row, value_i).strip()
+            if not value:
+                continue
+            yield parcel, value
+
+
+class LocationValueLookupReloader:
+    """
+    Owns the LocationValueLookup for the location dirs and keeps it current. Each file is
+    its own segment, so refresh() only re-reads added/changed files, drops removed ones,
+    and swaps `lookup` in a single assignment (filename-order precedence is unchanged).
+    """
+
+    def __init__(
+        self,
+        *,
+        lookups_dirs: Iterable[str] = ("lookups/location", "lookups/Location"),
+        index_path: Optional[str] = None,
+    ) -> None:
+        self.lookups_dirs = list(lookups_dirs)
+        self._index_path = index_path
+        self._index: Optional[LookupIndex] = None
+        self._use_index = True
+        self._cache: Optional[FileSetCache] = None
+        self._lock = threading.Lock()
+        self.lookup = LocationValueLookup(by_parcel={})
+        self.refresh()
+
+    def _paths(self) -> List[str]:
+        dirs = [d for d in self.lookups_dirs if isinstance(d, str) and os.path.isdir(d)]
+        paths: list[str] = []
+        for d in dirs:
+            paths.extend(list(_iter_csv_files(d)))
+        return sorted(set(paths))
+
+    def refresh(self) -> FileChanges:
+        with self._lock:
+            paths = self._paths()
+            if not paths and self._index is None and self._cache is None:
+                return FileChanges()
+
+            if self._use_index and self._index is None:
+                self._index = try_open_index(self._index_path)
+                self._use_index = self._index is not None
+            if self._index is not None:
+                try:
+                    first = not isinstance(self.lookup.by_parcel, SegmentedValueTable)
+                    scope = source_scope(self.lookups_dirs)
+                    changes = self._index.sync("location", paths, _iter_location_segments, scope=scope)
+                    if changes:
+                        print(f"[lookups] location index updated ({changes.describe()}) -> {self._index.path}")
+                    if changes or first:
+                        segments = [CompactValueTable.from_record(*row) for row in self._index.query(_SEGMENTS_SQL, (scope,))]
+                        self.lookup = LocationValueLookup(by_parcel=SegmentedValueTable(segments))
+                    return changes
+                except sqlite3.Error as exc:
+                    print(f"[lookups] location index failed ({exc}); loading CSVs into memory")
+                    self._index, self._use_index = None, False
+
+            first = self._cache is None
+            if self._cache is None:
+                # One segment per file (built in parallel for large sets); first match wins in filename order.
+                self._cache = FileSetCache(_iter_location_segments)
+            changes = self._cache.update(paths)
+            if changes or first:
+                segments = [CompactValueTable.from_record(*rows[0]) for rows in self._cache.rows_in_order()]
+                self.lookup = LocationValueLookup(by_parcel=SegmentedValueTable(segments))
+            return changes
+
+
+def load_location_value_lookup(
+    *,
+    lookups_dirs: Iterable[str] = ("lookups/location", "lookups/Location"),
+    index_path: Optional[str] = None,
+) -> LocationValueLookup:
+    """
+    Loads all CSV files in lookups/location (excluding *.csv.example) and builds:
+      taxparcelnumber -> location_value
+    The mapping is a CompactValueTable; by default one segment per file is compiled into
+    the lookup index (see lookup_index.py) and only updated when the CSVs change.
+    Pass index_path="" to build it straight from the CSVs. Use LocationValueLookupReloader
+    directly to pick up file changes in a long-running process.
+    """
+    return LocationValueLookupReloader(lookups_dirs=lookups_dirs, index_path=index_path).lookup
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from lookup_loader import FileChanges, Fingerprint, diff_fingerprints, fingerprint_files, parse_files
+from search_plan import default_cache_dir
+
+
+# Bump when the schema or the row normalization changes so old index files are rebuilt.
+SCHEMA_VERSION = 6
+
+# One row per daily output row; history_index.py yields tuples in this order.
+HISTORY_COLUMNS = (
+    "day",
+    "city",
+    "category",
+    "search_id",
+    "price",
+    "home_sqft",
+    "lot_sqft",
+    "home_ppsf",
+    "lot_ppsf",
+    "deal_rating",
+    "zipcode",
+    "address",
+    "tax_parcel_number",
+    "listing_url",
+)
+
+# kind -> (table, value columns). Every table also has source_id and seq, which
+# together preserve "stable filename order, then file order" precedence.
+TABLES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "parcel": ("parcels", ("addr", "zip", "parcel", "house")),
+    # one row per file: a packed CompactValueTable (see location_value_lookup.py)
+    "location": ("location_segments", ("keys", "codes", "code_type", "categories", "extra")),
+    # daily output rows (see history_index.py); kept in its own index file
+    "history": ("listings", HISTORY_COLUMNS),
+    # comps points of the same daily files (see comps.py), next to "history"
+    "comps": ("comp_points", ("listing_url", "lat", "lon", "ppsf")),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    UNIQUE (kind, scope, path)
+);
+CREATE TABLE IF NOT EXISTS parcels (source_id INTEGER, seq INTEGER, addr TEXT, zip INTEGER, parcel TEXT, house TEXT);
+CREATE INDEX IF NOT EXISTS parcels_addr ON parcels (addr);
+CREATE INDEX IF NOT EXISTS parcels_house_zip ON parcels (house, zip);
+CREATE TABLE IF NOT EXISTS location_segments (
+    source_id INTEGER, seq INTEGER, keys BLOB, codes BLOB, code_type TEXT, categories TEXT, extra TEXT
+);
+CREATE TABLE IF NOT EXISTS listings (
+    source_id INTEGER, seq INTEGER, day TEXT, city TEXT, category TEXT, search_id INTEGER,
+    price INTEGER, home_sqft INTEGER, lot_sqft INTEGER, home_ppsf REAL, lot_ppsf REAL, deal_rating INTEGER,
+    zipcode TEXT, address TEXT, tax_parcel_number TEXT, listing_url TEXT
+);
+CREATE INDEX IF NOT EXISTS listings_source ON listings (source_id);
+CREATE INDEX IF NOT EXISTS listings_day_rating ON listings (day, deal_rating);
+CREATE INDEX IF NOT EXISTS listings_city_day ON listings (city, day);
+CREATE INDEX IF NOT EXISTS listings_category_day ON listings (category, day);
+CREATE INDEX IF NOT EXISTS listings_price ON listings (price);
+CREATE INDEX IF NOT EXISTS listings_rating ON listings (deal_rating);
+CREATE INDEX IF NOT EXISTS listings_url_day ON listings (listing_url, day);
+CREATE TABLE IF NOT EXISTS comp_points (source_id INTEGER, seq INTEGER, listing_url TEXT, lat REAL, lon REAL, ppsf REAL);
+CREATE INDEX IF NOT EXISTS comp_points_source ON comp_points (source_id);
+"""
+
+RowIter = Callable[[str], Iterable[Tuple[Any, ...]]]  # module-level, so it can run in a worker process
+
+
+def source_scope(dirs: Iterable[str]) -> str:
+    """
+    Key for one set of lookup dirs. Sources are stored per (kind, scope), so readers of
+    different dirs (or the same dirs from another cwd) can share an index file without
+    retracting each other's files.
+    """
+    return "\n".join(sorted({os.path.abspath(d) for d in dirs}))
+
+
+def default_index_path() -> str:
+    """
+    Location of the compiled lookup index. REDFIN_LOOKUP_INDEX overrides it;
+    set it to 0/off/false to disable the index and load CSVs into memory instead.
+    """
+    env = os.getenv("REDFIN_LOOKUP_INDEX", "").strip()
+    if env.lower() in ("0", "off", "false", "no"):
+        return ""
+    return env or os.path.join(default_cache_dir(), "lookup_index.sqlite3")
+
+
+class LookupIndex:
+    """
+    SQLite file holding the normalized rows of every lookup CSV, tagged by source file.
+    sync() compares per-file size/mtime and only re-indexes files that were added or
+    changed (and retracts removed ones); with nothing changed it costs a few stat() calls.
+    Sources are recorded by absolute path under a `scope` (see source_scope()); readers
+    filter on it, and a sync only ever touches its own scope.
+
+    Reads and sync writes use separate connections on a WAL-mode database, so lookups
+    keep answering from the last committed state while a file is being re-indexed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            version = None
+            try:
+                cur = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'")
+                row = cur.fetchone()
+                version = int(row[0]) if row else None
+            except sqlite3.Error:
+                pass
+            if version != SCHEMA_VERSION:
+                self._reset()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),)
+            )
+            self._conn.commit()
+        self._write_conn = sqlite3.connect(path, check_same_thread=False)
+        self._write_lock = threading.Lock()
+
+    def _reset(self) -> None:
+        for table in ["meta", "sources", "locations"] + [t for t, _ in TABLES.values()]:
+            self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+    def close(self) -> None:
+        with self._write_lock:
+            self._write_conn.close()
+        with self._lock:
+            self._conn.close()
+
+    def stored_fingerprints(self, kind: str, scope: str = "") -> List[Fingerprint]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT path, size, mtime_ns FROM sources WHERE kind = ? AND scope = ? ORDER BY path", (kind, scope)
+            )
+            return [(p, int(s), int(m)) for p, s, m in cur.fetchall()]
+
+    def sync(self, kind: str, paths: List[str], iter_rows: RowIter, *, scope: str = "") -> FileChanges:
+        """
+        Make the index for (`kind`, `scope`) match the given CSV files and return what
+        changed (falsy when nothing did). Only added/changed files are parsed.
+        """
+        with self._write_lock:
+            current = sorted(fingerprint_files(sorted({os.path.abspath(p) for p in paths})))
+            changes = diff_fingerprints(self.stored_fingerprints(kind, scope), current)
+            if not changes:
+                return changes
+
+            # Parse (in parallel for large file sets) before opening the write transaction.
+            to_parse = sorted(changes.added + changes.changed)
+            parsed = parse_files(to_parse, iter_rows)
+            by_path = {fp[0]: fp for fp in current}
+
+            table, cols = TABLES[kind]
+            placeholders = ", ".join("?" for _ in range(len(cols) + 2))
+            insert_sql = f"INSERT INTO {table} (source_id, seq, {', '.join(cols)}) VALUES ({placeholders})"
+            conn = self._write_conn
+            with conn:
+                for path in changes.removed + changes.changed:
+                    row = conn.execute(
+                        "SELECT id FROM sources WHERE kind = ? AND scope = ? AND path = ?", (kind, scope, path)
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    conn.execute(f"DELETE FROM {table} WHERE source_id = ?", (row[0],))
+                    conn.execute("DELETE FROM sources WHERE id = ?", (row[0],))
+                for path, rows in zip(to_parse, parsed):
+                    _, size, mtime_ns = by_path[path]
+                    cur = conn.execute(
+                        "INSERT INTO sources (kind, scope, path, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                        (kind, scope, path, size, mtime_ns),
+                    )
+                    source_id = cur.lastrowid
+                    conn.executemany(insert_sql, ((source_id, seq) + tuple(r) for seq, r in enumerate(rows)))
+            return changes
+
+    def query(self, sql: str, params: Tuple[Any, ...]) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+
+_OPEN: Dict[str, LookupIndex] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_index(path: str) -> LookupIndex:
+    """
+    Shared LookupIndex per file so parcel and location lookups reuse one connection.
+    """
+    key = os.path.abspath(path)
+    with _OPEN_LOCK:
+        idx = _OPEN.get(key)
+        if idx is None:
+            idx = LookupIndex(path)
+            _OPEN[key] = idx
+        return idx
+
+
+def try_open_index(index_path: Optional[str]) -> Optional[LookupIndex]:
+    path = default_index_path() if index_path is None else index_path
+    if not path:
+        return None
+    try:
+        return open_index(path)
+    except (OSError, sqlite3.Error) as exc:
+        print(f"[lookups] index unavailable ({exc}); loading CSVs into memory")
+        return None
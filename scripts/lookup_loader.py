@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Below this much CSV data, starting workers costs more than it saves.
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+RowParser = Callable[[str], Iterable[Tuple[Any, ...]]]
+
+
+def default_workers() -> int:
+    try:
+        n = int(os.getenv("REDFIN_LOOKUP_WORKERS", "").strip() or 0)
+    except ValueError:
+        n = 0
+    return n if n > 0 else (os.cpu_count() or 1)
+
+
+def _worker_context() -> Any:
+    """
+    Start method for parse workers. Never plain fork: parse_files is called from the
+    runner's startup threads, and a child forked while another thread holds a lock
+    (logging, an SQLite connection, the import lock) can deadlock.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def header_index(header: Sequence[str]) -> Dict[str, int]:
+    """
+    Case-insensitive header -> column index (like the DictReader field maps it replaces,
+    a later duplicate name wins).
+    """
+    return {name.lower().strip(): i for i, name in enumerate(header)}
+
+
+def cell(row: Sequence[str], i: int) -> str:
+    # csv.reader rows can be shorter than the header; DictReader would have given None.
+    return row[i] if i < len(row) else ""
+
+
+def _parse_one(args: Tuple[RowParser, str]) -> List[Tuple[Any, ...]]:
+    parse, path = args
+    return list(parse(path))
+
+
+def parse_files(paths: Sequence[str], parse: RowParser, *, workers: Optional[int] = None) -> List[List[Tuple[Any, ...]]]:
+    """
+    Run `parse` over every file and return the row lists in the same order as `paths`,
+    so callers keep stable-filename precedence. Large multi-file sets are parsed in
+    worker processes (forkserver, or spawn where that's missing); `parse` must be a
+    module-level function so it can be pickled.
+    """
+    workers = default_workers() if workers is None else workers
+    total = 0
+    for p in paths:
+        try:
+            total += os.path.getsize(p)
+        except OSError:
+            pass
+    if workers <= 1 or len(paths) <= 1 or total < PARALLEL_MIN_BYTES:
+        return [_parse_one((parse, p)) for p in paths]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths)), mp_context=_worker_context()) as pool:
+        # map() yields in submission order regardless of which file finishes first.
+        return list(pool.map(_parse_one, [(parse, p) for p in paths]))
+
+
+Fingerprint = Tuple[str, int, int]  # (path, size, mtime_ns)
+
+
+def fingerprint_files(paths: Iterable[str]) -> List[Fingerprint]:
+    out: List[Fingerprint] = []
+    for path in paths:
+        st = os.stat(path)
+        out.append((path, st.st_size, st.st_mtime_ns))
+    return out
+
+
+@dataclass(frozen=True)
+class FileChanges:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def describe(self) -> str:
+        return f"+{len(self.added)} -{len(self.removed)} ~{len(self.changed)} file(s)"
+
+
+def diff_fingerprints(old: Iterable[Fingerprint], new: Iterable[Fingerprint]) -> FileChanges:
+    before = {p: (s, m) for p, s, m in old}
+    after = {p: (s, m) for p, s, m in new}
+    return FileChanges(
+        added=sorted(p for p in after if p not in before),
+        removed=sorted(p for p in before if p not in after),
+        changed=sorted(p for p in after if p in before and after[p] != before[p]),
+    )
+
+
+class FileSetCache:
+    """
+    Parsed rows per source file, keyed by fingerprint. update() re-parses only files
+    that were added or changed since the last call and forgets removed ones.
+    """
+
+    def __init__(self, parse: RowParser) -> None:
+        self._parse = parse
+        self._files: Dict[str, Tuple[Fingerprint, List[Tuple[Any, ...]]]] = {}
+
+    def update(self, paths: Sequence[str]) -> FileChanges:
+        current = fingerprint_files(sorted(paths))
+        changes = diff_fingerprints([fp for fp, _ in self._files.values()], current)
+        if not changes:
+            return changes
+        for path in changes.removed:
+            del self._files[path]
+        by_path = {fp[0]: fp for fp in current}
+        to_parse = sorted(changes.added + changes.changed)
+        for path, rows in zip(to_parse, parse_files(to_parse, self._parse)):
+            self._files[path] = (by_path[path], rows)
+        return changes
+
+    def rows_in_order(self) -> List[List[Tuple[Any, ...]]]:
+        return [self._files[p][1] for p in sorted(self._files)]
+
+
+class LookupWatcher:
+    """
+    Background thread calling refresh() on each reloader every `interval_s` seconds,
+    so new/changed/removed lookup files are applied without stalling the caller.
+    """
+
+    def __init__(self, reloaders: Sequence[Any], *, interval_s: float) -> None:
+        self._reloaders = list(reloaders)
+        self._interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lookup-watcher", daemon=True)
+
+    def start(self) -> "LookupWatcher":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self._interval_s + 5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_s):
+            for r in self._reloaders:
+                try:
+                    r.refresh()
+                except Exception as exc:  # keep watching; a half-written CSV is retried next tick
+                    print(f"[lookups] reload failed: {type(exc).__name__}: {exc}")
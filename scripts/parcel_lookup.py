@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 import csv
+import functools
 import os
 import re
+import sqlite3
+import threading
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Protocol, Sequence, Tuple
+
+from lookup_index import LookupIndex, source_scope, try_open_index
+from lookup_loader import FileChanges, FileSetCache, cell, header_index
 
 
 _WS_RE = re.compile(r"\s+")
@@ -74,10 +80,180 @@ def normalize_address(addr: Optional[str]) -> str:
     return " ".join(parts)
 
 
+# Listings repeat across searches; batch callers normalize through this cache.
+normalize_address_cached = functools.lru_cache(maxsize=1 << 16)(normalize_address)
+
+
+# Fuzzy matching (fallback when the exact normalized address has no parcel)
+_DIRECTIONALS = {"N", "S", "E", "W", "NE", "NW", "SE", "SW"}
+_FUZZY_ABBREV = {
+    "NORTHEAST": "NE",
+    "NORTHWEST": "NW",
+    "SOUTHEAST": "SE",
+    "SOUTHWEST": "SW",
+    "STR": "ST",
+    "AV": "AVE",
+    "AVN": "AVE",
+    "CRT": "CT",
+    "TERRACE": "TER",
+    "TERR": "TER",
+    "CIRCLE": "CIR",
+    "HIGHWAY": "HWY",
+    "TRAIL": "TRL",
+    "LOOP": "LOOP",
+    "WAY": "WAY",
+    "PLACE": "PL",
+    "DRV": "DR",
+}
+_STREET_TYPES = {"ST", "AVE", "RD", "DR", "LN", "CT", "PL", "BLVD", "PKWY", "TER", "CIR", "HWY", "TRL", "LOOP", "WAY"}
+_UNIT_MARKERS = {"APT", "UNIT", "STE", "SUITE", "SPC", "SPACE", "LOT", "BLDG", "FL", "RM", "NO"}
+_FUZZY_MAX_CANDIDATES = 500
+# Numbered streets ("11TH", "112") never match by trigram: a digit apart is another street.
+_NUMERIC_TOKEN_RE = re.compile(r"\d+(ST|ND|RD|TH)?")
+
+
+def address_house_number(normalized_addr: str) -> str:
+    """
+    Leading house number of a normalized address ("" if it doesn't start with one).
+    """
+    head = normalized_addr.split(" ", 1)[0]
+    return head if head[:1].isdigit() else ""
+
+
+def _fuzzy_tokens(normalized_addr: str) -> List[str]:
+    """
+    Street tokens used for similarity: house number and unit designators dropped,
+    a few more suffix/directional spellings folded together.
+    """
+    out: List[str] = []
+    tokens = normalized_addr.split(" ")[1:]
+    skip_next = False
+    seen_type = False
+    for tok in tokens:
+        if skip_next:
+            skip_next = False
+            continue
+        tok = _FUZZY_ABBREV.get(tok, tok)
+        if tok in _UNIT_MARKERS:
+            skip_next = True
+            continue
+        if seen_type and tok not in _DIRECTIONALS:
+            # "1216 E 70TH ST 2" => trailing "2" is a unit number
+            continue
+        if tok in _STREET_TYPES:
+            seen_type = True
+        out.append(tok)
+    return out
+
+
+def _token_weight(tok: str) -> float:
+    return 0.5 if tok in _DIRECTIONALS or tok in _STREET_TYPES else 1.0
+
+
+def _trigrams(tok: str) -> set[str]:
+    padded = f"  {tok} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+
+def address_similarity(a_tokens: List[str], b_tokens: List[str]) -> float:
+    """
+    Weighted token Jaccard in [0, 1]. Directionals and street types count half, so a
+    missing "E" or "ST" costs less than a different street name; core tokens that
+    don't match exactly can still partially match by trigram similarity (typos).
+    Numbered-street tokens only match exactly, and a different number on each side
+    ("11TH" vs "111TH") scores 0.
+    """
+    remaining = list(b_tokens)
+    matched = 0.0
+    unmatched: List[str] = []
+    for tok in a_tokens:
+        if tok in remaining:
+            remaining.remove(tok)
+            matched += _token_weight(tok)
+        else:
+            unmatched.append(tok)
+    if any(_NUMERIC_TOKEN_RE.fullmatch(t) for t in unmatched) and any(
+        _NUMERIC_TOKEN_RE.fullmatch(t) for t in remaining
+    ):
+        return 0.0
+    for tok in unmatched:
+        if _token_weight(tok) < 1.0 or _NUMERIC_TOKEN_RE.fullmatch(tok):
+            continue
+        best_i, best_sim = -1, 0.0
+        grams = _trigrams(tok)
+        for i, other in enumerate(remaining):
+            if _token_weight(other) < 1.0 or _NUMERIC_TOKEN_RE.fullmatch(other):
+                continue
+            sim = _dice(grams, _trigrams(other))
+            if sim > best_sim:
+                best_i, best_sim = i, sim
+        if best_i >= 0 and best_sim >= 0.6:
+            remaining.pop(best_i)
+            matched += best_sim
+    total = sum(_token_weight(t) for t in a_tokens) + sum(_token_weight(t) for t in b_tokens) - matched
+    return matched / total if total > 0 else 0.0
+
+
+class FuzzyCandidates(Protocol):
+    def candidates(self, house: str, zip_int: Optional[int], zip_tolerance: int) -> List[Tuple[str, Optional[int]]]:
+        """
+        (normalized_address, zip_int) pairs sharing the house number and within the zip
+        tolerance (any zip when zip_int is None), closest zip first and then in stable
+        order, capped in size.
+        """
+        ...
+
+
+class FuzzyAddressIndex:
+    """
+    In-memory postings: (house number, zip_int) -> [normalized_address, ...] in stable order.
+    A lookup only reads the postings of the zips within the tolerance, so a house number
+    that is common across the county doesn't crowd out the listing's own zip.
+    """
+
+    def __init__(self) -> None:
+        self.by_house_zip: Dict[Tuple[str, Optional[int]], List[str]] = {}
+        # house number -> zips with postings, in first-seen order (for lookups without a zip)
+        self.zips_by_house: Dict[str, List[Optional[int]]] = {}
+        self._seen: set[Tuple[str, Optional[int]]] = set()
+
+    def add(self, addr: str, zip_int: Optional[int]) -> None:
+        house = address_house_number(addr)
+        if not house or (addr, zip_int) in self._seen:
+            return
+        self._seen.add((addr, zip_int))
+        postings = self.by_house_zip.get((house, zip_int))
+        if postings is None:
+            postings = self.by_house_zip[(house, zip_int)] = []
+            self.zips_by_house.setdefault(house, []).append(zip_int)
+        postings.append(addr)
+
+    def candidates(self, house: str, zip_int: Optional[int], zip_tolerance: int) -> List[Tuple[str, Optional[int]]]:
+        if zip_int is None:
+            zips = self.zips_by_house.get(house) or []
+        else:
+            zips = sorted(range(zip_int - zip_tolerance, zip_int + zip_tolerance + 1), key=lambda z: abs(z - zip_int))
+        out: List[Tuple[str, Optional[int]]] = []
+        for z in zips:
+            for addr in self.by_house_zip.get((house, z)) or []:
+                out.append((addr, z))
+                if len(out) >= _FUZZY_MAX_CANDIDATES:
+                    return out
+        return out
+
+
 @dataclass(frozen=True)
 class ParcelLookup:
     # normalized_address -> list of (zip_int, parcel) in stable order
-    by_address: Dict[str, List[Tuple[Optional[int], str]]]
+    by_address: Mapping[str, List[Tuple[Optional[int], str]]]
+    # house-number postings for the fuzzy fallback (None disables it)
+    fuzzy_index: Optional[FuzzyCandidates] = None
 
     def find(
         self,
@@ -85,20 +261,76 @@ class ParcelLookup:
         zipcode: Optional[str],
         site_address: Optional[str],
         zip_tolerance: int = 4,
+        fuzzy: bool = False,
+        min_similarity: float = 0.7,
     ) -> Optional[str]:
         """
         Match on normalized address, and accept zipcode mismatches within +/- zip_tolerance.
         If multiple parcels match, choose the closest zip; ties keep stable file order.
+        With fuzzy=True, an exact miss falls back to find_fuzzy().
         """
         a = normalize_address(site_address)
         if not a:
             return None
 
-        candidates = self.by_address.get(a) or []
+        parcel = self._pick_parcel(self.by_address.get(a) or [], zip_to_int(zipcode), zip_tolerance)
+        if parcel is None and fuzzy:
+            return self.find_fuzzy(
+                zipcode=zipcode, site_address=site_address, zip_tolerance=zip_tolerance, min_similarity=min_similarity
+            )
+        return parcel
+
+    def find_many(
+        self,
+        *,
+        zipcodes: Sequence[Optional[str]],
+        site_addresses: Sequence[Optional[str]],
+        zip_tolerance: int = 4,
+        fuzzy: bool = False,
+        min_similarity: float = 0.7,
+    ) -> List[Optional[str]]:
+        """
+        Column-wise find(): returns one parcel (or None) per input position.
+        Each distinct address is normalized and looked up once; index-backed lookups
+        fetch all distinct addresses in a few batched queries.
+        """
+        if len(zipcodes) != len(site_addresses):
+            raise ValueError("zipcodes and site_addresses must have the same length")
+
+        keys = [(normalize_address_cached(a) if a else "", zip_to_int(z)) for z, a in zip(zipcodes, site_addresses)]
+        distinct_addrs = sorted({a for a, _ in keys if a})
+        get_many = getattr(self.by_address, "get_many", None)
+        if get_many is not None:
+            cands_by_addr = get_many(distinct_addrs)
+        else:
+            cands_by_addr = {a: self.by_address.get(a) or [] for a in distinct_addrs}
+
+        results: Dict[Tuple[str, Optional[int]], Optional[str]] = {}
+        out: List[Optional[str]] = []
+        for (a, z_int), raw_addr, raw_zip in zip(keys, site_addresses, zipcodes):
+            if not a:
+                out.append(None)
+                continue
+            if (a, z_int) not in results:
+                parcel = self._pick_parcel(cands_by_addr.get(a) or [], z_int, zip_tolerance)
+                if parcel is None and fuzzy:
+                    parcel = self.find_fuzzy(
+                        zipcode=raw_zip,
+                        site_address=raw_addr,
+                        zip_tolerance=zip_tolerance,
+                        min_similarity=min_similarity,
+                    )
+                results[(a, z_int)] = parcel
+            out.append(results[(a, z_int)])
+        return out
+
+    @staticmethod
+    def _pick_parcel(
+        candidates: List[Tuple[Optional[int], str]], z_int: Optional[int], zip_tolerance: int
+    ) -> Optional[str]:
         if not candidates:
             return None
 
-        z_int = zip_to_int(zipcode)
         if z_int is None:
             # No listing zip => return first candidate (stable order)
             return candidates[0][1]
@@ -117,6 +349,56 @@ class ParcelLookup:
         # If nothing is within tolerance, don't match.
         return None
 
+    def find_fuzzy(
+        self,
+        *,
+        zipcode: Optional[str],
+        site_address: Optional[str],
+        zip_tolerance: int = 4,
+        min_similarity: float = 0.7,
+    ) -> Optional[str]:
+        """
+        Best parcel whose address shares the house number, is within the zip tolerance and
+        scores >= min_similarity on address_similarity(). Only the house-number postings are
+        scored (never a scan of every parcel). Ties prefer the closer zip; if the top
+        (score, zip distance) is still shared by addresses that resolve to different parcels
+        ("123 MAIN ST" vs "123 E MAIN ST" / "123 W MAIN ST") the match is ambiguous and None
+        is returned.
+        """
+        if self.fuzzy_index is None:
+            return None
+        a = normalize_address_cached(site_address) if site_address else ""
+        house = address_house_number(a)
+        if not house:
+            return None
+        z_int = zip_to_int(zipcode)
+        query = _fuzzy_tokens(a)
+        if not query:
+            return None
+
+        best_key: Optional[Tuple[float, int]] = None  # (score, -zip_distance)
+        best_addrs: List[str] = []
+        for addr, z in self.fuzzy_index.candidates(house, z_int, zip_tolerance):
+            score = address_similarity(query, _fuzzy_tokens(addr))
+            if score < min_similarity:
+                continue
+            dist = abs(z - z_int) if (z is not None and z_int is not None) else 0
+            key = (score, -dist)
+            if best_key is None or key > best_key:
+                best_key, best_addrs = key, [addr]
+            elif key == best_key and addr not in best_addrs:
+                best_addrs.append(addr)
+
+        picked: Optional[str] = None
+        for addr in best_addrs:
+            parcel = self._pick_parcel(self.by_address.get(addr) or [], z_int, zip_tolerance)
+            if parcel is None or parcel == picked:
+                continue
+            if picked is not None:
+                return None
+            picked = parcel
+        return picked
+
 
 def _iter_csv_files(root_dir: str) -> Iterable[str]:
     for dirpath, _, filenames in os.walk(root_dir):
@@ -125,40 +407,177 @@ def _iter_csv_files(root_dir: str) -> Iterable[str]:
                 yield os.path.join(dirpath, fn)
 
 
-def load_parcel_lookup(*, lookups_dir: str = "lookups/parcel") -> ParcelLookup:
+class IndexedParcelMap(Mapping[str, List[Tuple[Optional[int], str]]]):
     """
-    Loads all CSV files in lookups/parcel (excluding *.csv.example) and builds a mapping:
-      normalized_site_address -> [(zipcode_int, taxparcelnumber), ...]
+    Read-only `by_address` view over the compiled lookup index (one source scope).
     """
-    mapping: Dict[str, List[Tuple[Optional[int], str]]] = {}
-    if not os.path.isdir(lookups_dir):
-        return ParcelLookup(by_address=mapping)
 
-    for path in sorted(_iter_csv_files(lookups_dir)):
-        with open(path, "r", encoding="utf-8-sig", newline="") as f:
-            reader = csv.DictReader(f)
-            if not reader.fieldnames:
-                continue
+    _GET_SQL = (
+        "SELECT p.zip, p.parcel FROM parcels p JOIN sources s ON s.id = p.source_id "
+        "WHERE p.addr = ? AND s.scope = ? ORDER BY s.path, p.seq"
+    )
+    _ADDRS_SQL = "FROM parcels p JOIN sources s ON s.id = p.source_id WHERE s.kind = 'parcel' AND s.scope = ?"
+
+    def __init__(self, index: LookupIndex, scope: str = "") -> None:
+        self._index = index
+        self._scope = scope
+
+    def __getitem__(self, addr: str) -> List[Tuple[Optional[int], str]]:
+        rows = self._index.query(self._GET_SQL, (addr, self._scope))
+        if not rows:
+            raise KeyError(addr)
+        return [(z, parcel) for z, parcel in rows]
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._index.query(f"SELECT DISTINCT p.addr {self._ADDRS_SQL} ORDER BY p.addr", (self._scope,))
+        return iter([r[0] for r in rows])
+
+    def __len__(self) -> int:
+        return int(self._index.query(f"SELECT COUNT(DISTINCT p.addr) {self._ADDRS_SQL}", (self._scope,))[0][0])
+
+    def get_many(self, addrs: Sequence[str], *, chunk_size: int = 500) -> Dict[str, List[Tuple[Optional[int], str]]]:
+        out: Dict[str, List[Tuple[Optional[int], str]]] = {}
+        for i in range(0, len(addrs), chunk_size):
+            chunk = list(addrs[i : i + chunk_size])
+            sql = (
+                "SELECT p.addr, p.zip, p.parcel FROM parcels p JOIN sources s ON s.id = p.source_id "
+                f"WHERE p.addr IN ({', '.join('?' for _ in chunk)}) AND s.scope = ? ORDER BY s.path, p.seq"
+            )
+            for addr, z, parcel in self._index.query(sql, tuple(chunk) + (self._scope,)):
+                out.setdefault(addr, []).append((z, parcel))
+        return out
+
 
-            # Case-insensitive header access
-            field_map = {name.lower().strip(): name for name in reader.fieldnames}
-            need = {"taxparcelnumber", "zipcode", "site_address"}
-            if not need.issubset(field_map):
-                # Ignore unrelated CSV files in the folder
+class IndexedFuzzyIndex:
+    """
+    FuzzyCandidates backed by the (house, zip) index of the compiled lookup index.
+    """
+
+    def __init__(self, index: LookupIndex, scope: str = "") -> None:
+        self._index = index
+        self._scope = scope
+
+    def candidates(self, house: str, zip_int: Optional[int], zip_tolerance: int) -> List[Tuple[str, Optional[int]]]:
+        sql = "SELECT p.addr, p.zip FROM parcels p JOIN sources s ON s.id = p.source_id WHERE p.house = ? AND s.scope = ?"
+        params: Tuple[object, ...] = (house, self._scope)
+        if zip_int is not None:
+            sql += " AND p.zip BETWEEN ? AND ? ORDER BY ABS(p.zip - ?), s.path, p.seq LIMIT ?"
+            params += (zip_int - zip_tolerance, zip_int + zip_tolerance, zip_int)
+        else:
+            sql += " ORDER BY s.path, p.seq LIMIT ?"
+        params += (_FUZZY_MAX_CANDIDATES,)
+        out: List[Tuple[str, Optional[int]]] = []
+        seen: set[Tuple[str, Optional[int]]] = set()
+        for addr, z in self._index.query(sql, params):
+            if (addr, z) not in seen:
+                seen.add((addr, z))
+                out.append((addr, z))
+        return out
+
+
+def _iter_parcel_rows(path: str) -> Iterator[Tuple[str, Optional[int], str, str]]:
+    """
+    Yield (normalized_site_address, zipcode_int, taxparcelnumber, house_number) for one CSV, in file order.
+    Files without the required headers yield nothing.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+
+        # Case-insensitive header access; only the three needed columns are read.
+        field_map = header_index(header)
+        need = {"taxparcelnumber", "zipcode", "site_address"}
+        if not need.issubset(field_map):
+            # Ignore unrelated CSV files in the folder
+            return
+        parcel_i, zip_i, addr_i = field_map["taxparcelnumber"], field_map["zipcode"], field_map["site_address"]
+
+        for row in reader:
+            parcel = cell(row, parcel_i).strip()
+            zipcode = cell(row, zip_i).strip()
+            addr = cell(row, addr_i).strip()
+            if not parcel:
+                continue
+            a = normalize_address(addr)
+            z = zip_to_int(zipcode)
+            if not a:
                 continue
+            yield a, z, parcel, address_house_number(a)
+
 
-            for row in reader:
-                parcel = (row.get(field_map["taxparcelnumber"]) or "").strip()
-                zipcode = (row.get(field_map["zipcode"]) or "").strip()
-                addr = (row.get(field_map["site_address"]) or "").strip()
-                if not parcel:
-                    continue
-                a = normalize_address(addr)
-                z = zip_to_int(zipcode)
-                if not a:
-                    continue
-                # Keep stable order by filename and file order; allow multiple zips for same address.
-                mapping.setdefault(a, []).append((z, parcel))
-
-    return ParcelLookup(by_address=mapping)
+class ParcelLookupReloader:
+    """
+    Owns the ParcelLookup for a lookups dir and keeps it current. refresh() stats the
+    CSVs and applies only per-file changes (added files merged in, removed ones retracted,
+    changed ones re-indexed), then swaps `lookup` in a single assignment, so readers
+    never see a half-applied update and are never blocked by one.
+    """
+
+    def __init__(self, *, lookups_dir: str = "lookups/parcel", index_path: Optional[str] = None) -> None:
+        self.lookups_dir = lookups_dir
+        self._index_path = index_path
+        self._index: Optional[LookupIndex] = None
+        self._use_index = True
+        self._cache: Optional[FileSetCache] = None
+        self._lock = threading.Lock()
+        self.lookup = ParcelLookup(by_address={})
+        self.refresh()
+
+    def _paths(self) -> List[str]:
+        if not os.path.isdir(self.lookups_dir):
+            return []
+        return sorted(_iter_csv_files(self.lookups_dir))
+
+    def refresh(self) -> FileChanges:
+        with self._lock:
+            paths = self._paths()
+            if not paths and self._index is None and self._cache is None:
+                return FileChanges()
+
+            if self._use_index and self._index is None:
+                self._index = try_open_index(self._index_path)
+                self._use_index = self._index is not None
+            if self._index is not None:
+                try:
+                    scope = source_scope([self.lookups_dir])
+                    changes = self._index.sync("parcel", paths, _iter_parcel_rows, scope=scope)
+                    if changes:
+                        print(f"[lookups] parcel index updated ({changes.describe()}) -> {self._index.path}")
+                    if not isinstance(self.lookup.by_address, IndexedParcelMap):
+                        self.lookup = ParcelLookup(
+                            by_address=IndexedParcelMap(self._index, scope),
+                            fuzzy_index=IndexedFuzzyIndex(self._index, scope),
+                        )
+                    return changes
+                except sqlite3.Error as exc:
+                    print(f"[lookups] parcel index failed ({exc}); loading CSVs into memory")
+                    self._index, self._use_index = None, False
 
+            first = self._cache is None
+            if self._cache is None:
+                self._cache = FileSetCache(_iter_parcel_rows)
+            changes = self._cache.update(paths)
+            if changes or first:
+                mapping: Dict[str, List[Tuple[Optional[int], str]]] = {}
+                fuzzy_index = FuzzyAddressIndex()
+                # Rebuilt from cached per-file rows: only changed files were re-read.
+                for rows in self._cache.rows_in_order():
+                    for a, z, parcel, _ in rows:
+                        # Keep stable order by filename and file order; allow multiple zips for same address.
+                        mapping.setdefault(a, []).append((z, parcel))
+                        fuzzy_index.add(a, z)
+                self.lookup = ParcelLookup(by_address=mapping, fuzzy_index=fuzzy_index)
+            return changes
+
+
+def load_parcel_lookup(*, lookups_dir: str = "lookups/parcel", index_path: Optional[str] = None) -> ParcelLookup:
+    """
+    Loads all CSV files in lookups/parcel (excluding *.csv.example) and builds a mapping:
+      normalized_site_address -> [(zipcode_int, taxparcelnumber), ...]
+    By default the mapping is served from the compiled lookup index (see lookup_index.py),
+    which is only updated when the CSVs change. Pass index_path="" to load into memory.
+    Use ParcelLookupReloader directly to pick up file changes in a long-running process.
+    """
+    return ParcelLookupReloader(lookups_dir=lookups_dir, index_path=index_path).lookup
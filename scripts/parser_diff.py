@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import glob
+import gzip
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import types
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from standin_server import make_homes, make_search_page
+
+# Differential check for parser changes: runs a frozen copy of redfin_scraper.py (taken
+# from a git revision, or a saved file) next to the working-tree parser over recorded and
+# generated pages, and reports every page where the returned listings or meta counts
+# differ, plus the per-page speedup. Exits 1 on any difference, so it can gate a change.
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+PARSER_PATH = "scripts/redfin_scraper.py"
+BASE_URL = "https://www.redfin.com"
+
+
+@dataclass
+class Page:
+    name: str
+    html: str
+    base_url: str = BASE_URL
+
+
+@dataclass
+class PageResult:
+    name: str
+    size_kb: float
+    reference_s: float
+    candidate_s: float
+    listings: int
+    diffs: List[str] = field(default_factory=list)
+
+    @property
+    def speedup(self) -> float:
+        return self.reference_s / self.candidate_s if self.candidate_s > 0 else float("inf")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "size_kb": round(self.size_kb, 1),
+            "reference_s": round(self.reference_s, 6),
+            "candidate_s": round(self.candidate_s, 6),
+            "speedup": round(self.speedup, 2),
+            "listings": self.listings,
+            "diffs": self.diffs,
+        }
+
+
+def load_parser(source: str, name: str) -> types.ModuleType:
+    """
+    Import parser source text as module `name`. It is registered in sys.modules because
+    dataclasses look their module up there.
+    """
+    module = types.ModuleType(name)
+    module.__file__ = f"<{name}>"
+    sys.modules[name] = module
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+
+def reference_source(rev: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", "show", f"{rev}:{PARSER_PATH}"],
+            cwd=REPO_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError) as exc:
+        detail = getattr(exc, "stderr", "") or exc
+        raise SystemExit(f"cannot read {PARSER_PATH} at {rev!r}: {str(detail).strip()}")
+
+
+def _card_page(seed: int, homes: int, *, tricky: bool = False) -> str:
+    """
+    Search page without embedded JSON, so the HTML card fallback has to do the work.
+    Some cards repeat a URL and some markup is left unclosed, as on real pages. With
+    `tricky`, cards also carry the markup where a faster card path most easily drifts
+    from bs4: nested and unclosed anchors, comments, CDATA, <textarea>/<select> text,
+    ruby annotations, and named/numeric references with and without the ";".
+    """
+    r = random.Random(seed)
+    refs = ["&amp;", "&nbsp;", "&copy", "&#36;", "&#x24;", "&#150;", "&#0;", "&foo;", "&ampx", "&#x3"]
+    cards = []
+    for h in make_homes(seed, homes):
+        price = f"${h['price']['value']:,}"
+        addr = f"{h['streetLine']['value']}, {h['city']}, {h['state']} {h['zip']}"
+        photo = f"<a href='{h['url']}'><img src='/photo/{h['mlsId']['value']}.jpg'></a>" if r.random() < 0.3 else ""
+        tail = "<p>unclosed" if r.random() < 0.1 else ""
+        link = f"<a href='{h['url']}'>{addr}</a>"
+        extra = ""
+        if tricky:
+            number, _, street = addr.partition(" ")
+            k = r.random()
+            if k < 0.2:
+                link = f"<a href='{h['url']}'>{number} <!-- {r.choice(refs)} -->{street}</a>"
+            elif k < 0.35:
+                link = f"<a href='{h['url']}'><span>Photo</span>{link}</a>"  # nested
+            elif k < 0.5:
+                link = f"<a href='{h['url']}'>{addr}"  # never closed
+            elif k < 0.6:
+                link = f"<a href='{h['url']}'>{number}<![CDATA[ ]]>{street}</a>"
+            extra = r.choice(
+                [
+                    f"<textarea>{r.choice(refs)} notes</textarea>",
+                    f"<select><option>{r.choice(refs)}</option><option>Sold</option></select>",
+                    "<ruby>Tacoma<rp>(</rp><rt>ta-ko-ma</rt><rp>)</rp></ruby>",
+                    f"<span>{r.choice(refs)}{r.choice(refs)}</span>",
+                    "",
+                ]
+            )
+        cards.append(
+            f"<div class='bp-Homecard'>{photo}<div class='price'>{price}</div>"
+            f"{link}<span>{h['sqFt']['value']:,} sq ft</span>{extra}{tail}</div>"
+        )
+    return (
+        "<!DOCTYPE html><html><head><title>Homes for sale</title><style>.price{}</style></head>"
+        f"<body><div id='grid'>{''.join(cards)}</div></body></html>"
+    )
+
+
+def generated_pages(count: int, *, seed: int = 0) -> List[Page]:
+    """
+    Stand-in pages in a spread of shapes: embedded-JSON pages from empty to large (with
+    and without padding), card-only pages (plain and tricky), pages with both, and
+    truncated downloads (which also cut references and comments short).
+    """
+    pages: List[Page] = []
+    r = random.Random(seed)
+    for i in range(count):
+        s = seed * 100_003 + i
+        kind = i % 6
+        homes = r.choice([0, 1, 5, 40, 40, 120, 350])
+        if kind == 0:
+            pages.append(Page(f"gen-{i}-json-{homes}", make_search_page(s, homes)))
+        elif kind == 1:
+            padding_kb = r.choice([50, 300, 1000])
+            pages.append(Page(f"gen-{i}-json-{homes}-pad{padding_kb}k", make_search_page(s, homes, padding_kb=padding_kb)))
+        elif kind == 2:
+            pages.append(Page(f"gen-{i}-cards-{homes}", _card_page(s, homes)))
+        elif kind == 3:
+            html = make_search_page(s, homes).replace("</body>", _card_page(s + 1, min(homes, 20)) + "</body>")
+            pages.append(Page(f"gen-{i}-json+cards-{homes}", html))
+        elif kind == 4:
+            pages.append(Page(f"gen-{i}-tricky-cards-{homes}", _card_page(s, homes, tricky=True)))
+        else:
+            html = make_search_page(s, homes) if r.random() < 0.5 else _card_page(s, homes, tricky=True)
+            cut = r.randint(0, len(html))
+            pages.append(Page(f"gen-{i}-truncated-{cut}of{len(html)}", html[:cut]))
+    return pages
+
+
+def recorded_pages(dirs: Sequence[str]) -> List[Page]:
+    pages: List[Page] = []
+    for d in dirs:
+        paths = []
+        for pattern in ("*.html", "*.htm", "*.html.gz"):
+            paths += glob.glob(os.path.join(d, "**", pattern), recursive=True)
+        for path in sorted(paths):
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+                pages.append(Page(os.path.relpath(path, d), f.read()))
+    return pages
+
+
+def cached_pages(path: str) -> List[Page]:
+    """
+    Search pages saved by fetch_html's conditional-request cache (real responses).
+    """
+    from http_client import ResponseCache
+
+    cache = ResponseCache(path)
+    try:
+        return [Page(url, cache.body(url) or "") for url in cache.urls()]
+    finally:
+        cache.close()
+
+
+def _listing_fields(listing: Any, ignore: Sequence[str]) -> Dict[str, Any]:
+    return {f.name: getattr(listing, f.name) for f in dataclasses.fields(listing) if f.name not in ignore}
+
+
+def _short(value: Any, width: int = 80) -> str:
+    text = repr(value)
+    return text if len(text) <= width else text[: width - 3] + "..."
+
+
+def diff_results(
+    reference: Tuple[List[Any], Dict[str, Any]],
+    candidate: Tuple[List[Any], Dict[str, Any]],
+    *,
+    ignore: Sequence[str] = (),
+) -> List[str]:
+    """
+    Human-readable differences between two parse results; empty when they match.
+    Listings are compared position by position (order is part of the output).
+    """
+    ref_listings, ref_meta = reference
+    cand_listings, cand_meta = candidate
+    diffs: List[str] = []
+    for key in sorted(set(ref_meta) | set(cand_meta)):
+        if ref_meta.get(key) != cand_meta.get(key):
+            diffs.append(f"meta[{key}]: {ref_meta.get(key)!r} -> {cand_meta.get(key)!r}")
+    if len(ref_listings) != len(cand_listings):
+        diffs.append(f"listing count: {len(ref_listings)} -> {len(cand_listings)}")
+        ref_urls = {l.url for l in ref_listings}
+        cand_urls = {l.url for l in cand_listings}
+        for url in sorted(u for u in ref_urls - cand_urls if u)[:5]:
+            diffs.append(f"missing: {url}")
+        for url in sorted(u for u in cand_urls - ref_urls if u)[:5]:
+            diffs.append(f"extra: {url}")
+    for i, (a, b) in enumerate(zip(ref_listings, cand_listings)):
+        fa, fb = _listing_fields(a, ignore), _listing_fields(b, ignore)
+        for name in fa:
+            if fa[name] != fb.get(name):
+                diffs.append(f"listing {i} ({a.url}) {name}: {_short(fa[name])} -> {_short(fb.get(name))}")
+    return diffs
+
+
+def _timed_parse(parser: types.ModuleType, page: Page) -> Tuple[Any, float]:
+    """
+    One parse and its wall time; an exception is part of the result, not a crash.
+    """
+    t0 = time.perf_counter()
+    try:
+        result: Any = parser.parse_redfin_search_results(page.html, base_url=page.base_url)
+    except Exception as exc:
+        result = ([], {"error": f"{type(exc).__name__}: {exc}"})
+    return result, time.perf_counter() - t0
+
+
+def compare_parsers(
+    reference: types.ModuleType,
+    candidate: types.ModuleType,
+    pages: Sequence[Page],
+    *,
+    repeat: int = 3,
+    ignore: Sequence[str] = (),
+) -> List[PageResult]:
+    """
+    Parse each page with both parsers, best of `repeat` timings each. Runs alternate
+    between the two so cache warmth and GC pauses don't favour either side.
+    """
+    results: List[PageResult] = []
+    for page in pages:
+        ref_s = cand_s = float("inf")
+        for _ in range(max(1, repeat)):
+            ref, t = _timed_parse(reference, page)
+            ref_s = min(ref_s, t)
+            cand, t = _timed_parse(candidate, page)
+            cand_s = min(cand_s, t)
+        results.append(
+            PageResult(
+                name=page.name,
+                size_kb=len(page.html) / 1024,
+                reference_s=ref_s,
+                candidate_s=cand_s,
+                listings=len(ref[0]),
+                diffs=diff_results(ref, cand, ignore=ignore),
+            )
+        )
+    return results
+
+
+def summarize(results: Sequence[PageResult]) -> Dict[str, Any]:
+    ref_total = sum(r.reference_s for r in results)
+    cand_total = sum(r.candidate_s for r in results)
+    speedups = [r.speedup for r in results if r.candidate_s > 0]
+    return {
+        "pages": len(results),
+        "pages_with_diffs": sum(1 for r in results if r.diffs),
+        "listings": sum(r.listings for r in results),
+        "reference_s": round(ref_total, 4),
+        "candidate_s": round(cand_total, 4),
+        "total_speedup": round(ref_total / cand_total, 2) if cand_total else None,
+        "median_speedup": round(statistics.median(speedups), 2) if speedups else None,
+        "min_speedup": round(min(speedups), 2) if speedups else None,
+    }
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Compare the working-tree parser against a frozen reference over recorded and generated pages."
+    )
+    ref = parser.add_mutually_exclusive_group(required=True)
+    ref.add_argument("--reference-rev", default=None, help="git revision to take the reference parser from")
+    ref.add_argument("--reference-file", default=None, help="saved copy of redfin_scraper.py to use as the reference")
+    parser.add_argument(
+        "--candidate-file", default=None, help="parser to test instead of the working-tree scripts/redfin_scraper.py"
+    )
+    parser.add_argument("--pages", action="append", default=[], metavar="DIR", help="recorded pages (*.html[.gz]); repeatable")
+    parser.add_argument("--http-cache", default=None, metavar="PATH", help="also use pages stored in this response cache")
+    parser.add_argument("--generated", type=int, default=100, help="number of generated stand-in pages (default 100)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="time each parse as the best of N runs (default 3)")
+    parser.add_argument("--ignore-field", action="append", default=[], help="Listing field to leave out of the diff")
+    parser.add_argument("--show", type=int, default=10, help="differing pages to print in detail (default 10)")
+    parser.add_argument("--json", default=None, metavar="PATH", help="also write the full report as JSON")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    if args.reference_file:
+        with open(args.reference_file, "r", encoding="utf-8") as f:
+            ref_source, ref_label = f.read(), args.reference_file
+    else:
+        ref_source, ref_label = reference_source(args.reference_rev), f"{args.reference_rev}:{PARSER_PATH}"
+    cand_path = args.candidate_file or os.path.join(SCRIPTS_DIR, "redfin_scraper.py")
+    with open(cand_path, "r", encoding="utf-8") as f:
+        cand_source = f.read()
+    reference = load_parser(ref_source, "redfin_scraper_reference")
+    candidate = load_parser(cand_source, "redfin_scraper_candidate")
+
+    pages = recorded_pages(args.pages)
+    if args.http_cache:
+        pages += cached_pages(args.http_cache)
+    pages += generated_pages(args.generated, seed=args.seed)
+    if not pages:
+        raise SystemExit("no pages to compare (use --pages, --http-cache or --generated)")
+
+    print(f"[diff] reference {ref_label} vs candidate {os.path.relpath(cand_path, REPO_DIR)} on {len(pages)} pages")
+    results = compare_parsers(reference, candidate, pages, repeat=args.repeat, ignore=args.ignore_field)
+    summary = summarize(results)
+
+    differing = [r for r in results if r.diffs]
+    for r in differing[: max(0, args.show)]:
+        print(f"\n--- {r.name} ({r.size_kb:.0f} KB, {len(r.diffs)} differences)")
+        for line in r.diffs[:10]:
+            print(f"  {line}")
+    if len(differing) > args.show:
+        print(f"\n... and {len(differing) - args.show} more pages with differences")
+
+    print("\n=== Parser diff ===")
+    for k, v in summary.items():
+        print(f"{k:>17}: {v}")
+    slowest = sorted(results, key=lambda r: r.speedup)[:5]
+    for r in slowest:
+        print(f"{'slowest':>17}: {r.name} {r.reference_s * 1000:.2f}ms -> {r.candidate_s * 1000:.2f}ms ({r.speedup:.2f}x)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"reference": ref_label, "summary": summary, "pages": [r.as_dict() for r in results]}, f, indent=2)
+            f.write("\n")
+    return 1 if differing else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
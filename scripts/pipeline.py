@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+@dataclass
+class StageSpec:
+    """
+    One pipeline stage. `fn` takes a work item and returns it (possibly updated); it runs
+    on `workers` threads. An `ordered` stage runs on one thread and sees items strictly
+    in `seq` order (used where results must not depend on timing, e.g. dedup and output).
+    """
+
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    ordered: bool = False
+
+
+@dataclass
+class StageStats:
+    workers: int
+    items: int = 0
+    busy_s: float = 0.0
+    errors: int = 0
+    max_queue_depth: int = 0
+    queue_depth_sum: int = 0
+    queue_samples: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "busy_s": round(self.busy_s, 6),
+            "errors": self.errors,
+            "max_queue_depth": self.max_queue_depth,
+            "avg_queue_depth": round(self.queue_depth_sum / self.queue_samples, 3) if self.queue_samples else 0.0,
+        }
+
+
+_DONE = object()
+
+
+@dataclass
+class _StageRuntime:
+    spec: StageSpec
+    inbox: "queue.Queue[Any]"
+    stats: StageStats
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    live_workers: int = 0
+    next_seq: int = 0
+    pending: Dict[int, Any] = field(default_factory=dict)
+
+
+class Pipeline:
+    """
+    Stages connected by bounded queues, each with its own worker threads.
+
+    Backpressure: a full queue blocks the stage feeding it, and at most `window` items are
+    in flight end to end (the source waits for the last stage to finish one before it
+    admits another), so memory stays capped however uneven the stages are and
+    throughput is set by the slowest stage. Items need an integer `seq` (0, 1, 2, ...)
+    and a boolean `skipped`; a stage that raises marks the item skipped and it keeps
+    flowing, so ordered stages never wait on a gap.
+    """
+
+    def __init__(self, stages: List[StageSpec], *, queue_size: int = 4, window: Optional[int] = None) -> None:
+        if not stages:
+            raise ValueError("pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        total_workers = sum(1 if s.ordered else max(1, s.workers) for s in stages)
+        self.window = window or (self.queue_size * len(stages) + total_workers)
+        self._runtimes: List[_StageRuntime] = []
+        self._window = threading.Semaphore(self.window)
+
+    def run(self, items: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        self._runtimes = [
+            _StageRuntime(
+                spec=s,
+                inbox=queue.Queue(maxsize=self.queue_size),
+                stats=StageStats(workers=1 if s.ordered else max(1, s.workers)),
+            )
+            for s in self.stages
+        ]
+        threads: List[threading.Thread] = []
+        for idx, rt in enumerate(self._runtimes):
+            rt.live_workers = rt.stats.workers
+            for w in range(rt.stats.workers):
+                t = threading.Thread(target=self._worker, args=(idx,), name=f"{rt.spec.name}-{w}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        first = self._runtimes[0]
+        for item in items:
+            self._window.acquire()
+            self._put(first, item)
+        first.inbox.put(_DONE)
+
+        for t in threads:
+            t.join()
+        return {rt.spec.name: rt.stats.as_dict() for rt in self._runtimes}
+
+    def _put(self, rt: _StageRuntime, item: Any) -> None:
+        rt.inbox.put(item)
+        depth = rt.inbox.qsize()
+        with rt.lock:
+            rt.stats.max_queue_depth = max(rt.stats.max_queue_depth, depth)
+            rt.stats.queue_depth_sum += depth
+            rt.stats.queue_samples += 1
+
+    def _apply(self, rt: _StageRuntime, item: Any) -> Any:
+        t0 = time.perf_counter()
+        if not getattr(item, "skipped", False) or rt.spec.ordered:
+            try:
+                item = rt.spec.fn(item)
+            except Exception as exc:
+                print(f"[pipeline] {rt.spec.name} failed on item {getattr(item, 'seq', '?')}: {type(exc).__name__}: {exc}")
+                item.skipped = True
+                with rt.lock:
+                    rt.stats.errors += 1
+        with rt.lock:
+            rt.stats.items += 1
+            rt.stats.busy_s += time.perf_counter() - t0
+        return item
+
+    def _emit(self, idx: int, item: Any) -> None:
+        if idx + 1 < len(self._runtimes):
+            self._put(self._runtimes[idx + 1], item)
+        else:
+            self._window.release()
+
+    def _worker(self, idx: int) -> None:
+        rt = self._runtimes[idx]
+        while True:
+            item = rt.inbox.get()
+            if item is _DONE:
+                # Let sibling workers see it too; the last one out closes the next stage.
+                rt.inbox.put(_DONE)
+                with rt.lock:
+                    rt.live_workers -= 1
+                    last = rt.live_workers == 0
+                if last:
+                    if rt.spec.ordered and rt.pending:
+                        for seq in sorted(rt.pending):
+                            self._emit(idx, self._apply(rt, rt.pending.pop(seq)))
+                    if idx + 1 < len(self._runtimes):
+                        self._runtimes[idx + 1].inbox.put(_DONE)
+                return
+
+            if not rt.spec.ordered:
+                self._emit(idx, self._apply(rt, item))
+                continue
+
+            # Ordered stage: hold items until every earlier seq has been processed.
+            rt.pending[item.seq] = item
+            while rt.next_seq in rt.pending:
+                ready = rt.pending.pop(rt.next_seq)
+                rt.next_seq += 1
+                self._emit(idx, self._apply(rt, ready))
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+
+@dataclass
+class StageTimer:
+    """
+    Accumulates wall-clock seconds and call counts per named stage.
+    Timings recorded here are also added to `parent` (e.g. search -> run). Safe to
+    share between pipeline worker threads.
+    """
+
+    seconds: Dict[str, float] = field(default_factory=dict)
+    calls: Dict[str, int] = field(default_factory=dict)
+    parent: Optional["StageTimer"] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, name: str, elapsed_s: float) -> None:
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed_s
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.parent is not None:
+            self.parent.add(name, elapsed_s)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {"seconds": round(self.seconds[name], 6), "calls": self.calls.get(name, 0)}
+                for name in sorted(self.seconds)
+            }
+
+
+def stage(timer: Optional[StageTimer], name: str) -> contextlib.AbstractContextManager:
+    """
+    `with stage(timer, "parse.walk"):` that is a no-op when no timer is passed.
+    """
+    if timer is None:
+        return contextlib.nullcontext()
+    return timer.stage(name)
+
+
+@dataclass
+class RunProfile:
+    """
+    Stage timings for one run: totals for the whole run plus one timer per search,
+    and per-stage pipeline stats (workers, busy time, queue depths) when available.
+    """
+
+    run: StageTimer = field(default_factory=StageTimer)
+    searches: Dict[str, StageTimer] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.time)
+    pipeline: Dict[str, Any] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def for_search(self, search_id: Any) -> StageTimer:
+        key = str(search_id)
+        with self._lock:
+            timer = self.searches.get(key)
+            if timer is None:
+                timer = StageTimer(parent=self.run)
+                self.searches[key] = timer
+        return timer
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "wall_s": round(time.time() - self.started_at, 6),
+            "run": self.run.as_dict(),
+            "searches": {k: t.as_dict() for k, t in self.searches.items()},
+            "pipeline": self.pipeline,
+        }
+
+
+def write_profile_summary(profile: RunProfile, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile.as_dict(), f, indent=2)
+        f.write("\n")
+
+
+class ThreadedProfiler:
+    """
+    cProfile for a multi-threaded run. Before 3.12 a cProfile.Profile only sees the thread
+    that enabled it, so start() also hooks threading.setprofile: every thread started
+    afterwards (pipeline stage workers, startup loaders) enables its own Profile on its
+    first event, and dump() merges them all into one pstats file. From 3.12 on cProfile
+    sees every thread and the single profile is enough.
+    """
+
+    def __init__(self) -> None:
+        import cProfile
+
+        self._new_profile = cProfile.Profile
+        self._main = cProfile.Profile()
+        self._threads: List[Any] = []
+        self._lock = threading.Lock()
+        self._per_thread = sys.version_info < (3, 12)
+
+    def _start_thread(self, frame: Any, event: str, arg: Any) -> None:
+        # Runs once per new thread: enabling the Profile replaces this hook for the thread.
+        prof = self._new_profile()
+        with self._lock:
+            self._threads.append(prof)
+        prof.enable()
+
+    def start(self) -> None:
+        if self._per_thread:
+            threading.setprofile(self._start_thread)
+        self._main.enable()
+
+    def stop(self) -> None:
+        self._main.disable()
+        if self._per_thread:
+            threading.setprofile(None)
+
+    def dump(self, path: str) -> None:
+        """
+        Merge the main-thread and worker-thread profiles into one pstats file (call after stop()).
+        """
+        import pstats
+
+        stats = pstats.Stats(self._main)
+        with self._lock:
+            threads = list(self._threads)
+        for prof in threads:
+            prof.create_stats()
+            if prof.stats:
+                stats.add(prof)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        stats.dump_stats(path)
@@ -2,12 +2,14 @@ from __future__ import annotations
 
 import json
 import re
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urljoin
 
 from bs4 import BeautifulSoup
 
+from profiling import StageTimer, stage
+
 
 @dataclass(frozen=True)
 class Listing:
@@ -22,6 +24,20 @@ class Listing:
     zoning: Optional[str]
     url: Optional[str]
     raw: Dict[str, Any]
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+def dump_parse_result(listings: List[Listing], meta: Dict[str, Any]) -> str:
+    """
+    JSON form of a parse_redfin_search_results() result, for caching it next to the page.
+    """
+    return json.dumps({"listings": [asdict(l) for l in listings], "meta": meta})
+
+
+def load_parse_result(data: str) -> Tuple[List[Listing], Dict[str, Any]]:
+    obj = json.loads(data)
+    return [Listing(**l) for l in obj["listings"]], obj["meta"]
 
 
 def _unwrap_value(val: Any) -> Any:
@@ -61,6 +77,27 @@ def _safe_int(val: Any) -> Optional[int]:
         return None
 
 
+def _safe_lat_long(node: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Coordinates from the GIS shape {"latLong": {"value": {"latitude", "longitude"}}}
+    or from flat latitude/longitude keys. Out-of-range values are treated as missing.
+    """
+    src = _unwrap_value(node.get("latLong") or node.get("latlong"))
+    if not isinstance(src, dict):
+        src = node
+    try:
+        lat = _unwrap_value(src.get("latitude", src.get("lat")))
+        lon = _unwrap_value(src.get("longitude", src.get("lng", src.get("lon"))))
+        if lat is None or lon is None or isinstance(lat, bool) or isinstance(lon, bool):
+            return None, None
+        lat_f, lon_f = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None, None
+    if not (-90.0 <= lat_f <= 90.0 and -180.0 <= lon_f <= 180.0) or (lat_f == 0.0 and lon_f == 0.0):
+        return None, None
+    return lat_f, lon_f
+
+
 def _extract_json_blobs_from_scripts(html: str) -> List[Dict[str, Any]]:
     """
     Redfin pages often contain embedded JSON within script tags.
@@ -315,6 +352,7 @@ def _best_effort_extract_listings_from_json(blobs: List[Dict[str, Any]]) -> List
 
             if not any([addr, city, price, home_sqft, lot_sqft, url]):
                 continue
+            latitude, longitude = _safe_lat_long(node)
 
             if isinstance(url, str) and url:
                 seen_urls.add(url)
@@ -332,6 +370,8 @@ def _best_effort_extract_listings_from_json(blobs: List[Dict[str, Any]]) -> List
                     zoning=zoning if isinstance(zoning, str) else None,
                     url=url if isinstance(url, str) else None,
                     raw=node,
+                    latitude=latitude,
+                    longitude=longitude,
                 )
             )
 
@@ -342,9 +382,14 @@ def _extract_listings_from_html_cards(html: str, base_url: str) -> List[Listing]
     """
     Fallback: scrape visible cards. This is less reliable (Redfin HTML changes),
     but can still capture address/price/link in many cases.
+    Card grids put many anchors under one container, so each container's text is
+    computed once and shared by its anchors, and a URL that already has a card is
+    skipped before any text is extracted for it.
     """
     soup = BeautifulSoup(html, "html.parser")
     listings: List[Listing] = []
+    seen_urls: set[str] = set()
+    parent_texts: Dict[int, str] = {}  # id(parent) -> its text; the soup keeps every tag alive
 
     # Try a few generic patterns
     # 1) anchor tags to /WA/... or /[state]/[city]/.../home/... patterns
@@ -356,15 +401,20 @@ def _extract_listings_from_html_cards(html: str, base_url: str) -> List[Listing]
         if "/home/" not in href and "/property/" not in href:
             continue
         full = urljoin(base_url, href)
+        if full in seen_urls:
+            continue
 
         text = " ".join(a.get_text(" ", strip=True).split())
         if not text:
             continue
+        seen_urls.add(full)
         # Attempt to locate surrounding price/address content
         parent = a.parent
         parent_text = ""
         if parent is not None:
-            parent_text = " ".join(parent.get_text(" ", strip=True).split())
+            parent_text = parent_texts.get(id(parent))
+            if parent_text is None:
+                parent_text = parent_texts[id(parent)] = " ".join(parent.get_text(" ", strip=True).split())
         blob = parent_text or text
 
         price = None
@@ -393,30 +443,34 @@ def _extract_listings_from_html_cards(html: str, base_url: str) -> List[Listing]
                 raw={"card_text": blob},
             )
         )
-
-    # De-dupe by URL
-    dedup: Dict[str, Listing] = {}
-    for lst in listings:
-        if lst.url:
-            dedup.setdefault(lst.url, lst)
-    return list(dedup.values())
+    return listings
 
 
-def parse_redfin_search_results(html: str, *, base_url: str = "https://www.redfin.com") -> Tuple[List[Listing], Dict[str, Any]]:
+def parse_redfin_search_results(
+    html: str,
+    *,
+    base_url: str = "https://www.redfin.com",
+    timer: Optional[StageTimer] = None,
+) -> Tuple[List[Listing], Dict[str, Any]]:
     """
     Parse Redfin search HTML and return a list of Listing records.
     Strategy:
     - parse embedded JSON blobs in scripts (best)
     - fallback to simple HTML card scraping (worst)
+    Sub-step timings are recorded into `timer` when one is given.
     """
-    blobs = _extract_json_blobs_from_scripts(html)
-    initial_contexts = _extract_initial_context_from_scripts(html)
+    with stage(timer, "parse.scripts"):
+        blobs = _extract_json_blobs_from_scripts(html)
+    with stage(timer, "parse.initial_context"):
+        initial_contexts = _extract_initial_context_from_scripts(html)
     stingray_blobs: List[Dict[str, Any]] = []
-    for ctx in initial_contexts:
-        stingray_blobs.extend(_extract_stingray_json_from_initial_context(ctx))
+    with stage(timer, "parse.gis_decode"):
+        for ctx in initial_contexts:
+            stingray_blobs.extend(_extract_stingray_json_from_initial_context(ctx))
 
     all_blobs = blobs + initial_contexts + stingray_blobs
-    listings = _best_effort_extract_listings_from_json(all_blobs)
+    with stage(timer, "parse.walk"):
+        listings = _best_effort_extract_listings_from_json(all_blobs)
     meta: Dict[str, Any] = {
         "json_blobs_found": len(blobs),
         "initial_contexts_found": len(initial_contexts),
@@ -425,7 +479,8 @@ def parse_redfin_search_results(html: str, *, base_url: str = "https://www.redfi
     }
 
     if not listings:
-        listings = _extract_listings_from_html_cards(html, base_url=base_url)
+        with stage(timer, "parse.html_cards"):
+            listings = _extract_listings_from_html_cards(html, base_url=base_url)
         meta["listings_from_html"] = len(listings)
 
     # Normalize URLs
@@ -447,6 +502,8 @@ def parse_redfin_search_results(html: str, *, base_url: str = "https://www.redfi
                 zoning=l.zoning,
                 url=url,
                 raw=l.raw,
+                latitude=l.latitude,
+                longitude=l.longitude,
             )
         )
     return normalized, meta
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import csv
+import math
+import os
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from search_plan import SearchDef
+
+# Output rows of one search, stored column-wise: numbers in typed arrays (8 bytes a
+# value, no per-value objects), text as one list per column, and the search's own
+# fields (id, category, city, description, url) once per batch instead of once per row.
+# The runner fills, dedups, enriches and writes these batches without ever building a
+# per-listing dict; row()/rows() are there for the few callers that want dicts.
+
+INT_COLUMNS = ("listing_price", "home_sqft", "lot_sqft", "deal_rating")
+FLOAT_COLUMNS = ("home_price_per_sqft", "lot_price_per_sqft", "latitude", "longitude", "comp_price_per_sqft")
+STR_COLUMNS = (
+    "location_value",
+    "tax_parcel_number",
+    "mls_listing_id",
+    "listing_city",
+    "listing_zipcode",
+    "address",
+    "zoning",
+    "listing_url",
+)
+SEARCH_COLUMNS = ("search_id", "search_category", "search_city", "search_description", "search_url")
+
+_INT_NULL = -(1 << 63)  # array("q") can't hold None; this value never occurs in real data
+_FLOAT_NULL = math.nan
+
+
+def _search_values(search: SearchDef) -> Dict[str, Any]:
+    return {
+        "search_id": search.search_id,
+        "search_category": search.category,
+        "search_city": search.city,
+        "search_description": search.description,
+        "search_url": search.url,
+    }
+
+
+class RowBatch:
+    """
+    Rows for one search as typed columns. Missing numbers are kept as sentinels and
+    read back as None, so values round-trip exactly as a dict row would hold them.
+    """
+
+    __slots__ = ("search", "_search_values", "_ints", "_floats", "_strs", "_n")
+
+    def __init__(self, search: SearchDef) -> None:
+        self.search = search
+        self._search_values = _search_values(search)
+        self._ints: Dict[str, array] = {c: array("q") for c in INT_COLUMNS}
+        self._floats: Dict[str, array] = {c: array("d") for c in FLOAT_COLUMNS}
+        self._strs: Dict[str, List[Optional[str]]] = {c: [] for c in STR_COLUMNS}
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def append(
+        self,
+        *,
+        mls_listing_id: Optional[str],
+        listing_city: Optional[str],
+        listing_zipcode: Optional[str],
+        address: Optional[str],
+        listing_price: Optional[int],
+        home_sqft: Optional[int],
+        lot_sqft: Optional[int],
+        zoning: Optional[str],
+        home_price_per_sqft: Optional[float],
+        lot_price_per_sqft: Optional[float],
+        deal_rating: Optional[int],
+        listing_url: Optional[str],
+        latitude: Optional[float],
+        longitude: Optional[float],
+        comp_price_per_sqft: Optional[float],
+        location_value: Optional[str] = None,
+        tax_parcel_number: Optional[str] = None,
+    ) -> int:
+        """
+        Add one row; returns its index.
+        """
+        ints, floats, strs = self._ints, self._floats, self._strs
+        ints["listing_price"].append(_INT_NULL if listing_price is None else listing_price)
+        ints["home_sqft"].append(_INT_NULL if home_sqft is None else home_sqft)
+        ints["lot_sqft"].append(_INT_NULL if lot_sqft is None else lot_sqft)
+        ints["deal_rating"].append(_INT_NULL if deal_rating is None else deal_rating)
+        floats["home_price_per_sqft"].append(_FLOAT_NULL if home_price_per_sqft is None else home_price_per_sqft)
+        floats["lot_price_per_sqft"].append(_FLOAT_NULL if lot_price_per_sqft is None else lot_price_per_sqft)
+        floats["latitude"].append(_FLOAT_NULL if latitude is None else latitude)
+        floats["longitude"].append(_FLOAT_NULL if longitude is None else longitude)
+        floats["comp_price_per_sqft"].append(_FLOAT_NULL if comp_price_per_sqft is None else comp_price_per_sqft)
+        strs["location_value"].append(location_value)
+        strs["tax_parcel_number"].append(tax_parcel_number)
+        strs["mls_listing_id"].append(mls_listing_id)
+        strs["listing_city"].append(listing_city)
+        strs["listing_zipcode"].append(listing_zipcode)
+        strs["address"].append(address)
+        strs["zoning"].append(zoning)
+        strs["listing_url"].append(listing_url)
+        self._n += 1
+        return self._n - 1
+
+    def column(self, name: str) -> List[Any]:
+        """
+        One column as a list, with None for missing values.
+        """
+        if name in self._strs:
+            return list(self._strs[name])
+        if name in self._ints:
+            return [None if v == _INT_NULL else v for v in self._ints[name]]
+        if name in self._floats:
+            return [None if v != v else v for v in self._floats[name]]  # NaN != NaN
+        if name in self._search_values:
+            return [self._search_values[name]] * self._n
+        raise KeyError(name)
+
+    def get(self, i: int, name: str) -> Any:
+        if name in self._strs:
+            return self._strs[name][i]
+        if name in self._ints:
+            v = self._ints[name][i]
+            return None if v == _INT_NULL else v
+        if name in self._floats:
+            v = self._floats[name][i]
+            return None if v != v else v
+        if name in self._search_values:
+            return self._search_values[name]
+        raise KeyError(name)
+
+    def set(self, i: int, name: str, value: Any) -> None:
+        if name in self._strs:
+            self._strs[name][i] = value
+        elif name in self._ints:
+            self._ints[name][i] = _INT_NULL if value is None else value
+        elif name in self._floats:
+            self._floats[name][i] = _FLOAT_NULL if value is None else value
+        else:
+            raise KeyError(f"{name} is not a per-row column")
+
+    def set_column(self, name: str, values: Sequence[Optional[str]]) -> None:
+        """
+        Replace a whole text column (e.g. lookup results), one value per row.
+        """
+        if name not in self._strs:
+            raise KeyError(f"{name} is not a text column")
+        if len(values) != self._n:
+            raise ValueError(f"{name}: expected {self._n} values, got {len(values)}")
+        self._strs[name] = list(values)
+
+    def row(self, i: int, fieldnames: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        names = fieldnames or SEARCH_COLUMNS + STR_COLUMNS + INT_COLUMNS + FLOAT_COLUMNS
+        return {name: self.get(i, name) for name in names}
+
+    def rows(self, fieldnames: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+        for i in range(self._n):
+            yield self.row(i, fieldnames)
+
+    def records(self, fieldnames: Sequence[str]) -> Iterator[Tuple[Any, ...]]:
+        """
+        Rows as tuples in `fieldnames` order (None for missing), for csv.writer.
+        """
+        return zip(*[self.column(name) for name in fieldnames])
+
+
+class CsvBatchWriter:
+    """
+    Streams batches to a CSV with a fixed header; same bytes as csv.DictWriter on dict rows.
+    Rows go to `path`.tmp; close() moves it over `path`, or deletes it with publish=False,
+    so an interrupted run never leaves a partial file at `path`.
+    """
+
+    def __init__(self, path: str, fieldnames: Sequence[str]) -> None:
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.fieldnames = list(fieldnames)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._f = open(self.tmp_path, "w", newline="", encoding="utf-8")
+        self._w = csv.writer(self._f)
+        self._w.writerow(self.fieldnames)
+
+    def write(self, batch: RowBatch) -> None:
+        self._w.writerows(batch.records(self.fieldnames))
+
+    def close(self, *, publish: bool = True) -> None:
+        self._f.close()
+        _finish(self.tmp_path, self.path, publish)
+
+
+class ParquetBatchWriter:
+    """
+    Streams batches into one Parquet file (needs pyarrow). Each batch is a row group;
+    the search columns are dictionary-encoded, so a batch stores them once. Written to
+    `path`.tmp and moved into place by close(), like CsvBatchWriter.
+    """
+
+    def __init__(self, path: str, fieldnames: Sequence[str]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.fieldnames = list(fieldnames)
+        types = {c: pa.int64() for c in INT_COLUMNS}
+        types.update({c: pa.float64() for c in FLOAT_COLUMNS})
+        types.update({c: pa.string() for c in STR_COLUMNS})
+        types.update({c: pa.dictionary(pa.int32(), pa.string()) for c in SEARCH_COLUMNS})
+        types["search_id"] = pa.dictionary(pa.int32(), pa.int64())
+        self.schema = pa.schema([(c, types[c]) for c in self.fieldnames])
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._writer = pq.ParquetWriter(self.tmp_path, self.schema)
+
+    def write(self, batch: RowBatch) -> None:
+        if not len(batch):
+            return
+        pa = self._pa
+        arrays = []
+        for field in self.schema:
+            if field.name in SEARCH_COLUMNS:
+                indices = pa.array([0] * len(batch), pa.int32())
+                dictionary = pa.array([batch.get(0, field.name)], field.type.value_type)
+                arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+            else:
+                arrays.append(pa.array(batch.column(field.name), field.type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self, *, publish: bool = True) -> None:
+        self._writer.close()
+        _finish(self.tmp_path, self.path, publish)
+
+
+def _finish(tmp_path: str, path: str, publish: bool) -> None:
+    if publish:
+        os.replace(tmp_path, path)
+    else:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def open_writers(csv_path: str, fieldnames: Sequence[str], *, parquet: bool = False) -> List[Any]:
+    """
+    CSV writer plus, when asked for, a Parquet writer next to it (same name, .parquet).
+    Parquet is skipped with a message if pyarrow isn't installed.
+    """
+    writers: List[Any] = [CsvBatchWriter(csv_path, fieldnames)]
+    if parquet:
+        try:
+            writers.append(ParquetBatchWriter(os.path.splitext(csv_path)[0] + ".parquet", fieldnames))
+        except ImportError:
+            print("[output] Parquet output needs pyarrow (pip install pyarrow); writing CSV only")
+    return writers
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+# Bump when SearchDef or the validation rules change so stale plans are rebuilt.
+PLAN_VERSION = 2
+
+
+@dataclass(frozen=True)
+class SearchDef:
+    search_id: int
+    category: str
+    city: str
+    description: str
+    url: str
+    hot: bool = False  # also polled by `watch` between daily runs
+
+
+def default_cache_dir() -> str:
+    return os.getenv("REDFIN_CACHE_DIR", "").strip() or ".cache"
+
+
+def _parse_searches_yaml(path: str) -> List[SearchDef]:
+    import yaml  # only needed when the compiled plan is missing or stale
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    searches = data.get("searches") or []
+    out: List[SearchDef] = []
+    for s in searches:
+        out.append(
+            SearchDef(
+                search_id=int(s["search_id"]),
+                category=str(s["category"]),
+                city=str(s.get("city", "")),
+                description=str(s.get("description", "")),
+                url=str(s["url"]),
+                hot=bool(s.get("hot", False)),
+            )
+        )
+    validate_searches(out)
+    return out
+
+
+def validate_searches(searches: List[SearchDef]) -> None:
+    # ensure unique IDs
+    ids = [s.search_id for s in searches]
+    if len(ids) != len(set(ids)):
+        raise ValueError("search_id values must be unique in config/searches.yaml")
+
+
+def _plan_path(config_path: str, cache_dir: str) -> str:
+    name = os.path.abspath(config_path).strip(os.sep).replace(os.sep, "_").replace(":", "_")
+    return os.path.join(cache_dir, "search_plans", name + ".json")
+
+
+def _fingerprint(config_path: str) -> Dict[str, Any]:
+    st = os.stat(config_path)
+    return {"version": PLAN_VERSION, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def load_searches(path: str, *, cache_dir: Optional[str] = None, use_cache: bool = True) -> List[SearchDef]:
+    """
+    Load and validate searches.yaml.
+    The validated list is cached as JSON keyed by the file's mtime/size, so repeated
+    invocations skip YAML parsing (and importing yaml) until the file changes.
+    """
+    cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+    plan_path = _plan_path(path, cache_dir)
+    fp = _fingerprint(path)
+
+    if use_cache:
+        try:
+            with open(plan_path, "r", encoding="utf-8") as f:
+                plan = json.load(f)
+            if plan.get("fingerprint") == fp:
+                return [SearchDef(**s) for s in plan["searches"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    searches = _parse_searches_yaml(path)
+    try:
+        os.makedirs(os.path.dirname(plan_path), exist_ok=True)
+        tmp = plan_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fp, "searches": [asdict(s) for s in searches]}, f)
+        os.replace(tmp, plan_path)
+    except OSError:
+        # A read-only checkout still works, it just re-parses every time.
+        pass
+    return searches
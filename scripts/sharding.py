@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import csv
+import glob
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from search_plan import SearchDef
+
+
+SHARD_MODES = ("position", "hash")
+
+_PARTIAL_RE = re.compile(r"^shard-(\d+)-of-(\d+)\.csv$")
+
+
+@dataclass(frozen=True)
+class ShardSpec:
+    index: int
+    count: int
+    mode: str = "position"
+
+    def __post_init__(self) -> None:
+        if self.count < 1:
+            raise ValueError("shard count must be >= 1")
+        if not 0 <= self.index < self.count:
+            raise ValueError(f"shard index must be in [0, {self.count - 1}]")
+        if self.mode not in SHARD_MODES:
+            raise ValueError(f"shard mode must be one of {', '.join(SHARD_MODES)}")
+
+    @property
+    def label(self) -> str:
+        return f"shard-{self.index:03d}-of-{self.count:03d}"
+
+
+def shard_of(search: SearchDef, position: int, *, count: int, mode: str) -> int:
+    """
+    `position` deals searches round-robin in config order (even split);
+    `hash` keys on search_id, so adding searches doesn't move existing ones between nodes.
+    """
+    if mode == "hash":
+        return zlib.crc32(str(search.search_id).encode("utf-8")) % count
+    return position % count
+
+
+def select_shard(searches: List[SearchDef], spec: ShardSpec) -> List[SearchDef]:
+    return [s for i, s in enumerate(searches) if shard_of(s, i, count=spec.count, mode=spec.mode) == spec.index]
+
+
+def partials_dir(out_dir: str) -> str:
+    return os.path.join(out_dir, "partials")
+
+
+def partial_output_path(out_dir: str, spec: ShardSpec) -> str:
+    return os.path.join(partials_dir(out_dir), spec.label + ".csv")
+
+
+def find_partials(out_dir: str) -> List[Tuple[int, int, str]]:
+    """
+    Return (index, count, path) for every shard partial in the day's output dir.
+    """
+    found: List[Tuple[int, int, str]] = []
+    for path in sorted(glob.glob(os.path.join(partials_dir(out_dir), "shard-*-of-*.csv"))):
+        m = _PARTIAL_RE.match(os.path.basename(path))
+        if m:
+            found.append((int(m.group(1)), int(m.group(2)), path))
+    return found
+
+
+def merge_partials(
+    out_dir: str,
+    searches: List[SearchDef],
+    *,
+    out_path: str,
+    allow_missing: bool = False,
+    rerate: Optional[Callable[[List[Dict[str, str]]], None]] = None,
+) -> int:
+    """
+    Combine shard partials into the canonical consolidated CSV.
+
+    Rows are ordered by the search's position in searches.yaml (file order within a
+    search), then deduplicated by listing_url keeping the first row, which is exactly
+    what a single-process run produces regardless of how searches were sharded.
+    Ratings that depend on earlier rows of the run (comps mode) differ per shard;
+    `rerate` gets the merged rows in order and may update them before they are written.
+    Returns the number of rows written.
+    """
+    partials = find_partials(out_dir)
+    if not partials:
+        raise FileNotFoundError(f"No shard partials found under {partials_dir(out_dir)}")
+
+    counts = {count for _, count, _ in partials}
+    if len(counts) != 1:
+        raise ValueError(f"Partials disagree on shard count: {sorted(counts)}")
+    count = counts.pop()
+    missing = sorted(set(range(count)) - {index for index, _, _ in partials})
+    if missing and not allow_missing:
+        raise ValueError(f"Missing shard partials {missing} of {count}")
+
+    order: Dict[str, int] = {str(s.search_id): i for i, s in enumerate(searches)}
+    fieldnames: Optional[List[str]] = None
+    keyed: List[Tuple[int, int, int, Dict[str, str]]] = []
+    for index, _, path in partials:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            if fieldnames is None:
+                fieldnames = list(reader.fieldnames or [])
+            for seq, row in enumerate(reader):
+                pos = order.get((row.get("search_id") or "").strip(), len(order))
+                keyed.append((pos, index, seq, row))
+    keyed.sort(key=lambda t: t[:3])
+
+    seen_listing_urls: set[str] = set()
+    rows: List[Dict[str, str]] = []
+    for _, _, _, row in keyed:
+        listing_url = (row.get("listing_url") or "").strip()
+        if listing_url:
+            if listing_url in seen_listing_urls:
+                continue
+            seen_listing_urls.add(listing_url)
+        rows.append(row)
+    if rerate is not None:
+        rerate(rows)
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames or [], extrasaction="ignore")
+        w.writeheader()
+        for r in rows:
+            w.writerow(r)
+    return len(rows)
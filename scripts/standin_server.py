@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# A local stand-in for Redfin: serves synthetic (or recorded) search-result pages in the
+# same embedded-JSON shape the parser expects, with configurable latency, 403/429
+# injection and payload size. Point the scraper at it with REDFIN_ORIGIN=http://HOST:PORT.
+# It also answers proxy-style absolute-URI requests, so several instances with different
+# block rates can stand in for a pool of egresses (REDFIN_PROXIES=http://HOST:PORT,...).
+
+_STREETS = ["Pine", "Alder", "Hume", "Oakes", "Yakima", "Sheridan", "Cedar", "Lawrence", "Proctor", "Union"]
+_SUFFIXES = ["St", "Ave", "Way", "Ct", "Pl"]
+_DIRS = ["N", "S", "E", "W", ""]
+
+
+@dataclass
+class StandinConfig:
+    latency_ms: float = 150.0
+    latency_jitter_ms: float = 100.0
+    block_rate: float = 0.0  # share of search/home requests answered 403
+    rate_limit_rate: float = 0.0  # share answered 429
+    homes_per_page: int = 40
+    padding_kb: int = 0  # extra inert markup per page, to mimic multi-MB real pages
+    overlap: float = 0.2  # share of a page's homes also returned by other searches
+    recorded_dir: Optional[str] = None
+    seed: int = 0
+    etag: bool = True  # send ETags and answer If-None-Match with 304
+    gzip: bool = True  # gzip bodies for clients that accept it
+
+
+def _seed_for(path: str, base_seed: int) -> int:
+    return zlib.crc32(path.encode("utf-8")) ^ base_seed
+
+
+def make_homes(seed: int, count: int, *, overlap: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    Deterministic GIS-style home records. About `overlap` of them come from a shared pool,
+    so different searches return some of the same listings (as real searches do).
+    """
+    r = random.Random(seed)
+    homes: List[Dict[str, Any]] = []
+    for i in range(count):
+        home_id = r.randint(0, 499) if r.random() < overlap else 1_000 + (seed % 100_000) * 1_000 + i
+        hr = random.Random(home_id)
+        number = hr.randint(100, 9999)
+        street = f"{hr.choice(_DIRS)} {hr.choice(_STREETS)} {hr.choice(_SUFFIXES)}".strip()
+        zipcode = str(98402 + hr.randint(0, 20))
+        slug = f"{number}-{street.replace(' ', '-')}-{zipcode}"
+        homes.append(
+            {
+                "mlsId": {"value": str(2_000_000 + home_id), "level": 1},
+                "price": {"value": hr.randint(180, 700) * 1000, "level": 1},
+                "sqFt": {"value": hr.randint(600, 3200), "level": 1},
+                "lotSize": {"value": hr.randint(2500, 20000), "level": 1},
+                "streetLine": {"value": f"{number} {street}", "level": 1},
+                "city": "Tacoma",
+                "state": "WA",
+                "zip": zipcode,
+                "url": f"/WA/Tacoma/{slug}/home/{home_id}",
+                "latLong": {"value": {"latitude": 47.15 + hr.random() * 0.2, "longitude": -122.55 + hr.random() * 0.2}},
+                "remarks": hr.choice(["Large lot with alley access.", "Needs work.", "Corner lot!", ""]),
+            }
+        )
+    return homes
+
+
+def make_search_page(seed: int, homes: int = 40, *, padding_kb: int = 0, overlap: float = 0.2) -> str:
+    """
+    Synthetic search-result page: an InitialContext script with a cached
+    /stingray/api/gis response (the shape parse_redfin_search_results reads).
+    """
+    gis = "{}&&" + json.dumps({"version": 1, "payload": {"homes": make_homes(seed, homes, overlap=overlap)}})
+    ctx = {"ReactServerAgent.cache": {"dataCache": {f"/stingray/api/gis?al=1&seed={seed}": {"res": {"text": gis}}}}}
+    padding = ""
+    if padding_kb > 0:
+        cell = '<div class="HomeCardContainer"><span class="filler">Lorem ipsum dolor sit amet</span></div>\n'
+        padding = cell * max(1, (padding_kb * 1024) // len(cell))
+    return (
+        "<!DOCTYPE html><html><head><title>Homes for sale</title>"
+        '<script type="application/ld+json">{"@type": "SearchResultsPage"}</script>'
+        "<script>root.__reactServerState = {};\n"
+        f"root.__reactServerState.InitialContext = {json.dumps(ctx)};</script>"
+        f"</head><body>{padding}</body></html>"
+    )
+
+
+def make_home_page(home_id: int) -> str:
+    r = random.Random(home_id)
+    zoning = r.choice(["R-2", "R-3", "RS-7200", "UR-1", "NRX"])
+    return (
+        "<!DOCTYPE html><html><head><title>Home</title></head><body>"
+        f"<div class='keyDetail'><span>MLS#</span> <span>{2_000_000 + home_id}</span></div>"
+        f"<div class='amenity'><span>Zoning: {zoning}</span></div>"
+        "</body></html>"
+    )
+
+
+class StandinServer:
+    def __init__(self, config: StandinConfig, *, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "search": 0,
+            "home": 0,
+            "blocked": 0,
+            "rate_limited": 0,
+            "not_modified": 0,
+            "bytes_sent": 0,
+        }
+        self._stats_lock = threading.Lock()
+        self._recorded = sorted(glob.glob(os.path.join(config.recorded_dir, "*.html"))) if config.recorded_dir else []
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def origin(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="standin-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + n
+
+    def _respond(self, path: str) -> Tuple[int, str]:
+        cfg = self.config
+        self._count("requests")
+        if path in ("/", ""):
+            return 200, "<html><body>ok</body></html>"
+        if path == "/__stats":
+            with self._stats_lock:
+                return 200, json.dumps(self.stats)
+
+        r = random.Random()
+        if cfg.block_rate and r.random() < cfg.block_rate:
+            self._count("blocked")
+            return 403, "<html><body>Forbidden</body></html>"
+        if cfg.rate_limit_rate and r.random() < cfg.rate_limit_rate:
+            self._count("rate_limited")
+            return 429, "<html><body>Too Many Requests</body></html>"
+
+        if "/home/" in path:
+            self._count("home")
+            try:
+                home_id = int(path.rstrip("/").rsplit("/", 1)[-1])
+            except ValueError:
+                return 404, "<html><body>Not found</body></html>"
+            return 200, make_home_page(home_id)
+
+        self._count("search")
+        seed = _seed_for(path, cfg.seed)
+        if self._recorded:
+            with open(self._recorded[seed % len(self._recorded)], "r", encoding="utf-8", errors="replace") as f:
+                return 200, f.read()
+        return 200, make_search_page(seed, cfg.homes_per_page, padding_kb=cfg.padding_kb, overlap=cfg.overlap)
+
+    def _make_handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802 (http.server naming)
+                cfg = server.config
+                delay_ms = cfg.latency_ms + random.uniform(0.0, cfg.latency_jitter_ms)
+                if delay_ms > 0:
+                    time.sleep(delay_ms / 1000.0)
+                # Proxied requests carry an absolute URI; serve them as if we were the origin.
+                status, body = server._respond(urlsplit(self.path).path)
+                data = body.encode("utf-8")
+                headers = {"Content-Type": "text/html; charset=utf-8"}
+                if status == 200 and cfg.etag:
+                    etag = f'"{zlib.crc32(data):08x}-{len(data)}"'
+                    headers["ETag"] = etag
+                    if self.headers.get("If-None-Match") == etag:
+                        server._count("not_modified")
+                        status, data = 304, b""
+                if data and cfg.gzip and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                    data = gzip.compress(data, compresslevel=5)
+                    headers["Content-Encoding"] = "gzip"
+                headers["Content-Length"] = str(len(data))
+                server._count("bytes_sent", len(data))
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local Redfin stand-in server for offline tests and benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--block-rate", type=float, default=0.0, help="share of requests answered 403")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--homes-per-page", type=int, default=40)
+    parser.add_argument("--padding-kb", type=int, default=0, help="extra markup per search page")
+    parser.add_argument("--overlap", type=float, default=0.2, help="share of homes shared between searches")
+    parser.add_argument("--recorded-dir", default=None, help="serve saved *.html pages instead of synthetic ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-etag", action="store_true", help="don't send ETags or answer 304")
+    parser.add_argument("--no-gzip", action="store_true", help="always send bodies uncompressed")
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> StandinConfig:
+    return StandinConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        block_rate=args.block_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        homes_per_page=args.homes_per_page,
+        padding_kb=args.padding_kb,
+        overlap=args.overlap,
+        recorded_dir=args.recorded_dir,
+        seed=args.seed,
+        etag=not args.no_etag,
+        gzip=not args.no_gzip,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    server = StandinServer(config_from_args(args), host=args.host, port=args.port)
+    print(f"Redfin stand-in listening on {server.origin} (export REDFIN_ORIGIN={server.origin})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
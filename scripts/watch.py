@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import collections
+import datetime as dt
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Sequence
+
+from search_plan import SearchDef, default_cache_dir
+
+if TYPE_CHECKING:
+    from http_client import FetchResult
+
+# Watch mode: polls the `hot: true` searches every few minutes under a fixed request
+# budget and appends an event to a JSONL feed whenever a listing shows up or one of its
+# key fields changes. Each listing is reduced to a short fingerprint, so a poll is
+# compared against everything seen before without keeping or re-emitting full rows.
+# A poll whose page is unchanged (304 from the response cache, or the same body hash)
+# is not parsed at all.
+
+# Row fields whose change is worth an event (price drops, corrected sizes, new ids).
+WATCH_FIELDS = ("listing_price", "home_sqft", "lot_sqft", "zoning", "mls_listing_id", "address")
+
+
+def default_state_path() -> str:
+    return os.path.join(default_cache_dir(), "watch_state.json")
+
+
+def default_feed_path() -> str:
+    return os.path.join("output", "watch", "events.jsonl")
+
+
+def listing_fingerprint(row: Dict[str, Any]) -> str:
+    payload = json.dumps([row.get(f) for f in WATCH_FIELDS], default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def body_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", errors="replace")).hexdigest()
+
+
+class RequestBudget:
+    """
+    At most `max_requests` request starts in any sliding `window_s`, shared by every
+    search; wait() blocks until a slot frees up (or `stop` is set).
+    """
+
+    def __init__(self, max_requests: int, window_s: float = 3600.0) -> None:
+        if max_requests <= 0:
+            raise ValueError("max_requests must be positive")
+        self.max_requests = max_requests
+        self.window_s = window_s
+        self._starts: Deque[float] = collections.deque()
+
+    def _expire(self, now: float) -> None:
+        while self._starts and now - self._starts[0] >= self.window_s:
+            self._starts.popleft()
+
+    def remaining(self) -> int:
+        self._expire(time.monotonic())
+        return self.max_requests - len(self._starts)
+
+    def wait(self, stop: Optional[threading.Event] = None) -> bool:
+        """
+        Reserve one request; False if `stop` was set while waiting.
+        """
+        while True:
+            now = time.monotonic()
+            self._expire(now)
+            if len(self._starts) < self.max_requests:
+                self._starts.append(now)
+                return True
+            delay = self.window_s - (now - self._starts[0])
+            if stop is not None:
+                if stop.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+
+
+@dataclass
+class WatchState:
+    """
+    What earlier polls saw, persisted between watch sessions: the last page hash per
+    search and a fingerprint per listing URL (shared by all searches, so a home matched
+    by two hot searches is announced once). URLs are kept after they drop off a page, so
+    a listing that flickers in and out of the results is not reported as new again.
+    """
+
+    path: str
+    bodies: Dict[str, str] = field(default_factory=dict)  # search_id -> body hash
+    listings: Dict[str, str] = field(default_factory=dict)  # listing_url -> fingerprint
+
+    @classmethod
+    def load(cls, path: str) -> "WatchState":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(path=path, bodies=dict(data.get("bodies", {})), listings=dict(data.get("listings", {})))
+        except (OSError, ValueError, AttributeError):
+            return cls(path=path)
+
+    def primed(self, search: SearchDef) -> bool:
+        return str(search.search_id) in self.bodies
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"bodies": self.bodies, "listings": self.listings}, f)
+        os.replace(tmp, self.path)
+
+
+def diff_rows(
+    state: WatchState,
+    search: SearchDef,
+    rows: Sequence[Dict[str, Any]],
+    *,
+    emit: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Record `rows` in `state` and return events for listings that are new or whose
+    WATCH_FIELDS changed. With emit=False (first poll of a search) only records them.
+    """
+    events: List[Dict[str, Any]] = []
+    now = dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds")
+    for row in rows:
+        url = (row.get("listing_url") or "").strip()
+        if not url:
+            continue
+        fp = listing_fingerprint(row)
+        old = state.listings.get(url)
+        if old == fp:
+            continue
+        state.listings[url] = fp
+        if not emit:
+            continue
+        events.append(
+            {
+                "ts": now,
+                "event": "new" if old is None else "changed",
+                "search_id": search.search_id,
+                "search_category": search.category,
+                "search_city": search.city,
+                "listing_url": url,
+                "row": row,
+            }
+        )
+    return events
+
+
+class EventFeed:
+    """
+    Append-only JSONL file; each batch is flushed and fsynced before the poll's state
+    is saved, so a crash can repeat an event but never lose one.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._f = open(path, "a", encoding="utf-8")
+
+    def append(self, events: Sequence[Dict[str, Any]]) -> None:
+        if not events:
+            return
+        for e in events:
+            self._f.write(json.dumps(e, default=str) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        self._f.close()
+
+
+@dataclass
+class _Slot:
+    search: SearchDef
+    next_at: float = 0.0
+    failures: int = 0
+
+
+@dataclass
+class WatchStats:
+    polls: int = 0
+    unchanged: int = 0
+    parsed: int = 0
+    failed: int = 0
+    events: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+def watch(
+    searches: Sequence[SearchDef],
+    *,
+    fetch: Callable[[SearchDef], "FetchResult"],
+    rows_for: Callable[[SearchDef, str], List[Dict[str, Any]]],
+    feed: EventFeed,
+    state: WatchState,
+    interval_s: float,
+    budget: RequestBudget,
+    max_rounds: Optional[int] = None,
+    stop: Optional[threading.Event] = None,
+    emit_initial: bool = False,
+) -> WatchStats:
+    """
+    Poll `searches` until `stop` is set (or each has been polled `max_rounds` times).
+    Each search is due `interval_s` (+/-10% jitter) after its last poll; a failed poll
+    backs that search off (doubling, up to 8x). `fetch` makes exactly one request and
+    `rows_for` turns a changed page into filtered rows.
+    """
+    stop = stop or threading.Event()
+    slots = [_Slot(s) for s in searches]
+    rounds: Dict[int, int] = {s.search_id: 0 for s in searches}
+    stats = WatchStats()
+    while not stop.is_set() and slots:
+        slot = min(slots, key=lambda x: x.next_at)
+        delay = slot.next_at - time.monotonic()
+        if delay > 0 and stop.wait(delay):
+            break
+        if not budget.wait(stop):
+            break
+
+        s = slot.search
+        key = str(s.search_id)
+        result = fetch(s)
+        stats.polls += 1
+        stamp = dt.datetime.now().strftime("%H:%M:%S")
+        if result.status_code != 200:
+            stats.failed += 1
+            slot.failures += 1
+            backoff = min(8, 2**slot.failures)
+            print(f"[watch {stamp}] search {s.search_id}: HTTP {result.status_code}; next poll in {interval_s * backoff:.0f}s")
+            slot.next_at = time.monotonic() + interval_s * backoff
+        else:
+            slot.failures = 0
+            digest = body_hash(result.text)
+            if state.primed(s) and (result.not_modified or state.bodies.get(key) == digest):
+                stats.unchanged += 1
+                print(f"[watch {stamp}] search {s.search_id}: unchanged")
+            else:
+                stats.parsed += 1
+                rows = rows_for(s, result.text)
+                events = diff_rows(state, s, rows, emit=emit_initial or state.primed(s))
+                state.bodies[key] = digest
+                feed.append(events)
+                state.save()
+                stats.events += len(events)
+                new = sum(1 for e in events if e["event"] == "new")
+                print(
+                    f"[watch {stamp}] search {s.search_id}: {len(rows)} listings, "
+                    f"{new} new, {len(events) - new} changed"
+                )
+            slot.next_at = time.monotonic() + interval_s * random.uniform(0.9, 1.1)
+
+        rounds[s.search_id] += 1
+        if max_rounds is not None and rounds[s.search_id] >= max_rounds:
+            slots.remove(slot)
+    return stats
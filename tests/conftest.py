@@ -0,0 +1,47 @@
+import os
+import sys
+
+# The scripts import each other by bare module name (they run as `python scripts/x.py`).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+
+import pytest
+
+STANDIN_SEARCHES = """searches:
+  - search_id: 1
+    category: DADU_play
+    city: Tacoma
+    description: ""
+    url: "https://www.redfin.com/city/17887/WA/Tacoma/filter/min-lot-size=6k-sqft"
+  - search_id: 2
+    category: DADU_play
+    city: Burien
+    description: ""
+    url: "https://www.redfin.com/city/2291/WA/Burien/filter/min-lot-size=6k-sqft"
+"""
+
+
+@pytest.fixture
+def standin_run(tmp_path, monkeypatch):
+    """
+    A stand-in server plus a working dir (searches.yaml, .cache, output/) for run_all().
+    """
+    from standin_server import StandinConfig, StandinServer
+
+    srv = StandinServer(StandinConfig(latency_ms=0, latency_jitter_ms=0, homes_per_page=5)).start()
+    monkeypatch.chdir(tmp_path)
+    for name, value in {
+        "REDFIN_ORIGIN": srv.origin,
+        "REDFIN_MIN_DELAY_S": "0",
+        "REDFIN_MAX_DELAY_S": "0",
+        "REDFIN_LOOKUP_RELOAD_S": "0",
+        "REDFIN_HTTP_CACHE": "off",
+        "REDFIN_RATING_MODE": "fixed",
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("REDFIN_CACHE_DIR", raising=False)
+    (tmp_path / "searches.yaml").write_text(STANDIN_SEARCHES, encoding="utf-8")
+    try:
+        yield srv
+    finally:
+        srv.stop()
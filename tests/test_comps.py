@@ -0,0 +1,101 @@
+import math
+import os
+import random
+
+import pytest
+
+from comps import _KM_PER_DEG_LAT, _KM_PER_DEG_LON_EQUATOR, GridIndex, load_history
+
+
+def _brute_force(points, lat, lon, k, max_km=None, exclude=None):
+    kx = _KM_PER_DEG_LON_EQUATOR * math.cos(math.radians(lat))
+    out = []
+    for key, plat, plon, value in points.values():
+        if key == exclude:
+            continue
+        d = math.hypot((plat - lat) * _KM_PER_DEG_LAT, (plon - lon) * kx)
+        if max_km is None or d <= max_km:
+            out.append((d, value))
+    return sorted(out)[:k]
+
+
+@pytest.mark.parametrize("cell_deg", [0.001, 0.005, 0.05])
+def test_nearest_matches_brute_force(cell_deg):
+    r = random.Random(7)
+    index = GridIndex(cell_deg)
+    points = {}
+    for i in range(600):
+        # clustered, so some queries land in empty cells far from everything
+        lat = 47.2 + r.gauss(0, 0.03) + (0.4 if i % 5 == 0 else 0)
+        lon = -122.4 + r.gauss(0, 0.03)
+        key = f"u{r.randint(0, 450)}"  # some keys are re-added (moved)
+        value = float(r.randint(100, 600))
+        index.add(key, lat, lon, value)
+        points[key] = (key, lat, lon, value)
+    assert len(index) == len(points)
+
+    for _ in range(200):
+        lat = 47.2 + r.uniform(-0.2, 0.6)
+        lon = -122.4 + r.uniform(-0.2, 0.2)
+        k = r.choice([1, 3, 8, 20])
+        max_km = r.choice([None, 0.5, 2.0])
+        exclude = r.choice([None, next(iter(points))])
+        got = index.nearest(lat, lon, k, max_km=max_km, exclude=exclude)
+        want = _brute_force(points, lat, lon, k, max_km, exclude)
+        # Compare distances: equidistant points may come back in either order.
+        assert [d for d, _ in got] == pytest.approx([d for d, _ in want])
+
+
+def test_median_needs_min_count():
+    index = GridIndex()
+    for i, v in enumerate([100.0, 300.0, 200.0]):
+        index.add(f"u{i}", 47.25 + i * 0.001, -122.45, v)
+    assert index.median_value(47.25, -122.45, 8) == 200.0
+    assert index.median_value(47.25, -122.45, 8, exclude="u1") is None
+
+
+def test_load_history_keeps_latest_value(tmp_path):
+    header = "listing_url,latitude,longitude,home_price_per_sqft\n"
+    old = tmp_path / "old.csv"
+    new = tmp_path / "new.csv"
+    old.write_text(header + "u1,47.25,-122.45,100\nu2,,,\n", encoding="utf-8")
+    new.write_text(header + "u1,47.26,-122.45,150\n", encoding="utf-8")
+    for index_path in ("", str(tmp_path / "history.sqlite3")):
+        index = load_history([str(old), str(new)], workers=1, index_path=index_path)
+        assert len(index) == 1
+        assert index.nearest(47.26, -122.45, 1)[0][1] == 150.0
+
+
+def test_load_history_parses_only_new_and_rewritten_days(tmp_path, monkeypatch):
+    import comps
+
+    parsed = []
+    iter_rows = comps._iter_history_rows
+
+    def counting(path):
+        parsed.append(os.path.basename(path))
+        return iter_rows(path)
+
+    monkeypatch.setattr(comps, "_iter_history_rows", counting)
+    header = "listing_url,latitude,longitude,home_price_per_sqft\n"
+    days = []
+    for d in range(3):
+        path = tmp_path / f"day{d}.csv"
+        path.write_text(header + f"u{d},47.25,-122.4{d},{100 + d}\n", encoding="utf-8")
+        days.append(str(path))
+    index_path = str(tmp_path / "history.sqlite3")
+
+    assert len(load_history(days[:2], index_path=index_path)) == 2
+    assert len(load_history(days, index_path=index_path)) == 3
+    assert parsed == ["day0.csv", "day1.csv", "day2.csv"]
+
+    with open(days[0], "a", encoding="utf-8") as f:
+        f.write("u9,47.25,-122.45,500\n")
+    index = load_history(days, index_path=index_path)
+    assert parsed[3:] == ["day0.csv"]
+    assert len(index) == 4
+    assert [v for _, v in index.nearest(47.25, -122.45, 1)] == [500.0]
+
+    # Days left out of the list (e.g. today's file) drop out of the grid.
+    assert len(load_history(days[1:], index_path=index_path)) == 2
+    assert parsed[4:] == []
@@ -0,0 +1,117 @@
+import random
+import sqlite3
+
+import pytest
+
+from history_index import HistoryQuery, build_sql, day_from_path
+from lookup_index import _SCHEMA, HISTORY_COLUMNS
+
+
+def _db(seed: int) -> sqlite3.Connection:
+    r = random.Random(seed)
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(_SCHEMA)
+    rows = []
+    for i in range(400):
+        price = r.choice([None, r.randint(100, 900) * 1000])
+        rows.append(
+            (
+                0,
+                i,
+                f"2024-05-{r.randint(1, 9):02d}",
+                r.choice(["tacoma", "seattle", None]),
+                r.choice(["dadu_play", "fix_n_flip"]),
+                r.randint(1, 5),
+                price,
+                r.randint(600, 3000),
+                r.choice([None, r.randint(2000, 20000)]),
+                r.uniform(100, 600),
+                None,
+                r.choice([None, r.randint(0, 100)]),
+                r.choice(["98402", "98405"]),
+                f"{i} Main St",
+                None,
+                f"https://x/home/{r.randint(0, 60)}",  # the same listing shows up on several days
+            )
+        )
+    conn.executemany(f"INSERT INTO listings VALUES ({', '.join('?' * (len(HISTORY_COLUMNS) + 2))})", rows)
+    return conn
+
+
+def _matches(q: HistoryQuery, row) -> bool:
+    r = dict(zip(HISTORY_COLUMNS, row))
+
+    def at_least(value, bound):
+        return bound is None or (value is not None and value >= bound)
+
+    def at_most(value, bound):
+        return bound is None or (value is not None and value <= bound)
+
+    return (
+        at_least(r["day"], q.since)
+        and at_most(r["day"], q.until)
+        and (not q.cities or r["city"] in [c.lower() for c in q.cities])
+        and (not q.categories or r["category"] in [c.lower() for c in q.categories])
+        and (not q.zipcodes or r["zipcode"] in q.zipcodes)
+        and at_least(r["price"], q.min_price)
+        and at_most(r["price"], q.max_price)
+        and at_most(r["home_ppsf"], q.max_ppsf)
+        and at_least(r["lot_sqft"], q.min_lot_sqft)
+        and at_least(r["deal_rating"], q.min_rating)
+    )
+
+
+def _reference(conn: sqlite3.Connection, q: HistoryQuery, columns):
+    """
+    Same answer by a different route: filter in Python, then keep each listing's latest
+    matching row with a window function.
+    """
+    cols = ", ".join(HISTORY_COLUMNS)
+    matching = [rid for rid, *row in conn.execute(f"SELECT rowid, {cols} FROM listings") if _matches(q, row)]
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS matching (rid INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM matching")
+    conn.executemany("INSERT INTO matching VALUES (?)", [(rid,) for rid in matching])
+    ranked = (
+        f"SELECT {', '.join(columns)}, ROW_NUMBER() OVER (PARTITION BY listing_url ORDER BY day DESC, rowid DESC) AS rn "
+        "FROM listings WHERE rowid IN (SELECT rid FROM matching)"
+    )
+    sql = f"SELECT {', '.join(columns)} FROM ({ranked}) WHERE rn = 1 ORDER BY deal_rating DESC, day DESC, listing_url LIMIT ?"
+    return conn.execute(sql, (q.limit,)).fetchall()
+
+
+QUERIES = [
+    HistoryQuery(),
+    HistoryQuery(limit=1000),
+    HistoryQuery(cities=("Tacoma",), limit=50),
+    HistoryQuery(since="2024-05-03", until="2024-05-06", min_rating=40, limit=1000),
+    HistoryQuery(max_price=400_000, min_lot_sqft=5000, categories=("DADU_play",), limit=1000),
+    HistoryQuery(zipcodes=("98405",), max_ppsf=300, limit=7),
+]
+
+
+@pytest.mark.parametrize("q", QUERIES)
+def test_latest_day_per_listing_matches_window_function(q):
+    conn = _db(1)
+    columns = tuple(HISTORY_COLUMNS)
+    sql, params = build_sql(q, columns)
+    got = conn.execute(sql, params).fetchall()
+    assert got == _reference(conn, q, columns)
+    urls = [row[columns.index("listing_url")] for row in got]
+    assert len(urls) == len(set(urls))
+
+
+def test_every_day_keeps_repeats():
+    conn = _db(2)
+    sql, params = build_sql(HistoryQuery(every_day=True, limit=1000), ("listing_url",))
+    urls = [r[0] for r in conn.execute(sql, params)]
+    assert len(urls) == 400
+    assert len(set(urls)) < len(urls)
+
+
+def test_unknown_column_is_rejected():
+    with pytest.raises(ValueError, match="unknown column"):
+        build_sql(HistoryQuery(), ("day", "nope"))
+
+
+def test_day_from_path():
+    assert day_from_path("output/2024/05/17/all_listings.csv") == "2024-05-17"
@@ -0,0 +1,176 @@
+import sqlite3
+import time
+
+import pytest
+
+from http_client import ProxyPool, ResponseCache, fetch_html, make_session
+from standin_server import StandinConfig, StandinServer
+
+
+@pytest.fixture
+def server():
+    srv = StandinServer(StandinConfig(latency_ms=0, latency_jitter_ms=0, homes_per_page=5)).start()
+    yield srv
+    srv.stop()
+
+
+def test_304_reuses_the_cached_body(server, tmp_path):
+    cache = ResponseCache(str(tmp_path / "http.sqlite3"))
+    session = make_session(1)
+    url = server.origin + "/city/1/WA/Tacoma"
+    try:
+        first = fetch_html(url, session=session, cache=cache, max_attempts=1)
+        assert first.status_code == 200 and not first.not_modified
+        assert cache.validators(url)["If-None-Match"]
+
+        second = fetch_html(url, session=session, cache=cache, max_attempts=1)
+        assert second.status_code == 200 and second.not_modified
+        assert second.text == first.text
+        assert server.stats["not_modified"] == 1
+        assert cache.urls() == [url]
+    finally:
+        cache.close()
+
+
+def test_304_without_a_cached_body_refetches(server, tmp_path):
+    cache = ResponseCache(str(tmp_path / "http.sqlite3"))
+    session = make_session(1)
+    url = server.origin + "/city/2/WA/Tacoma"
+    try:
+        fetch_html(url, session=session, cache=cache, max_attempts=1)
+        # Validators read, then the entry disappears before the 304 comes back.
+        body = cache.body
+        cache.body = lambda u: None
+        result = fetch_html(url, session=session, cache=cache, max_attempts=2)
+        cache.body = body
+        assert result.status_code == 200 and not result.not_modified
+        assert "InitialContext" in result.text
+    finally:
+        cache.close()
+
+
+def test_responses_without_validators_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path / "http.sqlite3"))
+    try:
+        cache.put("https://x/1", etag=None, last_modified=None, body="b")
+        assert cache.body("https://x/1") is None
+        cache.put("https://x/1", etag='"e"', last_modified=None, body="b")
+        assert cache.body("https://x/1") == "b"
+        assert cache.validators("https://x/1") == {"If-None-Match": '"e"'}
+    finally:
+        cache.close()
+
+
+def test_parsed_data_is_tied_to_the_cached_body(tmp_path):
+    cache = ResponseCache(str(tmp_path / "http.sqlite3"))
+    try:
+        cache.put_parsed("https://x/uncached", "<html>a</html>", "[]")
+        assert cache.parsed("https://x/uncached", "<html>a</html>") is None  # no response to tie it to
+
+        cache.put("https://x/1", etag='"v1"', last_modified=None, body="<html>a</html>")
+        cache.put_parsed("https://x/1", "<html>a</html>", '{"listings": []}')
+        assert cache.parsed("https://x/1", "<html>a</html>") == '{"listings": []}'
+        assert cache.parsed("https://x/1", "<html>b</html>") is None
+    finally:
+        cache.close()
+
+
+def test_pool_prefers_fast_healthy_egresses_and_spreads_in_flight_requests():
+    pool = ProxyPool(["http://a:1", "http://b:2"])
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second  # the busy one is discounted
+    pool.release(first, status=200, elapsed_s=2.0)
+    pool.release(second, status=200, elapsed_s=0.1)
+    for _ in range(3):
+        state = pool.acquire()
+        assert state is second
+        pool.release(state, status=200, elapsed_s=0.1)
+
+    # A connection error counts against the egress's failure rate (and quarantines it).
+    pool.release(pool.acquire(), status=None, elapsed_s=0.0)
+    assert pool.stats()["b:2"]["errors"] == 1
+    assert pool.stats()["b:2"]["failure_rate"] == 0.3
+    assert pool.acquire() is first
+
+
+def test_blocked_egress_is_quarantined_with_doubling_hold():
+    pool = ProxyPool([None, "http://b:2"], quarantine_s=10.0, max_quarantine_s=25.0)
+
+    def held(state):
+        return pool.stats()[state.label]["quarantined_s"]
+
+    direct = pool.acquire()
+    assert direct.label == "direct"
+    pool.release(direct, status=429, elapsed_s=0.1)
+    assert 9.0 < held(direct) <= 10.0
+    other = pool.acquire()
+    assert other.label == "b:2"
+    assert pool.has_open() and not pool.has_open(exclude=other)
+    pool.release(other, status=403, elapsed_s=0.1)
+    assert not pool.has_open()
+
+    # With every egress quarantined, the one released soonest is used.
+    assert pool.acquire() is direct
+    pool.release(direct, status=403, elapsed_s=0.1)
+    assert 19.0 < held(direct) <= 20.0
+    pool.release(direct, status=403, elapsed_s=0.1)
+    assert 24.0 < held(direct) <= 25.0  # 40s, capped
+
+    # A success ends the streak; the next block starts from quarantine_s again.
+    pool.release(direct, status=200, elapsed_s=0.1)
+    pool.release(direct, status=403, elapsed_s=0.1)
+    assert 9.0 < held(direct) <= 10.0
+    assert pool.stats()["direct"]["blocked"] == 4
+
+
+def test_pool_from_env(monkeypatch):
+    monkeypatch.delenv("REDFIN_PROXIES", raising=False)
+    assert ProxyPool.from_env() is None
+    monkeypatch.setenv("REDFIN_PROXIES", " direct, http://p:3128,, http://user:pw@q:8080 ")
+    monkeypatch.setenv("REDFIN_PROXY_QUARANTINE_S", "oops")
+    pool = ProxyPool.from_env()
+    assert list(pool.stats()) == ["direct", "p:3128", "q:8080"]
+    assert pool.quarantine_s == 60.0
+
+
+def test_blocked_proxy_is_skipped_without_backoff():
+    blocked = StandinServer(StandinConfig(latency_ms=0, latency_jitter_ms=0, block_rate=1.0)).start()
+    healthy = StandinServer(StandinConfig(latency_ms=0, latency_jitter_ms=0, homes_per_page=5)).start()
+    try:
+        pool = ProxyPool([blocked.origin, healthy.origin])
+        t0 = time.monotonic()
+        result = fetch_html("http://www.redfin.com/city/1/WA/Tacoma", proxy_pool=pool, max_attempts=2)
+        assert result.status_code == 200
+        assert time.monotonic() - t0 < 1.0  # switched egress instead of backing off
+        assert blocked.stats["blocked"] == 1 and healthy.stats["search"] == 1
+        assert [st["blocked"] for st in pool.stats().values()] == [1, 0]
+    finally:
+        blocked.stop()
+        healthy.stop()
+
+
+def test_locked_cache_acts_as_a_miss(server, tmp_path, capsys):
+    path = str(tmp_path / "http.sqlite3")
+    cache = ResponseCache(path)
+    url = server.origin + "/city/3/WA/Tacoma"
+    first = fetch_html(url, session=make_session(1), cache=cache, max_attempts=1)
+    cache.put_parsed(url, first.text, "[]")
+    cache._conn.execute("PRAGMA busy_timeout = 50")
+
+    other = sqlite3.connect(path)
+    other.execute("BEGIN EXCLUSIVE")  # e.g. a shard or `watch` writing the same file
+    try:
+        result = fetch_html(url, session=make_session(1), cache=cache, max_attempts=1)
+        assert result.status_code == 200 and not result.not_modified  # sent unconditionally
+        assert cache.body(url) is None
+        assert cache.parsed(url, first.text) is None
+        assert cache.urls() == []
+        cache.put_parsed(url, first.text, "[]")
+    finally:
+        other.rollback()
+        other.close()
+    assert capsys.readouterr().out.count("response cache") == 1
+
+    assert cache.body(url) == first.text
+    assert cache.parsed(url, first.text) == "[]"
+    cache.close()
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from http_client import RateLimiter, make_session
+from listing_details import DetailCache, enrich_listing_details
+from row_batch import RowBatch
+from search_plan import SearchDef
+from standin_server import StandinConfig, StandinServer
+
+
+class CountingLimiter(RateLimiter):
+    def __init__(self) -> None:
+        super().__init__(0.0, 0.0)
+        self.waits = 0
+
+    def wait(self) -> float:
+        self.waits += 1
+        return super().wait()
+
+
+def _batch(origin: str, home_ids) -> RowBatch:
+    batch = RowBatch(SearchDef(1, "DADU_play", "Tacoma", "", f"{origin}/city/1"))
+    for home_id in home_ids:
+        batch.append(
+            mls_listing_id=None,
+            listing_city="Tacoma",
+            listing_zipcode="98402",
+            address=f"{home_id} Main St",
+            listing_price=400_000,
+            home_sqft=1000,
+            lot_sqft=6000,
+            zoning=None,
+            home_price_per_sqft=400.0,
+            lot_price_per_sqft=None,
+            deal_rating=3,
+            listing_url=f"{origin}/WA/Tacoma/x/home/{home_id}",
+            latitude=None,
+            longitude=None,
+            comp_price_per_sqft=None,
+        )
+    return batch
+
+
+def _server(**kwargs) -> StandinServer:
+    return StandinServer(StandinConfig(latency_ms=0, latency_jitter_ms=0, **kwargs)).start()
+
+
+def test_limiter_spaces_request_starts_across_threads():
+    limiter = RateLimiter(0.05, 0.05)
+    starts = []
+    lock = threading.Lock()
+
+    def worker():
+        limiter.wait()
+        with lock:
+            starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    starts.sort()
+    assert all(b - a >= 0.04 for a, b in zip(starts, starts[1:]))
+
+
+def test_budget_caps_requests_and_cached_homes_are_free(tmp_path):
+    server = _server()
+    try:
+        cache = DetailCache(str(tmp_path / "details.sqlite3"))
+        limiter = CountingLimiter()
+        batch = _batch(server.origin, [11, 12, 13])
+        stats = enrich_listing_details(batch, session=make_session(), limiter=limiter, budget=2, cache=cache)
+        assert (stats["fetched"], stats["cache_hits"], stats["failed"]) == (2, 0, 0)
+        assert server.stats["home"] == limiter.waits == 2
+        assert sum(1 for v in batch.column("mls_listing_id") if v) == 2
+
+        again = _batch(server.origin, [11, 12, 13])
+        stats = enrich_listing_details(again, session=make_session(), limiter=limiter, budget=0, cache=cache)
+        assert (stats["fetched"], stats["cache_hits"]) == (0, 2)
+        assert again.column("mls_listing_id") == batch.column("mls_listing_id")
+        assert server.stats["home"] == 2
+        cache.close()
+    finally:
+        server.stop()
+
+
+@pytest.mark.parametrize("kwargs", [{"rate_limit_rate": 1.0}, {"block_rate": 1.0}])
+def test_every_request_is_charged_to_the_budget_and_the_limiter(tmp_path, kwargs):
+    server = _server(**kwargs)
+    try:
+        cache = DetailCache(str(tmp_path / "details.sqlite3"))
+        limiter = CountingLimiter()
+        batch = _batch(server.origin, [11, 12, 13, 14, 15])
+        stats = enrich_listing_details(batch, session=make_session(), limiter=limiter, budget=3, cache=cache)
+        assert (stats["fetched"], stats["failed"]) == (0, 3)
+        # No retries or warm-up requests beyond the budget, and none that skipped the limiter.
+        assert server.stats["requests"] == limiter.waits == 3
+        assert cache.get_many(batch.column("listing_url")) == {}
+        cache.close()
+    finally:
+        server.stop()
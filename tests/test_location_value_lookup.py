@@ -0,0 +1,41 @@
+import pytest
+
+from location_value_lookup import CompactValueTable, SegmentedValueTable
+
+
+def test_compact_table_first_pair_wins_and_keeps_non_numeric_ids():
+    pairs = [
+        ("320151211", "High"),
+        ("100", "Low"),
+        ("320151211", "Low"),  # later duplicate: ignored
+        ("0320151211", "Mid"),  # leading zero: not the same parcel as 320151211
+        ("32-015", "Mid"),
+        ("32-015", "High"),
+    ]
+    table = CompactValueTable.from_pairs(pairs)
+    assert table["320151211"] == "High"
+    assert table["100"] == "Low"
+    assert table["0320151211"] == "Mid"
+    assert table["32-015"] == "Mid"
+    assert len(table) == 4
+    with pytest.raises(KeyError):
+        table["999"]
+
+
+def test_compact_table_round_trips_through_its_record():
+    table = CompactValueTable.from_pairs([(str(n), "v%d" % (n % 3)) for n in range(1000, 0, -7)] + [("A-1", "x")])
+    again = CompactValueTable.from_record(*table.to_record())
+    assert dict(again) == dict(table)
+
+
+def test_segments_are_consulted_in_order():
+    first = CompactValueTable.from_pairs([("1", "first"), ("X-1", "first")])
+    second = CompactValueTable.from_pairs([("1", "second"), ("2", "second"), ("X-1", "second")])
+    table = SegmentedValueTable([first, second])
+    assert table["1"] == "first"
+    assert table["X-1"] == "first"
+    assert table["2"] == "second"
+    assert sorted(table) == ["1", "2", "X-1"]
+    assert len(table) == 3
+    with pytest.raises(KeyError):
+        table["3"]
@@ -0,0 +1,48 @@
+import os
+
+from parcel_lookup import ParcelLookupReloader
+
+
+def _parcel_dir(root, name: str, parcel: str) -> str:
+    d = root / name
+    d.mkdir()
+    (d / "parcels.csv").write_text(f"taxparcelnumber,zipcode,site_address\n{parcel},98402,1 Main St\n", encoding="utf-8")
+    return str(d)
+
+
+def test_lookup_dirs_sharing_an_index_keep_their_own_sources(tmp_path, capsys):
+    index_path = str(tmp_path / "index.sqlite3")
+    a = _parcel_dir(tmp_path, "a", "A1")
+    b = _parcel_dir(tmp_path, "b", "B1")
+
+    for expected_dir, parcel in [(a, "A1"), (b, "B1"), (a, "A1"), (b, "B1")]:
+        reloader = ParcelLookupReloader(lookups_dir=expected_dir, index_path=index_path)
+        assert reloader.lookup.find(zipcode="98402", site_address="1 Main St") == parcel
+        assert len(reloader.lookup.by_address) == 1
+    # Each dir was indexed once; alternating between them didn't rebuild anything.
+    assert capsys.readouterr().out.count("parcel index updated") == 2
+
+
+def test_same_dir_from_another_cwd_reuses_the_index(tmp_path, monkeypatch, capsys):
+    index_path = str(tmp_path / "index.sqlite3")
+    _parcel_dir(tmp_path, "lookups", "P1")
+    (tmp_path / "elsewhere").mkdir()
+
+    monkeypatch.chdir(tmp_path)
+    ParcelLookupReloader(lookups_dir="lookups", index_path=index_path)
+    monkeypatch.chdir(tmp_path / "elsewhere")
+    reloader = ParcelLookupReloader(lookups_dir=os.path.join("..", "lookups"), index_path=index_path)
+    assert reloader.lookup.find(zipcode="98402", site_address="1 Main St") == "P1"
+    assert capsys.readouterr().out.count("parcel index updated") == 1
+
+
+def test_location_dirs_sharing_an_index_keep_their_own_sources(tmp_path):
+    from location_value_lookup import LocationValueLookupReloader
+
+    index_path = str(tmp_path / "index.sqlite3")
+    for name, value in [("a", "High"), ("b", "Low")]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "values.csv").write_text(f"taxparcelnumber,location_value\n123,{value}\n", encoding="utf-8")
+    for name, value in [("a", "High"), ("b", "Low"), ("a", "High")]:
+        reloader = LocationValueLookupReloader(lookups_dirs=[str(tmp_path / name)], index_path=index_path)
+        assert reloader.lookup.find("123") == value
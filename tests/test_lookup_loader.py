@@ -0,0 +1,87 @@
+import csv
+import os
+import threading
+import time
+
+import lookup_loader
+from location_value_lookup import _iter_location_rows
+from lookup_loader import FileSetCache, LookupWatcher, parse_files
+
+
+def test_parallel_parse_from_a_thread_matches_serial(tmp_path, monkeypatch):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"loc{i}.csv"
+        path.write_text("taxparcelnumber,location_value\n" + "".join(f"{i}{n},v{n % 3}\n" for n in range(50)))
+        paths.append(str(path))
+    serial = parse_files(paths, _iter_location_rows, workers=1)
+
+    # Startup loaders call this from worker threads; the pool must not fork them.
+    monkeypatch.setattr(lookup_loader, "PARALLEL_MIN_BYTES", 0)
+    out = []
+    t = threading.Thread(target=lambda: out.append(parse_files(paths, _iter_location_rows, workers=2)))
+    t.start()
+    t.join(timeout=60)
+    assert out == [serial]
+    assert [len(rows) for rows in serial] == [50, 50, 50]
+
+
+def _write(path, rows, mtime_bump=0):
+    path.write_text("taxparcelnumber,zipcode,site_address\n" + "".join(f"{p},98402,{a}\n" for p, a in rows))
+    if mtime_bump:
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + mtime_bump))
+
+
+def test_file_set_cache_reparses_only_added_and_changed_files(tmp_path):
+    parsed = []
+
+    def parse(path):
+        parsed.append(os.path.basename(path))
+        with open(path, encoding="utf-8", newline="") as f:
+            return [tuple(row) for row in csv.reader(f)][1:]
+
+    a, b, c = tmp_path / "a.csv", tmp_path / "b.csv", tmp_path / "c.csv"
+    _write(a, [("A1", "1 Main St")])
+    _write(b, [("B1", "2 Main St")])
+    cache = FileSetCache(parse)
+    assert cache.update([str(b), str(a)]).added == [str(a), str(b)]
+    assert parsed == ["a.csv", "b.csv"]
+
+    assert not cache.update([str(a), str(b)])
+    assert parsed == ["a.csv", "b.csv"]
+
+    _write(b, [("B2", "2 Main St")], mtime_bump=1_000_000_000)
+    _write(c, [("C1", "3 Main St")])
+    changes = cache.update([str(a), str(b), str(c)])
+    assert (changes.added, changes.changed, changes.removed) == ([str(c)], [str(b)], [])
+    assert parsed == ["a.csv", "b.csv", "b.csv", "c.csv"]
+
+    changes = cache.update([str(b), str(c)])
+    assert changes.removed == [str(a)] and parsed[-1] == "c.csv" and len(parsed) == 4
+    assert [[r[0] for r in rows] for rows in cache.rows_in_order()] == [["B2"], ["C1"]]
+
+
+def test_watcher_applies_new_files_and_survives_a_failing_reloader(tmp_path):
+    from parcel_lookup import ParcelLookupReloader
+
+    lookups = tmp_path / "parcel"
+    lookups.mkdir()
+    _write(lookups / "a.csv", [("A1", "1 Main St")])
+    reloader = ParcelLookupReloader(lookups_dir=str(lookups), index_path="")
+    assert reloader.lookup.find(zipcode="98402", site_address="2 Main St") is None
+
+    class Broken:
+        def refresh(self):
+            raise OSError("half-written file")
+
+    watcher = LookupWatcher([Broken(), reloader], interval_s=0.02).start()
+    try:
+        _write(lookups / "b.csv", [("B1", "2 Main St")])
+        deadline = time.monotonic() + 10
+        while reloader.lookup.find(zipcode="98402", site_address="2 Main St") is None:
+            assert time.monotonic() < deadline, "watcher never picked up b.csv"
+            time.sleep(0.02)
+    finally:
+        watcher.stop()
+    assert reloader.lookup.find(zipcode="98402", site_address="1 Main St") == "A1"
@@ -0,0 +1,99 @@
+from parcel_lookup import (
+    FuzzyAddressIndex,
+    ParcelLookup,
+    ParcelLookupReloader,
+    _fuzzy_tokens,
+    address_similarity,
+    normalize_address,
+)
+
+
+def _tokens(addr: str):
+    return _fuzzy_tokens(normalize_address(addr))
+
+
+def _lookup(rows):
+    by_address = {}
+    fuzzy = FuzzyAddressIndex()
+    for addr, zipcode, parcel in rows:
+        a = normalize_address(addr)
+        by_address.setdefault(a, []).append((zipcode, parcel))
+        fuzzy.add(a, zipcode)
+    return ParcelLookup(by_address=by_address, fuzzy_index=fuzzy)
+
+
+def test_similarity_is_one_for_identical_streets_and_ignores_units():
+    assert address_similarity(_tokens("123 Main St"), _tokens("123 MAIN STREET")) == 1.0
+    assert address_similarity(_tokens("123 Main St Apt 4"), _tokens("123 Main St")) == 1.0
+
+
+def test_similarity_weights_directionals_and_types_below_names():
+    missing_dir = address_similarity(_tokens("123 Main St"), _tokens("123 E Main St"))
+    other_street = address_similarity(_tokens("123 Main St"), _tokens("123 Pine St"))
+    typo = address_similarity(_tokens("123 Sheridan Ave"), _tokens("123 Sheridun Ave"))
+    assert missing_dir == 0.75
+    assert other_street < 0.5
+    assert 0.5 < typo < 1.0
+
+
+def test_find_fuzzy_respects_min_similarity_and_zip_tolerance():
+    lookup = _lookup([("123 E Main St", 98402, "P1")])
+    assert lookup.find(zipcode="98402", site_address="123 Main St") is None
+    assert lookup.find(zipcode="98402", site_address="123 Main St", fuzzy=True, min_similarity=0.7) == "P1"
+    assert lookup.find(zipcode="98402", site_address="123 Main St", fuzzy=True, min_similarity=0.8) is None
+    assert lookup.find(zipcode="98420", site_address="123 Main St", fuzzy=True, zip_tolerance=4) is None
+    assert lookup.find(zipcode="98402", site_address="125 E Main St", fuzzy=True) is None  # other house number
+
+
+def test_find_fuzzy_prefers_closer_zip_on_equal_scores():
+    lookup = _lookup([("123 Main Street", 98405, "FAR"), ("123 Main Street", 98403, "NEAR")])
+    assert lookup.find_fuzzy(zipcode="98402", site_address="123 Main St Unit 2") == "NEAR"
+
+
+def test_find_many_matches_find():
+    lookup = _lookup([("123 E Main St", 98402, "P1"), ("9 Pine Ave", 98403, "P2")])
+    addrs = ["123 Main St", "9 PINE AVENUE", None, "9 Pine Ave", "1 Nowhere"]
+    zips = ["98402", "98403", "98402", "98406", "98402"]
+    expected = [lookup.find(zipcode=z, site_address=a, fuzzy=True) for z, a in zip(zips, addrs)]
+    assert lookup.find_many(zipcodes=zips, site_addresses=addrs, fuzzy=True) == expected
+    assert expected == ["P1", "P2", None, "P2", None]
+
+
+def test_find_fuzzy_returns_none_when_top_score_is_shared_by_different_parcels():
+    lookup = _lookup([("123 E Main St", 98402, "EAST"), ("123 W Main St", 98402, "WEST")])
+    assert lookup.find_fuzzy(zipcode="98402", site_address="123 Main St") is None
+    assert lookup.find_fuzzy(zipcode="98402", site_address="123 E Main St") == "EAST"
+
+    # Two spellings of the same parcel are not ambiguous.
+    same = _lookup([("123 E Main St", 98402, "P1"), ("123 W Main St", 98402, "P1")])
+    assert same.find_fuzzy(zipcode="98402", site_address="123 Main St") == "P1"
+
+
+def test_numbered_streets_only_match_exactly():
+    assert address_similarity(_tokens("10 E 11th St"), _tokens("10 E 111TH ST")) == 0.0
+    assert address_similarity(_tokens("10 E 11th St"), _tokens("10 E 12TH ST")) == 0.0
+    assert address_similarity(_tokens("10 E 11th St"), _tokens("10 11TH ST")) == 0.75
+
+    lookup = _lookup([("10 E 111TH ST", 98445, "P111")])
+    assert lookup.find(zipcode="98445", site_address="10 E 11th St", fuzzy=True) is None
+    lookup = _lookup([("10 E 111TH ST", 98445, "P111"), ("10 11TH ST", 98445, "P11")])
+    assert lookup.find(zipcode="98445", site_address="10 E 11th St", fuzzy=True) == "P11"
+
+
+def test_common_house_number_in_other_zips_does_not_crowd_out_the_listing_zip():
+    # 1000 parcels with the same house number in neighbouring zips, all listed first.
+    rows = [(f"123 Street{i} Ave", (98399, 98404, 98406)[i % 3], f"X{i}") for i in range(1000)]
+    rows.append(("123 Main St", 98402, "P1"))
+    lookup = _lookup(rows)
+    assert lookup.find(zipcode="98402", site_address="123 Main Street Unit 2", fuzzy=True) == "P1"
+    assert lookup.find(zipcode="98450", site_address="123 Main Street", fuzzy=True) is None
+
+
+def test_indexed_candidates_read_the_listing_zip_first(tmp_path):
+    lines = ["taxparcelnumber,zipcode,site_address"]
+    lines += [f"X{i},{(98399, 98404, 98406)[i % 3]},123 Street{i} Ave" for i in range(1000)]
+    lines.append("P1,98402,123 Main St")
+    (tmp_path / "parcels").mkdir()
+    (tmp_path / "parcels" / "parcels.csv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    reloader = ParcelLookupReloader(lookups_dir=str(tmp_path / "parcels"), index_path=str(tmp_path / "index.sqlite3"))
+    assert reloader.lookup.find(zipcode="98402", site_address="123 Main Street Unit 2", fuzzy=True) == "P1"
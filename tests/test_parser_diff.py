@@ -0,0 +1,71 @@
+import pytest
+
+from parser_diff import compare_parsers, diff_results, generated_pages, load_parser, reference_source
+from redfin_scraper import Listing
+
+
+def _listing(url: str, price: int = 100) -> Listing:
+    return Listing(
+        mls_listing_id="1",
+        address="1 Main St",
+        city="Tacoma",
+        state="WA",
+        zipcode="98402",
+        price=price,
+        home_sqft=1000,
+        lot_sqft=5000,
+        zoning=None,
+        url=url,
+        raw={},
+    )
+
+
+def test_identical_results_have_no_diffs():
+    result = ([_listing("u1"), _listing("u2")], {"json": 2})
+    assert diff_results(result, result) == []
+
+
+def test_field_meta_count_and_order_diffs_are_reported():
+    ref = ([_listing("u1"), _listing("u2")], {"json": 2})
+    assert diff_results(ref, ([_listing("u1"), _listing("u2", price=90)], {"json": 2})) == [
+        "listing 1 (u2) price: 100 -> 90"
+    ]
+    assert diff_results(ref, (ref[0], {"json": 3})) == ["meta[json]: 2 -> 3"]
+    assert diff_results(ref, ([_listing("u2"), _listing("u1")], {"json": 2})) == [
+        "listing 0 (u1) url: 'u1' -> 'u2'",
+        "listing 1 (u2) url: 'u2' -> 'u1'",
+    ]
+    diffs = diff_results(ref, ([_listing("u1"), _listing("u3"), _listing("u4")], {"json": 2}))
+    assert "listing count: 2 -> 3" in diffs
+    assert "missing: u2" in diffs
+    assert "extra: u3" in diffs and "extra: u4" in diffs
+
+
+def test_ignored_fields_are_left_out():
+    ref = ([_listing("u1")], {})
+    cand = ([_listing("u1", price=1)], {})
+    assert diff_results(ref, cand, ignore=["price"]) == []
+
+
+# The parser as it was before the fast paths went in; everything since must agree with it.
+BASELINE_REV = "417a039"
+
+
+@pytest.fixture(scope="module")
+def baseline_parser():
+    try:
+        source = reference_source(BASELINE_REV)
+    except SystemExit as exc:
+        pytest.skip(str(exc))
+    return load_parser(source, "redfin_scraper_baseline")
+
+
+def test_parser_agrees_with_baseline_on_generated_pages(baseline_parser):
+    import redfin_scraper
+
+    # Padded pages only add parse time here; every other shape is kept.
+    pages = [p for p in generated_pages(40, seed=3) if "-pad" not in p.name]
+    results = compare_parsers(baseline_parser, redfin_scraper, pages, repeat=1)
+    assert len(results) == len(pages)
+    assert [r.name for r in results if r.diffs] == []
+    assert sum(r.listings for r in results) > 0
@@ -0,0 +1,86 @@
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+from pipeline import Pipeline, StageSpec
+
+
+@dataclass
+class Item:
+    seq: int
+    skipped: bool = False
+    seen: List[str] = field(default_factory=list)
+
+
+def test_ordered_stage_sees_items_in_seq_order():
+    order: List[int] = []
+
+    def slow(item: Item) -> Item:
+        time.sleep(random.Random(item.seq).uniform(0, 0.005))
+        return item
+
+    def record(item: Item) -> Item:
+        order.append(item.seq)
+        return item
+
+    pipeline = Pipeline([StageSpec("slow", slow, workers=4), StageSpec("record", record, ordered=True)], queue_size=2)
+    stats = pipeline.run(Item(seq=i) for i in range(50))
+    assert order == list(range(50))
+    assert stats["slow"]["items"] == 50
+    assert stats["record"]["items"] == 50
+
+
+def test_failed_item_is_skipped_downstream_but_still_reaches_ordered_stages():
+    reached: List[int] = []
+    parallel_calls: List[int] = []
+    lock = threading.Lock()
+
+    def boom(item: Item) -> Item:
+        if item.seq == 3:
+            raise ValueError("bad page")
+        return item
+
+    def parallel(item: Item) -> Item:
+        with lock:
+            parallel_calls.append(item.seq)
+        return item
+
+    def ordered(item: Item) -> Item:
+        reached.append(item.seq)
+        return item
+
+    pipeline = Pipeline(
+        [
+            StageSpec("boom", boom, workers=2),
+            StageSpec("parallel", parallel, workers=2),
+            StageSpec("ordered", ordered, ordered=True),
+        ]
+    )
+    stats = pipeline.run(Item(seq=i) for i in range(6))
+    assert stats["boom"]["errors"] == 1
+    assert 3 not in parallel_calls  # unordered stages skip failed items
+    assert reached == list(range(6))  # ordered stages still see every seq, so they never stall
+
+
+def test_window_caps_items_in_flight():
+    in_flight = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    def enter(item: Item) -> Item:
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        return item
+
+    def leave(item: Item) -> Item:
+        time.sleep(0.001)
+        with lock:
+            in_flight[0] -= 1
+        return item
+
+    pipeline = Pipeline([StageSpec("enter", enter, workers=3), StageSpec("leave", leave)], queue_size=1, window=3)
+    pipeline.run(Item(seq=i) for i in range(30))
+    assert peak[0] <= 3
@@ -0,0 +1,63 @@
+import json
+import os
+import pstats
+import threading
+
+from profiling import RunProfile, StageTimer, stage
+from run_all_searches import run_all
+
+
+def test_stage_timer_adds_to_its_parent():
+    run = StageTimer()
+    search = StageTimer(parent=run)
+    search.add("fetch", 0.5)
+    search.add("fetch", 0.25)
+    run.add("merge", 1.0)
+    assert search.as_dict() == {"fetch": {"seconds": 0.75, "calls": 2}}
+    assert run.as_dict() == {"fetch": {"seconds": 0.75, "calls": 2}, "merge": {"seconds": 1.0, "calls": 1}}
+
+
+def test_stage_timer_counts_calls_from_many_threads():
+    profile = RunProfile()
+
+    def work(search_id):
+        timer = profile.for_search(search_id)
+        for _ in range(500):
+            with stage(timer, "parse"):
+                pass
+
+    threads = [threading.Thread(target=work, args=(i % 2,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert profile.run.calls == {"parse": 4000}
+    assert {k: t.calls["parse"] for k, t in profile.searches.items()} == {"0": 2000, "1": 2000}
+
+
+def test_stage_without_a_timer_is_a_no_op():
+    with stage(None, "parse"):
+        pass
+
+
+def test_run_profile_json_has_run_search_and_pipeline_stages(standin_run):
+    out_path = run_all(config_path="searches.yaml")
+
+    with open(os.path.join(os.path.dirname(out_path), "run_profile.json"), encoding="utf-8") as f:
+        summary = json.load(f)
+    assert set(summary["searches"]) == {"1", "2"}
+    for name in ("fetch", "parse", "filter", "enrich"):
+        assert summary["run"][name]["calls"] == sum(s[name]["calls"] for s in summary["searches"].values())
+    assert summary["searches"]["1"]["fetch"]["calls"] >= 1
+    assert set(summary["pipeline"]["stages"]) >= {"fetch", "parse", "write"}
+
+
+
+
+def test_profile_dump_includes_pipeline_worker_frames(standin_run, tmp_path):
+    profile_path = tmp_path / "run.pstats"
+    run_all(config_path="searches.yaml", profile_path=str(profile_path))
+
+    functions = {name for (_, _, name) in pstats.Stats(str(profile_path)).stats}
+    assert "fetch_html" in functions
+    assert "parse_redfin_search_results" in functions
@@ -0,0 +1,82 @@
+from urllib.parse import urljoin
+
+import pytest
+from bs4 import BeautifulSoup
+
+from parser_diff import _card_page, generated_pages
+from redfin_scraper import _extract_listings_from_html_cards
+
+BASE = "https://www.redfin.com"
+
+
+def _bs4_cards(html: str):
+    """
+    The card fallback as it was written with bs4 (find_all + get_text), as the reference.
+    """
+    cards = {}
+    for a in BeautifulSoup(html, "html.parser").find_all("a", href=True):
+        href = a.get("href")
+        if "/home/" not in href and "/property/" not in href:
+            continue
+        text = " ".join(a.get_text(" ", strip=True).split())
+        if not text:
+            continue
+        parent_text = " ".join(a.parent.get_text(" ", strip=True).split()) if a.parent is not None else ""
+        cards.setdefault(urljoin(BASE, href), parent_text or text)
+    return list(cards.items())
+
+
+def _cards(html: str):
+    return [(l.url, l.raw["card_text"]) for l in _extract_listings_from_html_cards(html, BASE)]
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        # Nested anchors: the outer one starts first, so it comes first and wins its URL.
+        "<div><a href='/home/1'>outer <a href='/home/2'>inner</a></a></div>",
+        "<div><a href='/home/1'>outer <a href='/home/1'>same url</a> tail</a></div>",
+        "<div><a href='/home/1'><a href='/home/1'>inner first</a></a></div>",
+        "<p><a href='/home/1'>never closed <b>bold</p><a href='/home/2'>next",
+        # Comments, CDATA, form controls and ruby text.
+        "<div>$1,000 <a href='/home/1'>12 <!-- c -->Main<![CDATA[ St]]></a><!--x--></div>",
+        "<div><a href='/home/1'>9 Pine</a><textarea>a &amp; b</textarea><select><option>x</option>y</select></div>",
+        "<div><ruby>Tac<rp>(</rp><rt>ko</rt><rp>)</rp></ruby><a href='/home/1'>1 Elm</a></div>",
+        "<rp><a href='/home/1'>hidden<![CDATA[x]]>text</a></rp>",
+        # References: known/unknown names with and without ';', cp1252 and invalid numbers.
+        "<div><a href='/home/1'>&copy 1 &ampx &foo; &#150; &#0; &#x3 &#36;5</a></div>",
+        "<div><a href='/home/1'>4 Oak</a>$9&am",
+        "<div><a href='/home/1'>4 Oak</a>&#x2",
+        "<div><a href='/home/1'>4 Oak <!-- cut",
+        # End tags of void elements are dropped, not turned into separators.
+        "<div><a href=\"/home/2\"><img>$450,000</img>3 beds",
+        "<div><a href='/home/2'>$450,000<br>x</br>3 beds</a></div>",
+    ],
+)
+def test_card_fallback_matches_bs4(html):
+    assert _cards(html) == _bs4_cards(html)
+
+
+def test_card_fallback_matches_bs4_on_generated_card_pages():
+    pages = [_card_page(seed, 30, tricky=True) for seed in range(10)]
+    pages += [p.html for p in generated_pages(60, seed=7) if "truncated" in p.name or "cards" in p.name]
+    for html in pages:
+        assert _cards(html) == _bs4_cards(html)
+
+
+def test_container_text_is_extracted_once_per_container(monkeypatch):
+    from bs4.element import Tag
+
+    calls = []
+    get_text = Tag.get_text
+
+    def counting(self, *args, **kwargs):
+        calls.append(self.name)
+        return get_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(Tag, "get_text", counting)
+    anchors = "".join(f"<a href='/home/{i % 150}'>{i} Main St</a> ${i},000 " for i in range(300))
+    cards = _cards(f"<div id='grid'>{anchors}</div>")
+    assert len(cards) == 150
+    # One get_text per first-seen anchor plus one for the shared container; repeats cost nothing.
+    assert calls.count("a") == 150 and calls.count("div") == 1
@@ -0,0 +1,124 @@
+import csv
+import io
+import random
+
+import pytest
+
+from redfin_scraper import Listing
+from row_batch import CsvBatchWriter, RowBatch
+from run_all_searches import CONSOLIDATED_FIELDNAMES, append_listing, compute_deal_rating, compute_price_per_sqft
+from search_plan import SearchDef
+
+SEARCH = SearchDef(search_id=3, category="Corner_Lot", city="Tacoma", description="corner, lots", url="https://x/3")
+
+
+def _listings(n: int, seed: int = 0):
+    r = random.Random(seed)
+
+    def maybe(value):
+        return None if r.random() < 0.2 else value
+
+    return [
+        Listing(
+            mls_listing_id=maybe(str(r.randint(1, 10**7))),
+            address=maybe(f"{r.randint(1, 9999)} Main St, \"Unit\" {i}"),
+            city=maybe("Tacoma"),
+            state="WA",
+            zipcode=maybe("98402"),
+            price=maybe(r.randint(0, 900) * 1000),
+            home_sqft=maybe(r.randint(0, 3000)),
+            lot_sqft=maybe(r.randint(0, 20000)),
+            zoning=maybe("R-2"),
+            url=maybe(f"https://www.redfin.com/home/{i}"),
+            raw={},
+            latitude=maybe(47 + r.random()),
+            longitude=maybe(-122 - r.random()),
+        )
+        for i in range(n)
+    ]
+
+
+def _dict_row(listing: Listing, comp_ppsf=None):
+    """
+    The per-listing dict the runner built before rows moved into batches.
+    """
+    home_ppsf = compute_price_per_sqft(listing.price, listing.home_sqft)
+    lot_ppsf = compute_price_per_sqft(listing.price, listing.lot_sqft)
+    return {
+        "location_value": None,
+        "tax_parcel_number": None,
+        "mls_listing_id": listing.mls_listing_id,
+        "search_id": SEARCH.search_id,
+        "search_category": SEARCH.category,
+        "listing_city": listing.city,
+        "search_city": SEARCH.city,
+        "listing_zipcode": listing.zipcode,
+        "address": listing.address,
+        "listing_price": listing.price,
+        "home_sqft": listing.home_sqft,
+        "lot_sqft": listing.lot_sqft,
+        "zoning": listing.zoning,
+        "home_price_per_sqft": home_ppsf,
+        "lot_price_per_sqft": lot_ppsf,
+        "deal_rating": compute_deal_rating(
+            price=listing.price,
+            home_sqft=listing.home_sqft,
+            lot_sqft=listing.lot_sqft,
+            home_ppsf=home_ppsf,
+            lot_ppsf=lot_ppsf,
+            category=SEARCH.category,
+            comp_ppsf=comp_ppsf,
+        ),
+        "listing_url": listing.url,
+        "search_description": SEARCH.description,
+        "search_url": SEARCH.url,
+        "latitude": listing.latitude,
+        "longitude": listing.longitude,
+        "comp_price_per_sqft": round(comp_ppsf, 2) if comp_ppsf else None,
+    }
+
+
+def _batch_and_dicts(n: int = 300):
+    batch = RowBatch(SEARCH)
+    dicts = []
+    for i, listing in enumerate(_listings(n)):
+        comp = 250.0 + i if i % 3 == 0 else None
+        append_listing(batch, listing, comp_ppsf=comp)
+        dicts.append(_dict_row(listing, comp))
+    return batch, dicts
+
+
+def test_records_match_dict_rows():
+    batch, dicts = _batch_and_dicts()
+    expected = [tuple(d[f] for f in CONSOLIDATED_FIELDNAMES) for d in dicts]
+    assert list(batch.records(CONSOLIDATED_FIELDNAMES)) == expected
+    assert list(batch.rows(CONSOLIDATED_FIELDNAMES)) == dicts
+
+
+def test_csv_bytes_match_dict_writer(tmp_path):
+    batch, dicts = _batch_and_dicts()
+    buf = io.StringIO(newline="")
+    w = csv.DictWriter(buf, fieldnames=CONSOLIDATED_FIELDNAMES)
+    w.writeheader()
+    w.writerows(dicts)
+
+    path = tmp_path / "out.csv"
+    writer = CsvBatchWriter(str(path), CONSOLIDATED_FIELDNAMES)
+    writer.write(batch)
+    writer.write(RowBatch(SEARCH))  # empty batches write nothing
+    writer.close()
+    assert path.read_bytes() == buf.getvalue().encode("utf-8")
+
+
+def test_set_and_set_column():
+    batch, _ = _batch_and_dicts(3)
+    batch.set(1, "listing_price", None)
+    batch.set(2, "latitude", 1.5)
+    batch.set_column("tax_parcel_number", ["a", None, "c"])
+    assert batch.get(1, "listing_price") is None
+    assert batch.get(2, "latitude") == 1.5
+    assert batch.column("tax_parcel_number") == ["a", None, "c"]
+    with pytest.raises(ValueError):
+        batch.set_column("zoning", ["only one"])
+    with pytest.raises(KeyError):
+        batch.set(0, "search_id", 9)
@@ -0,0 +1,124 @@
+import itertools
+import json
+import os
+
+import pytest
+
+from comps import GridIndex
+from redfin_scraper import Listing
+from row_batch import RowBatch
+from run_all_searches import CONSOLIDATED_FIELDNAMES, append_listing, rerate_with_comps, run_all
+from search_plan import SearchDef
+
+SEARCH = SearchDef(search_id=1, category="DADU_play", city="Tacoma", description="", url="https://x/1")
+
+
+def _listing(i: int) -> Listing:
+    return Listing(
+        mls_listing_id=str(i),
+        address=f"{i} Main St",
+        city="Tacoma",
+        state="WA",
+        zipcode="98402",
+        price=200_000 + 7_919 * i,
+        home_sqft=900 + 37 * i,
+        lot_sqft=5000,
+        zoning=None,
+        url=f"https://x/home/{i}",
+        raw={},
+        latitude=47.25 + (i % 5) * 0.001,
+        longitude=-122.45 + (i % 7) * 0.001,
+    )
+
+
+def test_rerate_matches_in_process_comps_rating():
+    history = [(f"https://x/old/{i}", 47.25 + i * 0.0005, -122.45, 150.0 + 10 * i) for i in range(4)]
+
+    # What the filter stage does in one process: rate, then add the kept row to the grid.
+    grid = GridIndex()
+    for key, lat, lon, value in history:
+        grid.add(key, lat, lon, value)
+    batch = RowBatch(SEARCH)
+    for i in range(30):
+        listing = _listing(i)
+        comp = grid.median_value(listing.latitude, listing.longitude, 8, max_km=2.0, exclude=listing.url)
+        row = append_listing(batch, listing, comp_ppsf=comp)
+        grid.add(listing.url, listing.latitude, listing.longitude, batch.get(row, "home_price_per_sqft"))
+    expected = [{k: "" if v is None else str(v) for k, v in r.items()} for r in batch.rows(CONSOLIDATED_FIELDNAMES)]
+    assert any(r["comp_price_per_sqft"] for r in expected)
+
+    # The same rows as a shard might have written them (rated without the other rows).
+    rows = [dict(r, deal_rating="0", comp_price_per_sqft="") for r in expected]
+    grid = GridIndex()
+    for key, lat, lon, value in history:
+        grid.add(key, lat, lon, value)
+    rerate_with_comps(rows, grid, k=8, max_km=2.0)
+    assert rows == expected
+
+
+def test_not_modified_pages_reuse_the_cached_parse(standin_run, monkeypatch):
+    monkeypatch.delenv("REDFIN_HTTP_CACHE")
+    first = run_all(config_path="searches.yaml")
+    with open(first, "rb") as f:
+        first_csv = f.read()
+    second = run_all(config_path="searches.yaml")
+    with open(second, "rb") as f:
+        assert f.read() == first_csv
+
+    with open(os.path.join(os.path.dirname(second), "run_profile.json"), encoding="utf-8") as f:
+        stages = json.load(f)["run"]
+    assert standin_run.stats["not_modified"] == 2
+    assert stages["parse.cached"]["calls"] == 2
+    assert "parse" not in stages
+
+
+def test_comps_mode_falls_back_to_the_fixed_rule_when_history_fails(standin_run, monkeypatch, capsys):
+    import comps
+
+    def broken_history(*args, **kwargs):
+        raise OSError("history unreadable")
+
+    monkeypatch.setattr(comps, "load_history", broken_history)
+    fixed = run_all(config_path="searches.yaml")
+    with open(fixed, "rb") as f:
+        fixed_csv = f.read()
+
+    monkeypatch.setenv("REDFIN_RATING_MODE", "comps")
+    capsys.readouterr()
+    out_path = run_all(config_path="searches.yaml")
+    assert capsys.readouterr().out.count("loading history failed") == 1
+    with open(out_path, "rb") as f:
+        assert f.read() == fixed_csv
+
+
+def test_failed_or_interrupted_run_keeps_the_previous_output(standin_run, monkeypatch):
+    import pipeline
+    import row_batch
+
+    previous = run_all(config_path="searches.yaml")
+    with open(previous, "rb") as f:
+        previous_csv = f.read()
+    assert not os.path.exists(previous + ".tmp")
+
+    def failing_write(self, batch):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(row_batch.CsvBatchWriter, "write", failing_write)
+        with pytest.raises(RuntimeError, match="left in place"):
+            run_all(config_path="searches.yaml")
+
+    run = pipeline.Pipeline.run
+
+    def interrupted_run(self, items):
+        run(self, itertools.islice(items, 1))  # the first search is written, then Ctrl-C
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as m:
+        m.setattr(pipeline.Pipeline, "run", interrupted_run)
+        with pytest.raises(KeyboardInterrupt):
+            run_all(config_path="searches.yaml")
+
+    with open(previous, "rb") as f:
+        assert f.read() == previous_csv
+    assert not os.path.exists(previous + ".tmp")
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+import search_plan
+from search_plan import SearchDef, load_searches
+
+SEARCHES = """searches:
+  - search_id: 1
+    category: DADU_play
+    city: Tacoma
+    url: "https://www.redfin.com/city/17887/WA/Tacoma"
+  - search_id: 2
+    category: DADU_play
+    city: Burien
+    url: "https://www.redfin.com/city/2291/WA/Burien"
+    hot: true
+"""
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / "searches.yaml"
+    path.write_text(SEARCHES, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def yaml_parses(monkeypatch):
+    calls = []
+    parse = search_plan._parse_searches_yaml
+
+    def counting(path):
+        calls.append(path)
+        return parse(path)
+
+    monkeypatch.setattr(search_plan, "_parse_searches_yaml", counting)
+    return calls
+
+
+def test_second_load_comes_from_the_plan(config, tmp_path, yaml_parses):
+    first = load_searches(str(config), cache_dir=str(tmp_path / "cache"))
+    second = load_searches(str(config), cache_dir=str(tmp_path / "cache"))
+    assert second == first
+    assert first[1] == SearchDef(2, "DADU_play", "Burien", "", "https://www.redfin.com/city/2291/WA/Burien", hot=True)
+    assert len(yaml_parses) == 1
+
+
+def test_editing_the_config_rebuilds_the_plan(config, tmp_path, yaml_parses):
+    cache_dir = str(tmp_path / "cache")
+    load_searches(str(config), cache_dir=cache_dir)
+    config.write_text(SEARCHES.replace("Tacoma\n", "Lakewood\n"), encoding="utf-8")
+    st = os.stat(config)
+    os.utime(config, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    searches = load_searches(str(config), cache_dir=cache_dir)
+    assert searches[0].city == "Lakewood"
+    assert len(yaml_parses) == 2
+
+
+def test_stale_version_or_corrupt_plan_is_rebuilt(config, tmp_path, yaml_parses, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    load_searches(str(config), cache_dir=cache_dir)
+    monkeypatch.setattr(search_plan, "PLAN_VERSION", search_plan.PLAN_VERSION + 1)
+    load_searches(str(config), cache_dir=cache_dir)
+    assert len(yaml_parses) == 2
+
+    with open(search_plan._plan_path(str(config), cache_dir), "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert [s.search_id for s in load_searches(str(config), cache_dir=cache_dir)] == [1, 2]
+    assert len(yaml_parses) == 3
+
+
+def test_use_cache_false_always_parses(config, tmp_path, yaml_parses):
+    for _ in range(2):
+        load_searches(str(config), cache_dir=str(tmp_path / "cache"), use_cache=False)
+    assert len(yaml_parses) == 2
+
+
+def test_duplicate_ids_are_rejected_and_not_cached(config, tmp_path):
+    config.write_text(SEARCHES.replace("search_id: 2", "search_id: 1"), encoding="utf-8")
+    with pytest.raises(ValueError, match="unique"):
+        load_searches(str(config), cache_dir=str(tmp_path / "cache"))
+    assert not os.path.exists(search_plan._plan_path(str(config), str(tmp_path / "cache")))
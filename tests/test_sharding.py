@@ -0,0 +1,106 @@
+import csv
+import os
+
+import pytest
+
+from search_plan import SearchDef
+from sharding import ShardSpec, merge_partials, partial_output_path, select_shard
+
+FIELDS = ["search_id", "listing_url", "address"]
+
+
+def _searches(n: int):
+    return [SearchDef(search_id=100 + i, category="c", city="x", description="", url=f"https://x/{i}") for i in range(n)]
+
+
+def _write(path: str, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        w.writerows(rows)
+
+
+def _read(path: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.mark.parametrize("kwargs", [{"index": 2, "count": 2}, {"index": -1, "count": 2}, {"index": 0, "count": 0}])
+def test_shard_spec_rejects_bad_values(kwargs):
+    with pytest.raises(ValueError):
+        ShardSpec(**kwargs)
+
+
+@pytest.mark.parametrize("mode", ["position", "hash"])
+def test_shards_partition_the_searches(mode):
+    searches = _searches(23)
+    picked = [s for i in range(4) for s in select_shard(searches, ShardSpec(i, 4, mode))]
+    assert sorted(s.search_id for s in picked) == [s.search_id for s in searches]
+
+
+def test_merge_matches_single_process_order_and_dedup(tmp_path):
+    searches = _searches(4)
+    # What a single process writes: config order, first search to list a URL keeps it.
+    per_search = {
+        100: [("u1", "a"), ("u2", "b")],
+        101: [("u2", "dup"), ("u3", "c")],
+        102: [("u4", "d"), ("", "no url"), ("", "no url either")],
+        103: [("u1", "dup"), ("u5", "e")],
+    }
+    expected = []
+    seen = set()
+    for s in searches:
+        for url, addr in per_search[s.search_id]:
+            if url and url in seen:
+                continue
+            seen.add(url)
+            expected.append({"search_id": str(s.search_id), "listing_url": url, "address": addr})
+
+    out_dir = str(tmp_path)
+    for index in range(2):
+        spec = ShardSpec(index, 2)
+        rows = [
+            {"search_id": s.search_id, "listing_url": url, "address": addr}
+            for s in select_shard(searches, spec)
+            for url, addr in per_search[s.search_id]
+        ]
+        _write(partial_output_path(out_dir, spec), rows)
+
+    out_path = os.path.join(out_dir, "all_listings.csv")
+    n = merge_partials(out_dir, searches, out_path=out_path)
+    assert n == len(expected)
+    assert _read(out_path) == expected
+
+
+def test_merge_refuses_missing_shards_unless_allowed(tmp_path):
+    searches = _searches(2)
+    _write(partial_output_path(str(tmp_path), ShardSpec(0, 2)), [{"search_id": 100, "listing_url": "u", "address": "a"}])
+    out_path = str(tmp_path / "all_listings.csv")
+    with pytest.raises(ValueError, match="Missing shard"):
+        merge_partials(str(tmp_path), searches, out_path=out_path)
+    assert merge_partials(str(tmp_path), searches, out_path=out_path, allow_missing=True) == 1
+
+
+def test_merge_passes_merged_rows_to_rerate(tmp_path):
+    searches = _searches(2)
+    _write(partial_output_path(str(tmp_path), ShardSpec(1, 2)), [{"search_id": 101, "listing_url": "u2", "address": "b"}])
+    _write(partial_output_path(str(tmp_path), ShardSpec(0, 2)), [{"search_id": 100, "listing_url": "u1", "address": "a"}])
+    seen = []
+
+    def rerate(rows):
+        seen.extend(r["listing_url"] for r in rows)
+        for r in rows:
+            r["address"] = r["address"].upper()
+
+    out_path = str(tmp_path / "all_listings.csv")
+    merge_partials(str(tmp_path), searches, out_path=out_path, rerate=rerate)
+    assert seen == ["u1", "u2"]
+    assert [r["address"] for r in _read(out_path)] == ["A", "B"]
+
+
+def test_run_rejects_out_of_range_shard(capsys):
+    from run_all_searches import main
+
+    assert main(["run", "--shard-index", "2", "--shard-count", "2"]) == 2
+    assert "Invalid shard" in capsys.readouterr().out
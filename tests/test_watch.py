@@ -0,0 +1,84 @@
+import json
+import threading
+
+import pytest
+
+from http_client import FetchResult
+from search_plan import SearchDef
+from watch import EventFeed, RequestBudget, WatchState, diff_rows, watch
+
+SEARCH = SearchDef(search_id=7, category="DADU_play", city="Tacoma", description="", url="https://x/7", hot=True)
+
+
+def _row(url: str, price: int) -> dict:
+    return {"listing_url": url, "listing_price": price, "address": "1 Main St"}
+
+
+def test_diff_rows_reports_new_and_changed_once(tmp_path):
+    state = WatchState(path=str(tmp_path / "state.json"))
+    assert diff_rows(state, SEARCH, [_row("u1", 100), _row("u2", 200)], emit=False) == []
+
+    events = diff_rows(state, SEARCH, [_row("u1", 100), _row("u2", 190), _row("u3", 300), _row("", 1)])
+    assert [(e["event"], e["listing_url"]) for e in events] == [("changed", "u2"), ("new", "u3")]
+    assert diff_rows(state, SEARCH, [_row("u2", 190), _row("u3", 300)]) == []
+
+    # Dropping off the page and coming back unchanged is not news.
+    assert diff_rows(state, SEARCH, [_row("u1", 100)]) == []
+
+
+def test_state_round_trips(tmp_path):
+    state = WatchState(path=str(tmp_path / "state.json"))
+    state.bodies["7"] = "abc"
+    diff_rows(state, SEARCH, [_row("u1", 100)])
+    state.save()
+    again = WatchState.load(state.path)
+    assert again.primed(SEARCH)
+    assert again.listings == state.listings
+
+
+def test_budget_refuses_past_limit_until_stopped():
+    budget = RequestBudget(2, window_s=60)
+    assert budget.wait() and budget.wait()
+    assert budget.remaining() == 0
+    stop = threading.Event()
+    stop.set()
+    assert budget.wait(stop) is False
+
+
+def test_watch_skips_unchanged_pages_and_feeds_changes(tmp_path):
+    pages = iter(["<p>a</p>", "<p>a</p>", "<p>b</p>", None])
+    parsed = []
+
+    def fetch(s):
+        text = next(pages)
+        if text is None:
+            return FetchResult(url=s.url, status_code=200, text="<p>b</p>", elapsed_s=0.0, not_modified=True)
+        return FetchResult(url=s.url, status_code=200, text=text, elapsed_s=0.0)
+
+    def rows_for(s, html):
+        parsed.append(html)
+        return [_row("u1", 100 if html == "<p>a</p>" else 90)]
+
+    feed = EventFeed(str(tmp_path / "events.jsonl"))
+    state = WatchState(path=str(tmp_path / "state.json"))
+    stats = watch(
+        [SEARCH],
+        fetch=fetch,
+        rows_for=rows_for,
+        feed=feed,
+        state=state,
+        interval_s=0.001,
+        budget=RequestBudget(100),
+        max_rounds=4,
+    )
+    feed.close()
+    assert parsed == ["<p>a</p>", "<p>b</p>"]
+    assert (stats.polls, stats.unchanged, stats.parsed, stats.events) == (4, 2, 2, 1)
+    with open(feed.path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f]
+    assert [(e["event"], e["row"]["listing_price"]) for e in events] == [("changed", 90)]
+
+
+def test_budget_rejects_non_positive():
+    with pytest.raises(ValueError):
+        RequestBudget(0)